@@ -0,0 +1,134 @@
+from datetime import date
+
+# Room types a guest may be moved up to, best first, when their own type is full
+UPGRADE_PATHS = {
+    'standard': ('Deluxe', 'Suite'),
+    'deluxe': ('Suite',),
+    'suite': (),
+}
+
+class RoomAssignmentPlanner:
+    """Best-fit placement of stays onto concrete rooms.
+    
+    Works on a scratch copy of the calendar's occupancy bitmap, so a whole
+    batch can be planned, and the result checked, before any room is
+    touched. Each stay goes to the room that leaves the least fragmentation,
+    decided with whole-mask operations over every candidate room at once:
+    first rooms where it fills a gap exactly, then rooms where it sits
+    against one neighbouring stay, then rooms where it leaves no orphan gap
+    (a free run shorter than `min_stay` nights between two stays), and only
+    then rooms where orphans are unavoidable. A re-planned stay keeps its
+    current room if that strands no nights or fits as well as any other;
+    remaining ties go to the lowest slot, which keeps long free runs
+    together in the higher ones. Nights before
+    `today` count as occupied, since they can no longer be sold.
+    """
+    
+    def __init__(self, calendar, min_stay=2, today=None):
+        if min_stay < 1:
+            raise ValueError("Minimum stay must be at least one night")
+        self._calendar = calendar
+        self._rooms = list(calendar.get_rooms())
+        self._slots = {id(room): slot for slot, room in enumerate(self._rooms)}
+        self._nights = calendar.get_nights()
+        self._min_stay = min_stay
+        self._today = (today or date.today()).toordinal()
+        self._all_mask = calendar.get_type_mask()
+        self._in_service = 0
+        for slot, room in enumerate(self._rooms):
+            if room.is_available():
+                self._in_service |= 1 << slot
+    
+    def _occupied(self, day):
+        if day < self._today:
+            return self._all_mask
+        return self._nights.get(day, 0)
+    
+    def _mark(self, room, start, end, reserved):
+        bit = 1 << self._slots[id(room)]
+        nights = self._nights
+        for day in range(start, end):
+            if reserved:
+                nights[day] = nights.get(day, 0) | bit
+            else:
+                nights[day] = nights.get(day, 0) & ~bit
+    
+    def release(self, room, start, end):
+        """Free a stay (day ordinals) in the scratch state so it can be placed again"""
+        self._mark(room, start, end, False)
+    
+    def _orphans(self, boundary, direction):
+        """Rooms whose free run from `boundary` towards `direction` is shorter than min_stay"""
+        run = self._all_mask
+        orphans = 0
+        for length in range(1, self._min_stay):
+            day = boundary - length if direction < 0 else boundary + length - 1
+            run &= ~self._occupied(day)
+            orphans |= run & self._occupied(day + direction)
+        return orphans
+    
+    def _best_fit(self, candidates, start, end, current=0):
+        left = candidates & self._occupied(start - 1)
+        right = candidates & self._occupied(end)
+        orphan_left = candidates & self._orphans(start, -1)
+        orphan_right = candidates & self._orphans(end, 1)
+        tiers = (left & right,
+                 (left & ~orphan_right) | (right & ~orphan_left),
+                 candidates & ~(left | right | orphan_left | orphan_right),
+                 (left & orphan_right) | (right & orphan_left),
+                 candidates & ~(orphan_left & orphan_right),
+                 candidates)
+        if current & (tiers[0] | tiers[1] | tiers[2]):
+            # A re-planned stay that strands no nights where it is stays put
+            return current
+        for tier in tiers:
+            if tier & current:
+                return current
+            if tier:
+                return tier & -tier
+        return 0
+    
+    def place(self, room_type, start, end, upgrade=True, current=None):
+        """Pick and hold a room for [start, end) day ordinals; returns (room, upgraded) or (None, False).
+        
+        `current` is the room a re-planned stay holds now, kept if it leaves no orphan gap or no
+        other room fits better.
+        """
+        if end <= start:
+            raise ValueError("Check-out must be after check-in")
+        occupied = 0
+        for day in range(start, end):
+            occupied |= self._nights.get(day, 0)
+        free = self._in_service & ~occupied
+        current_bit = 1 << self._slots[id(current)] if current is not None and id(current) in self._slots else 0
+        choices = (room_type,) + (UPGRADE_PATHS.get(room_type.lower(), ()) if upgrade else ())
+        for choice in choices:
+            candidates = free & self._calendar.get_type_mask(choice)
+            if candidates:
+                room = self._rooms[self._best_fit(candidates, start, end, current_bit).bit_length() - 1]
+                self._mark(room, start, end, True)
+                return room, choice.lower() != room_type.lower()
+        return None, False
+    
+    def cheapest_room(self, room_type):
+        """Lowest list price among rooms of a type, used to price upgraded stays as booked"""
+        mask = self._calendar.get_type_mask(room_type)
+        cheapest = None
+        while mask:
+            low = mask & -mask
+            room = self._rooms[low.bit_length() - 1]
+            if cheapest is None or room.get_price_per_night() < cheapest.get_price_per_night():
+                cheapest = room
+            mask ^= low
+        return cheapest
+    
+    def orphan_nights(self, first, last):
+        """Free room-nights in [first, last) stranded in gaps shorter than min_stay"""
+        total = 0
+        for length in range(1, self._min_stay):
+            for day in range(first, last - length + 1):
+                gap = self._occupied(day - 1) & self._occupied(day + length) & self._all_mask
+                for offset in range(length):
+                    gap &= ~self._occupied(day + offset)
+                total += length * gap.bit_count()
+        return total
@@ -0,0 +1,69 @@
+from bisect import bisect_left, bisect_right
+from concurrency import room_locks
+
+class RoomSchedule:
+    """Sorted, non-overlapping reservation intervals for a single room"""
+    
+    __slots__ = ('_starts', '_ends', '_listeners')
+    
+    def __init__(self):
+        """Initialize an empty schedule"""
+        self._starts = []
+        self._ends = []
+        self._listeners = ()
+    
+    @staticmethod
+    def _to_day(value):
+        return value.toordinal()
+    
+    def _span(self, check_in, check_out):
+        start = self._to_day(check_in)
+        end = self._to_day(check_out)
+        if end <= start:
+            raise ValueError("Check-out must be after check-in")
+        return start, end
+    
+    def add_listener(self, listener):
+        """Register a callable invoked as listener(start_day, end_day, reserved)"""
+        self._listeners += (listener,)
+    
+    def get_reservations(self):
+        return list(zip(self._starts, self._ends))
+    
+    def is_free(self, check_in, check_out):
+        """Check whether the half-open range [check_in, check_out) is free"""
+        start, end = self._span(check_in, check_out)
+        with room_locks.lock_for(id(self)):
+            return self._is_free(start, end)
+    
+    def _is_free(self, start, end):
+        # The only interval that can overlap is the last one starting before end
+        idx = bisect_left(self._starts, end) - 1
+        return idx < 0 or self._ends[idx] <= start
+    
+    def reserve(self, check_in, check_out):
+        """Reserve [check_in, check_out), raising if it overlaps a reservation"""
+        start, end = self._span(check_in, check_out)
+        with room_locks.lock_for(id(self)):
+            if not self._is_free(start, end):
+                raise ValueError("Room is not available")
+            idx = bisect_right(self._starts, start)
+            self._starts.insert(idx, start)
+            self._ends.insert(idx, end)
+            for listener in self._listeners:
+                listener(start, end, True)
+    
+    def release(self, check_in, check_out):
+        """Release a previously reserved range"""
+        start, end = self._span(check_in, check_out)
+        with room_locks.lock_for(id(self)):
+            idx = bisect_left(self._starts, start)
+            if idx == len(self._starts) or self._starts[idx] != start or self._ends[idx] != end:
+                raise ValueError("No reservation for the given dates")
+            del self._starts[idx]
+            del self._ends[idx]
+            for listener in self._listeners:
+                listener(start, end, False)
+    
+    def __len__(self):
+        return len(self._starts)
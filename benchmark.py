@@ -0,0 +1,562 @@
+import argparse
+import asyncio
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+from room import StandardRoom, DeluxeRoom, Suite
+from guest import Guest, LoyaltyProgram
+from booking import Booking, Invoice
+from payment import CreditCardPayment, DebitCardPayment, MobileWalletPayment
+from service import Housekeeping, RoomService, Transportation
+from feedback import Feedback
+from events import EventBus, BookingCreated
+from export import InvoiceExporter
+from hotel_system import HotelSystem
+from payment_pipeline import LocalGatewayStub, PaymentPipeline
+from search import FeedbackSearchIndex
+from sharding import ShardedHotel
+from synthetic import SyntheticDataGenerator
+
+# Rooms, guests and bookings per size tier
+SIZE_TIERS = {
+    'small': (1_000, 5_000, 20_000),
+    'medium': (5_000, 50_000, 200_000),
+    'large': (20_000, 200_000, 1_000_000),
+}
+
+def object_size(obj):
+    """Shallow size of an instance including its __dict__, if it has one"""
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+def rss_bytes():
+    """Current resident set size of this process"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def _sample_objects():
+    today = date.today()
+    room = StandardRoom("101", 99.99)
+    guest = Guest("John Doe", "john@example.com", "555-0101")
+    booking = Booking(guest, room, today, today + timedelta(days=2))
+    return [
+        ("StandardRoom", room),
+        ("DeluxeRoom", DeluxeRoom("201", 149.99)),
+        ("Suite", Suite("301", 249.99)),
+        ("Guest", guest),
+        ("LoyaltyProgram", LoyaltyProgram()),
+        ("Booking", booking),
+        ("Invoice", Invoice(booking)),
+        ("CreditCardPayment", CreditCardPayment(100.0, today, "4111111111111111", "John", "12/25", "123")),
+        ("DebitCardPayment", DebitCardPayment(100.0, today, "4111111111111111", "John", "12/25", "123")),
+        ("MobileWalletPayment", MobileWalletPayment(100.0, today, "Apple Pay", "555-0101")),
+        ("Housekeeping", Housekeeping(datetime.now(), room)),
+        ("RoomService", RoomService(datetime.now(), room, ["Burger"])),
+        ("Transportation", Transportation(datetime.now(), room, "SUV", "Airport")),
+        ("Feedback", Feedback(guest, 5, "Great")),
+    ]
+
+def bench_memory(num_bookings=1_000_000, num_rooms=10_000):
+    print("MEMORY: bytes per object")
+    for name, obj in _sample_objects():
+        print(f"{name:25} {object_size(obj):6d} bytes")
+    
+    gc.collect()
+    baseline = rss_bytes()
+    room_classes = (StandardRoom, DeluxeRoom, Suite)
+    rooms = [room_classes[i % 3](str(1000 + i), 100.0) for i in range(num_rooms)]
+    guests = [Guest(f"Guest {i}", f"guest{i}@example.com", f"555-{i:07d}")
+              for i in range(max(num_bookings // 5, 1))]
+    start = date.today()
+    bookings = [Booking(guests[i % len(guests)], rooms[i % num_rooms],
+                        start + timedelta(days=i % 365), start + timedelta(days=i % 365 + 2))
+                for i in range(num_bookings)]
+    gc.collect()
+    used = rss_bytes() - baseline
+    print(f"\nMEMORY: {num_rooms} rooms, {len(guests)} guests, {len(bookings)} bookings")
+    print(f"RSS growth: {used / 2**20:.1f} MiB ({used / max(num_bookings, 1):.0f} bytes per booking)")
+    return used
+
+def stress_concurrent_booking(threads=32, attempts_per_thread=500, num_rooms=20, days=60):
+    """Hammer create_booking/cancel_booking from many threads and check for double-bookings"""
+    hotel = HotelSystem()
+    for i in range(num_rooms):
+        hotel.add_room(StandardRoom(f"S{i}", 100.0))
+    rooms = hotel.get_rooms()
+    guest = hotel.get_guests()[0]
+    start = date.today() + timedelta(days=1)
+    outcomes = {'booked': 0, 'rejected': 0, 'cancelled': 0}
+    outcome_lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+    
+    def worker(seed):
+        rng = random.Random(seed)
+        booked = rejected = cancelled = 0
+        barrier.wait()
+        for _ in range(attempts_per_thread):
+            check_in = start + timedelta(days=rng.randrange(days))
+            check_out = check_in + timedelta(days=rng.randint(1, 4))
+            try:
+                booking = hotel.create_booking(guest, rng.choice(rooms), check_in, check_out)
+            except ValueError:
+                rejected += 1
+                continue
+            booked += 1
+            if rng.random() < 0.3:
+                booking.cancel_booking()
+                cancelled += 1
+        with outcome_lock:
+            outcomes['booked'] += booked
+            outcomes['rejected'] += rejected
+            outcomes['cancelled'] += cancelled
+    
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        workers = [threading.Thread(target=worker, args=(seed,)) for seed in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+    
+    double_bookings = 0
+    for room in rooms:
+        stays = sorted((b.get_check_in_date(), b.get_check_out_date())
+                       for b in hotel.get_bookings_for_room(room) if b.get_status() != "Cancelled")
+        double_bookings += sum(1 for prev, cur in zip(stays, stays[1:]) if cur[0] < prev[1])
+    calendar_mismatches = sum(
+        1 for offset in range(days + 5) for room in rooms
+        if (room in hotel.find_available_rooms(None, start + timedelta(days=offset),
+                                               start + timedelta(days=offset + 1)))
+        != room.is_available_between(start + timedelta(days=offset), start + timedelta(days=offset + 1))
+    )
+    print(f"CONCURRENCY: {threads} threads, {outcomes['booked']} booked, "
+          f"{outcomes['rejected']} rejected, {outcomes['cancelled']} cancelled")
+    print(f"Double bookings: {double_bookings}, calendar mismatches: {calendar_mismatches}")
+    return double_bookings + calendar_mismatches
+
+def bench_payment_pipeline(num_payments=5000, concurrency=64, latency=0.005, failure_rate=0.02):
+    """Push payments through the async pipeline against the local gateway stub"""
+    hotel = HotelSystem()
+    guest = hotel.get_guests()[0]
+    start = date.today() + timedelta(days=1)
+    room = hotel.get_rooms()[0]
+    booking = hotel.create_booking(guest, room, start, start + timedelta(days=2))
+    details = {'wallet_type': 'Apple Pay', 'phone_number': guest.get_phone()}
+    
+    async def run():
+        gateway = LocalGatewayStub(latency=latency, failure_rate=failure_rate, seed=1)
+        async with PaymentPipeline(gateway, concurrency=concurrency) as pipeline:
+            started = time.perf_counter()
+            # One booking paid many times: each payment needs its own idempotency key
+            await asyncio.gather(*(hotel.process_payment_async(booking, 'mobile', details, pipeline,
+                                                               f"bench-{index}")
+                                   for index in range(num_payments)))
+            elapsed = time.perf_counter() - started
+        return pipeline.get_stats(), gateway.get_calls(), gateway.get_charged(), elapsed
+    
+    stats, calls, charged, elapsed = asyncio.run(run())
+    print(f"PAYMENTS: {stats['count']} payments in {elapsed:.2f}s ({stats['count'] / elapsed:,.0f}/s), "
+          f"{calls} gateway calls, {charged} charged, {stats['failures']} failed, {stats['unknown']} unknown")
+    print(f"Latency p50 {stats['p50'] * 1000:.1f} ms, p99 {stats['p99'] * 1000:.1f} ms")
+    return stats
+
+def bench_feedback_search(num_feedbacks=1_000_000, queries_per_kind=200, seed=7):
+    """Index synthetic reviews and time ranked word, boolean and phrase queries"""
+    rng = random.Random(seed)
+    vocabulary = [f"word{i}" for i in range(5000)]
+    topics = ["noise from the street", "the AC was broken", "Maria at reception was lovely",
+              "great breakfast", "room was not clean", "air conditioning too loud", "quiet and comfortable"]
+    guest = Guest("John Doe", "john@example.com", "555-0101")
+    index = FeedbackSearchIndex()
+    started = time.perf_counter()
+    for feedback_id in range(1, num_feedbacks + 1):
+        words = rng.choices(vocabulary, k=rng.randint(5, 20))
+        words.insert(rng.randrange(len(words) + 1), rng.choice(topics))
+        feedback = Feedback(guest, rng.randint(1, 5), " ".join(words))
+        feedback.set_feedback_id(feedback_id)
+        index.add(feedback)
+    build = time.perf_counter() - started
+    print(f"SEARCH: indexed {num_feedbacks} reviews in {build:.1f}s ({num_feedbacks / build:,.0f}/s)")
+    
+    kinds = {
+        'rare word': lambda: rng.choice(vocabulary),
+        'two words': lambda: f"{rng.choice(vocabulary)} {rng.choice(vocabulary)}",
+        'boolean': lambda: f"noise -street OR {rng.choice(vocabulary)}",
+        'phrase': lambda: '"air conditioning"',
+        'common word': lambda: 'ac',
+    }
+    for kind, make_query in kinds.items():
+        latencies = []
+        for _ in range(queries_per_kind):
+            query = make_query()
+            started = time.perf_counter()
+            index.search(query, limit=10)
+            latencies.append(time.perf_counter() - started)
+        latencies.sort()
+        print(f"{kind:12} p50 {latencies[len(latencies) // 2] * 1000:8.2f} ms   "
+              f"p99 {latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000:8.2f} ms")
+    return index
+
+def bench_group_booking(num_rooms=5000, block_size=300, blocks=50, seed=42):
+    """Time all-or-nothing 300-room blocks against a populated hotel"""
+    rng = random.Random(seed)
+    hotel = HotelSystem(sample_data=False)
+    SyntheticDataGenerator(seed).populate(hotel, num_rooms, num_rooms, num_rooms * 10)
+    organizer = hotel.get_guests()[0]
+    today = date.today()
+    standard = block_size * 5 // 6
+    failures = 0
+    
+    def book_block():
+        nonlocal failures
+        check_in = today + timedelta(days=rng.randrange(30, 365))
+        try:
+            hotel.create_group_booking(organizer, {"Standard": standard, "Deluxe": block_size - standard},
+                                       check_in, check_in + timedelta(days=rng.randint(1, 4)))
+        except ValueError:
+            failures += 1
+    
+    stats = _time_calls(book_block, blocks)
+    print(f"Group booking: {blocks} blocks of {block_size} rooms over {num_rooms:,} rooms, "
+          f"{failures} rejected as full")
+    print(f"  p50 {stats['p50_us'] / 1000:.1f} ms   p99 {stats['p99_us'] / 1000:.1f} ms")
+    return stats
+
+def bench_room_assignment(num_rooms=2000, num_bookings=20000, batch=5000, seed=42):
+    """Place a batch of type-level requests, then time the nightly re-optimization pass"""
+    rng = random.Random(seed)
+    hotel = HotelSystem(sample_data=False)
+    SyntheticDataGenerator(seed).populate(hotel, num_rooms, num_rooms, num_bookings)
+    guests = hotel.get_guests()
+    today = date.today()
+    requests = []
+    for _ in range(batch):
+        check_in = today + timedelta(days=rng.randrange(1, 180))
+        requests.append((rng.choice(guests), rng.choice(("Standard", "Standard", "Deluxe", "Suite")),
+                         check_in, check_in + timedelta(days=rng.choice((1, 2, 3, 4, 7)))))
+    started = time.perf_counter()
+    bookings = hotel.assign_rooms(requests)
+    assign_seconds = time.perf_counter() - started
+    upgraded = sum(1 for request, booking in zip(requests, bookings)
+                   if booking is not None and booking.get_room().get_room_type() != request[1])
+    started = time.perf_counter()
+    report = hotel.reoptimize_rooms()
+    reoptimize_seconds = time.perf_counter() - started
+    print(f"Room assignment: {batch:,} requests in {assign_seconds * 1000:.0f} ms, "
+          f"{bookings.count(None)} unplaced, {upgraded} upgraded")
+    print(f"  Re-optimized {report['bookings']:,} future stays in {reoptimize_seconds * 1000:.0f} ms: "
+          f"{report['moved']:,} moved, {report['orphan_nights_before']:,} -> {report['orphan_nights_after']:,} "
+          f"orphan room-nights ({report['recovered_nights']:,} recovered, "
+          f"{report['moves_per_night']:.1f} moves per night)")
+    return report
+
+def bench_invoice_export(num_bookings=200_000, num_rooms=5000, chunk_size=10000, seed=42):
+    """Invoices/s and peak memory allocated during CSV, gzip CSV and JSON-lines exports"""
+    hotel = HotelSystem(sample_data=False)
+    SyntheticDataGenerator(seed).populate(hotel, num_rooms, num_rooms, num_bookings)
+    mobile = {'wallet_type': 'Apple Pay', 'phone_number': '555-0101'}
+    for index, booking in enumerate(hotel.get_bookings()):
+        booking.generate_invoice()
+        if index % 2:
+            hotel.process_payment(booking, 'mobile', mobile)
+    exporter = InvoiceExporter(hotel, chunk_size)
+    print(f"Invoice export: {len(hotel.get_bookings()):,} invoices, chunks of {chunk_size:,}")
+    with tempfile.TemporaryDirectory() as directory:
+        for label, export in (("csv", lambda: exporter.export_csv(os.path.join(directory, 'csv'))),
+                              ("csv.gz", lambda: exporter.export_csv(os.path.join(directory, 'gz'), compress=True)),
+                              ("jsonl.gz", lambda: exporter.export_jsonl(os.path.join(directory, 'f.jsonl.gz')))):
+            gc.collect()
+            stats = export()
+            # A second, traced pass: tracing slows the export, and the process peak RSS was set by populate
+            gc.collect()
+            tracemalloc.start()
+            try:
+                baseline = tracemalloc.get_traced_memory()[0]
+                export()
+                peak = tracemalloc.get_traced_memory()[1] - baseline
+            finally:
+                tracemalloc.stop()
+            print(f"  {label:9} {stats['invoices_per_sec']:10,.0f} invoices/s   {stats['items']:,} items, "
+                  f"{stats['payments']:,} payments   peak +{peak / 2**20:.1f} MiB allocated")
+
+def bench_event_bus(events=200_000):
+    """Per-publish cost of the event bus for each kind of subscriber"""
+    def publish_cost(bus):
+        emit = bus.emit
+        started = time.perf_counter_ns()
+        for _ in range(events):
+            emit(BookingCreated, None)
+        return (time.perf_counter_ns() - started) / events
+    
+    results = {}
+    results['no subscribers'] = publish_cost(EventBus())
+    bus = EventBus()
+    bus.subscribe(lambda event: None, (BookingCreated,))
+    results['sync'] = publish_cost(bus)
+    bus = EventBus()
+    bus.subscribe(lambda batch: None, (BookingCreated,), batch_size=100)
+    results['sync, batches of 100'] = publish_cost(bus)
+    
+    async def run_async():
+        async def handler(batch):
+            pass
+        
+        bus = EventBus()
+        bus.subscribe_async(handler, (BookingCreated,), batch_size=500, capacity=events)
+        async with bus:
+            cost = publish_cost(bus)
+        return cost
+    
+    results['async, batches of 500'] = asyncio.run(run_async())
+    print(f"Event bus: {events:,} publishes per subscriber kind")
+    for label, nanoseconds in results.items():
+        print(f"  {label:24} {nanoseconds:8.0f} ns/publish")
+    return results
+
+def bench_sharded_search(properties=4, rooms=2000, guests=2000, bookings=10000, queries=500, seed=42):
+    """Cross-shard find_available_rooms latency against the same data in one process"""
+    rng = random.Random(seed)
+    today = date.today()
+    stays = []
+    for _ in range(queries):
+        check_in = today + timedelta(days=rng.randrange(180))
+        stays.append((rng.choice((None, "Standard", "Deluxe", "Suite")), check_in,
+                      check_in + timedelta(days=rng.randint(1, 7))))
+    
+    # The single-process baseline holds the same total inventory in one HotelSystem, quoting each match
+    single = HotelSystem(sample_data=False)
+    SyntheticDataGenerator(seed).populate(single, rooms * properties, guests * properties, bookings * properties)
+    queue = list(stays)
+    
+    def single_search():
+        room_type, check_in, check_out = queue.pop()
+        found = [(single.quote_stay(room, check_in, check_out), room.get_room_number())
+                 for room in single.find_available_rooms(room_type, check_in, check_out)]
+        found.sort()
+    
+    single_stats = _time_calls(single_search, queries)
+    del single, queue
+    gc.collect()
+    
+    with ShardedHotel([f"P{index}" for index in range(properties)]) as chain:
+        chain.populate(rooms, guests, bookings, seed)
+        queue = list(stays)
+        sharded_stats = _time_calls(lambda: chain.find_available_rooms(*queue.pop()), queries)
+    
+    print(f"Sharded search: {properties} properties x {rooms:,} rooms, {os.cpu_count()} CPUs")
+    for label, stats in (("single process", single_stats), (f"{properties} shards", sharded_stats)):
+        print(f"  {label:16} {stats['ops_per_sec']:10,.0f} queries/s   p50 {stats['p50_us']:9.1f} us   "
+              f"p99 {stats['p99_us']:9.1f} us")
+    return {'single': single_stats, 'sharded': sharded_stats}
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def latency_stats(latencies):
+    """ops/s and p50/p95/p99 latency in microseconds for a list of per-call seconds"""
+    if not latencies:
+        return {'count': 0, 'ops_per_sec': 0.0, 'p50_us': 0.0, 'p95_us': 0.0, 'p99_us': 0.0}
+    ordered = sorted(latencies)
+    
+    def percentile(fraction):
+        return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] * 1e6
+    
+    return {
+        'count': len(ordered),
+        'ops_per_sec': len(ordered) / sum(ordered) if sum(ordered) else 0.0,
+        'p50_us': percentile(0.5),
+        'p95_us': percentile(0.95),
+        'p99_us': percentile(0.99),
+    }
+
+def _time_calls(operation, count):
+    latencies = []
+    clock = time.perf_counter
+    for _ in range(count):
+        started = clock()
+        operation()
+        latencies.append(clock() - started)
+    return latency_stats(latencies)
+
+def run_tier(name, rooms, guests, bookings, operations=2000, seed=42):
+    """Populate a hotel for one size tier and time the core HotelSystem operations"""
+    rng = random.Random(seed)
+    hotel = HotelSystem()
+    started = time.perf_counter()
+    dataset = SyntheticDataGenerator(seed).populate(hotel, rooms, guests, bookings)
+    generate_seconds = time.perf_counter() - started
+    
+    today = date.today()
+    all_rooms = hotel.get_rooms()
+    all_guests = hotel.get_guests()
+    confirmed = hotel.get_bookings_by_status("Confirmed")
+    sample = rng.sample(confirmed, min(len(confirmed), operations * 2))
+    uninvoiced = [booking for booking in sample[:operations] if booking.get_invoice() is None]
+    paying = sample[operations:] or sample
+    mobile = {'wallet_type': 'Apple Pay', 'phone_number': '555-0101'}
+    service_kinds = (('housekeeping', {'service_type': 'Deep'}), ('roomservice', {'items': ['Burger', 'Fries']}),
+                     ('transportation', {'vehicle_type': 'Sedan', 'destination': 'Airport'}))
+    
+    def stay():
+        check_in = today + timedelta(days=rng.randrange(180))
+        return check_in, check_in + timedelta(days=rng.randint(1, 7))
+    
+    def find_available_rooms():
+        hotel.find_available_rooms(rng.choice((None, "Standard", "Deluxe", "Suite")), *stay())
+    
+    def create_booking():
+        try:
+            hotel.create_booking(rng.choice(all_guests), rng.choice(all_rooms), *stay())
+        except ValueError:
+            pass
+    
+    def generate_invoice():
+        uninvoiced.pop().generate_invoice()
+    
+    def process_payment():
+        hotel.process_payment(rng.choice(paying), 'mobile', mobile)
+    
+    def add_service_request():
+        hotel.add_service_request(rng.choice(paying), *rng.choice(service_kinds))
+    
+    def submit_feedback():
+        hotel.submit_feedback(rng.choice(all_guests), rng.randint(1, 5), "Quiet room, friendly staff, slow lift")
+    
+    results = {
+        'find_available_rooms': _time_calls(find_available_rooms, operations),
+        'create_booking': _time_calls(create_booking, operations),
+        'generate_invoice': _time_calls(generate_invoice, len(uninvoiced)),
+        'process_payment': _time_calls(process_payment, operations),
+        'add_service_request': _time_calls(add_service_request, operations),
+        'submit_feedback': _time_calls(submit_feedback, operations),
+    }
+    return {
+        'tier': name,
+        'rooms': rooms,
+        'guests': guests,
+        'bookings': dataset['bookings'],
+        'generate_seconds': generate_seconds,
+        'peak_rss_bytes': peak_rss_bytes(),
+        'operations': results,
+    }
+
+def _run_tier_isolated(*args):
+    """Run a tier in a fresh forked process so peak memory is per tier"""
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        return run_tier(*args)
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('fork')) as executor:
+        return executor.submit(run_tier, *args).result()
+
+def compare_results(baseline, current, tolerance=0.1):
+    """Print ops/s changes against a baseline run; returns (tier, operation, ratio) regressions"""
+    previous = {(tier['tier'], name): stats['ops_per_sec']
+                for tier in baseline['tiers'] for name, stats in tier['operations'].items()}
+    regressions = []
+    for tier in current['tiers']:
+        for name, stats in tier['operations'].items():
+            before = previous.get((tier['tier'], name))
+            if not before or not stats['ops_per_sec']:
+                continue
+            ratio = stats['ops_per_sec'] / before
+            marker = "  REGRESSION" if ratio < 1 - tolerance else ""
+            print(f"{tier['tier']:8} {name:22} {ratio:6.2f}x{marker}")
+            if marker:
+                regressions.append((tier['tier'], name, ratio))
+    return regressions
+
+def run_suite(tiers=('small',), operations=2000, seed=42, output=None, baseline=None):
+    """Benchmark each size tier and optionally save the results as JSON"""
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'operations_per_benchmark': operations,
+        'tiers': [],
+    }
+    for name in tiers:
+        rooms, guests, bookings = SIZE_TIERS[name]
+        tier = _run_tier_isolated(name, rooms, guests, bookings, operations, seed)
+        results['tiers'].append(tier)
+        print(f"SUITE {name}: {tier['rooms']} rooms, {tier['guests']} guests, {tier['bookings']} bookings "
+              f"(generated in {tier['generate_seconds']:.1f}s), peak RSS {tier['peak_rss_bytes'] / 2**20:.0f} MiB")
+        for operation, stats in tier['operations'].items():
+            print(f"  {operation:22} {stats['ops_per_sec']:12,.0f} ops/s   p50 {stats['p50_us']:8.1f} us   "
+                  f"p95 {stats['p95_us']:8.1f} us   p99 {stats['p99_us']:8.1f} us")
+    if output:
+        with open(output, 'w', encoding='utf-8') as target:
+            json.dump(results, target, indent=2)
+    if baseline:
+        with open(baseline, encoding='utf-8') as source:
+            compare_results(json.load(source), results)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Royal Stay hotel system benchmarks")
+    parser.add_argument('--bookings', type=int, default=1_000_000,
+                        help="bookings in the memory dataset")
+    parser.add_argument('--threads', type=int, default=32,
+                        help="threads in the concurrent booking stress test")
+    parser.add_argument('--feedbacks', type=int, default=1_000_000,
+                        help="reviews in the full-text search index")
+    parser.add_argument('--suite', action='store_true',
+                        help="run only the per-operation suite over synthetic size tiers")
+    parser.add_argument('--tiers', default='small,medium',
+                        help=f"comma-separated size tiers for --suite ({', '.join(SIZE_TIERS)})")
+    parser.add_argument('--operations', type=int, default=2000,
+                        help="calls timed per operation in --suite")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--properties', type=int, default=4,
+                        help="shards in the cross-shard search benchmark")
+    parser.add_argument('--output', help="write --suite results to this JSON file")
+    parser.add_argument('--baseline', help="compare --suite results against this JSON file")
+    args = parser.parse_args()
+    if args.suite:
+        run_suite(args.tiers.split(','), args.operations, args.seed, args.output, args.baseline)
+        return
+    bench_memory(args.bookings)
+    print()
+    stress_concurrent_booking(args.threads)
+    print()
+    bench_payment_pipeline()
+    print()
+    bench_feedback_search(args.feedbacks)
+    print()
+    bench_group_booking()
+    print()
+    bench_room_assignment()
+    print()
+    bench_invoice_export()
+    print()
+    bench_event_bus()
+    print()
+    bench_sharded_search(args.properties, seed=args.seed)
+
+if __name__ == "__main__":
+    main()
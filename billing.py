@@ -0,0 +1,64 @@
+from array import array
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+
+BillingRecord = namedtuple('BillingRecord', [
+    'booking_id', 'nights', 'room_total', 'service_total', 'discount', 'total_amount'
+])
+
+# Bookings shared with forked workers through copy-on-write memory
+_shared_bookings = None
+
+def _columns(bookings):
+    """Flatten bookings into parallel columns of plain numbers"""
+    booking_ids = []
+    nights = array('l')
+    room_totals = array('d')
+    service_totals = array('d')
+    points = array('d')
+    for booking in bookings:
+        loyalty_program = booking.get_guest().get_loyalty_program()
+        booking_ids.append(booking.get_booking_id())
+        nights.append(booking.calculate_stay_duration())
+        room_totals.append(booking.get_room_total())
+        service_totals.append(sum(service.get_price() for service in booking.get_additional_services()))
+        points.append(loyalty_program.get_points() if loyalty_program else 0)
+    return booking_ids, nights, room_totals, service_totals, points
+
+def compute_columns(booking_ids, nights, room_totals, service_totals, points):
+    """Apply services and loyalty discounts to the room charges column-wise"""
+    subtotals = array('d', map(float.__add__, room_totals, service_totals))
+    discounts = array('d', (max(min(p * 0.1, s * 0.2), 0.0) for p, s in zip(points, subtotals)))
+    totals = array('d', map(float.__sub__, subtotals, discounts))
+    return booking_ids, nights, room_totals, service_totals, discounts, totals
+
+def _bill_range(start, end):
+    return compute_columns(*_columns(_shared_bookings[start:end]))
+
+def run_billing(bookings, processes=None, chunk_size=20000):
+    """Bill bookings across a process pool and return BillingRecords in input order.
+    
+    Workers are forked after the booking list is published, so each one reads
+    its slice of the object graph directly and only compact numeric columns
+    are sent back. Without fork support everything runs in-process.
+    """
+    global _shared_bookings
+    bookings = list(bookings)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    ranges = [(start, min(start + chunk_size, len(bookings)))
+              for start in range(0, len(bookings), chunk_size)]
+    
+    if processes <= 1 or len(ranges) <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        results = [compute_columns(*_columns(bookings[start:end])) for start, end in ranges]
+    else:
+        _shared_bookings = bookings
+        try:
+            with ProcessPoolExecutor(max_workers=min(processes, len(ranges)),
+                                     mp_context=multiprocessing.get_context('fork')) as executor:
+                results = list(executor.map(_bill_range, *zip(*ranges)))
+        finally:
+            _shared_bookings = None
+    return [BillingRecord(*record) for columns in results for record in zip(*columns)]
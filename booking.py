@@ -1,15 +1,33 @@
 from datetime import datetime, timedelta
+from status import StatusTable
+from ids import next_id
+from concurrency import room_locks
+
+BOOKING_STATUSES = StatusTable("Confirmed", "Cancelled", "Completed")
+CANCELLED = BOOKING_STATUSES.code("Cancelled")
 
 class Booking:
+    __slots__ = ('_guest', '_room', '_check_in_date', '_check_out_date', '_booking_date',
+                 '_status', '_invoice', '_additional_services', '_booking_id',
+                 '_change_listeners', '_room_total')
+    
     def __init__(self, guest, room, check_in_date, check_out_date):
         self._guest = guest
         self._room = room
         self._check_in_date = check_in_date
         self._check_out_date = check_out_date
         self._booking_date = datetime.now().date()
-        self._status = "Confirmed"
+        self._status = BOOKING_STATUSES.code("Confirmed")
         self._invoice = None
-        self._additional_services = []
+        # Allocated on the first service; most bookings never order one
+        self._additional_services = ()
+        self._booking_id = None
+        self._change_listeners = ()
+        # Quoted charge for the stay; None means nights at the room's list price
+        self._room_total = None
+    
+    def get_booking_id(self):
+        return self._booking_id
     
     def get_guest(self):
         return self._guest
@@ -27,7 +45,7 @@ class Booking:
         return self._booking_date
     
     def get_status(self):
-        return self._status
+        return BOOKING_STATUSES.name(self._status)
     
     def get_invoice(self):
         return self._invoice
@@ -35,37 +53,128 @@ class Booking:
     def get_additional_services(self):
         return self._additional_services
     
+    def get_room_total(self):
+        """Room charge for the stay: the quoted nightly rates, or nights at the list price"""
+        if self._room_total is None:
+            return self.calculate_stay_duration() * self._room.get_price_per_night()
+        return self._room_total
+    
+    def set_room_total(self, room_total):
+        old_room_total = self._room_total
+        self._room_total = room_total
+        self._notify('room_total', old_room_total)
+        if self._invoice:
+            self._invoice.update_invoice()
+    
+    def set_booking_id(self, booking_id):
+        self._booking_id = booking_id
+    
+    def set_booking_date(self, booking_date):
+        self._booking_date = booking_date
+    
     def set_guest(self, guest):
+        old_guest = self._guest
         self._guest = guest
+        self._notify('guest', old_guest)
     
     def set_room(self, room):
+        old_room, _, _ = self._move_reservation(room=room)
+        self._notify('room', old_room)
+        if self._invoice:
+            self._invoice.update_invoice()
+    
+    def assign_room(self, room):
+        """Point the booking at a room whose reservation the caller already holds"""
+        old_room = self._room
         self._room = room
+        self._notify('room', old_room)
+        if self._invoice:
+            self._invoice.update_invoice()
     
     def set_check_in_date(self, check_in_date):
-        self._check_in_date = check_in_date
+        _, old_check_in, _ = self._move_reservation(check_in_date=check_in_date)
+        self._notify('check_in_date', old_check_in)
+        if self._invoice:
+            self._invoice.update_invoice()
     
     def set_check_out_date(self, check_out_date):
-        self._check_out_date = check_out_date
+        _, _, old_check_out = self._move_reservation(check_out_date=check_out_date)
+        self._notify('check_out_date', old_check_out)
+        if self._invoice:
+            self._invoice.update_invoice()
     
     def set_status(self, status):
-        self._status = status
+        old_status = self.get_status()
+        self._status = BOOKING_STATUSES.code(status)
+        self._notify('status', old_status)
+    
+    def add_change_listener(self, listener):
+        """Register a callable invoked as listener(booking, field, old_value)"""
+        self._change_listeners += (listener,)
+    
+    def _notify(self, field, old_value):
+        for listener in self._change_listeners:
+            listener(self, field, old_value)
+    
+    def _move_reservation(self, room=None, check_in_date=None, check_out_date=None):
+        """Move the reservation and the booking's room and dates together, holding both rooms'
+        schedule locks; arguments left as None keep their current value. Nothing changes if the
+        new range is taken. Returns the old (room, check-in, check-out)."""
+        while True:
+            old_room = self._room
+            new_room = old_room if room is None else room
+            with room_locks.hold(id(old_room.get_schedule()), id(new_room.get_schedule())):
+                if old_room is not self._room:
+                    # Moved by another thread while waiting for the locks
+                    continue
+                old = (old_room, self._check_in_date, self._check_out_date)
+                new_check_in = self._check_in_date if check_in_date is None else check_in_date
+                new_check_out = self._check_out_date if check_out_date is None else check_out_date
+                if self._status != CANCELLED:
+                    old_room.release(self._check_in_date, self._check_out_date)
+                    try:
+                        new_room.reserve(new_check_in, new_check_out)
+                    except ValueError:
+                        # The lock kept the old range free; skip the room's availability check
+                        old_room.get_schedule().reserve(self._check_in_date, self._check_out_date)
+                        raise
+                self._room = new_room
+                self._check_in_date = new_check_in
+                self._check_out_date = new_check_out
+                return old
     
     def calculate_stay_duration(self):
         return (self._check_out_date - self._check_in_date).days
     
-    def generate_invoice(self):
+    def generate_invoice(self, invoice_number=None, issue_date=None):
         if not self._invoice:
-            self._invoice = Invoice(self)
+            self._invoice = Invoice(self, invoice_number, issue_date)
+            self._notify('invoice', None)
         return self._invoice
     
     def add_service(self, service):
+        if not self._additional_services:
+            self._additional_services = []
         self._additional_services.append(service)
         if self._invoice:
-            self._invoice.update_invoice()
+            self._invoice.add_service_charge(service)
+        self._notify('service', None)
     
     def cancel_booking(self):
-        self._status = "Cancelled"
-        self._room.set_available(True)
+        # Checked and released under the room's lock, so a second cancel cannot release
+        # a reservation another booking has since made for the same dates
+        while True:
+            room = self._room
+            with room_locks.hold(id(room.get_schedule())):
+                if room is not self._room:
+                    continue
+                if self._status == CANCELLED:
+                    raise ValueError("Booking is already cancelled")
+                room.release(self._check_in_date, self._check_out_date)
+                old_status = self.get_status()
+                self._status = CANCELLED
+                break
+        self._notify('status', old_status)
         return True
     
     def __str__(self):
@@ -73,15 +182,33 @@ class Booking:
                 f"Room: {self._room.get_room_number()} ({self._room.get_room_type()})\n"
                 f"Check-in: {self._check_in_date}\n"
                 f"Check-out: {self._check_out_date}\n"
-                f"Status: {self._status}\n"
+                f"Status: {self.get_status()}\n"
                 f"Duration: {self.calculate_stay_duration()} nights")
 
+def charge_items(booking):
+    """Invoice lines for a booking before discounts: the room charge, then each service"""
+    items = [{
+        'description': f"Room {booking.get_room().get_room_number()} ({booking.calculate_stay_duration()} nights)",
+        'amount': booking.get_room_total()
+    }]
+    for service in booking.get_additional_services():
+        items.append({
+            'description': service.get_description(),
+            'amount': service.get_price()
+        })
+    return items
+
 class Invoice:
-    def __init__(self, booking):
+    __slots__ = ('_booking', '_invoice_number', '_issue_date', '_items', '_subtotal',
+                 '_discount_item', '_total_amount')
+    
+    def __init__(self, booking, invoice_number=None, issue_date=None):
         self._booking = booking
-        self._invoice_number = f"INV-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        self._issue_date = datetime.now().date()
+        self._invoice_number = invoice_number or f"INV-{next_id()}"
+        self._issue_date = issue_date or datetime.now().date()
         self._items = []
+        self._subtotal = 0
+        self._discount_item = None
         self._total_amount = 0
         self._update_invoice()
     
@@ -97,50 +224,87 @@ class Invoice:
     def get_items(self):
         return self._items
     
+    def get_subtotal(self):
+        return self._subtotal
+    
+    def get_discount(self):
+        return -self._discount_item['amount'] if self._discount_item is not None else 0
+    
     def get_total_amount(self):
         return self._total_amount
     
+    def _build_items(self):
+        """Compute the full item list and subtotal from the booking"""
+        items = charge_items(self._booking)
+        return items, sum(item['amount'] for item in items)
+    
+    def _calculate_discount(self, subtotal):
+        loyalty_program = self._booking.get_guest().get_loyalty_program()
+        if not loyalty_program:
+            return 0
+        return min(loyalty_program.get_points() * 0.1, subtotal * 0.2)
+    
+    def _apply_discount(self):
+        """Refresh the trailing loyalty discount line and the total"""
+        discount = self._calculate_discount(self._subtotal)
+        if discount > 0:
+            if self._discount_item is None:
+                self._discount_item = {'description': "Loyalty Discount", 'amount': 0}
+                self._items.append(self._discount_item)
+            self._discount_item['amount'] = -discount
+            self._total_amount = self._subtotal - discount
+        else:
+            if self._discount_item is not None:
+                self._items.pop()
+                self._discount_item = None
+            self._total_amount = self._subtotal
+    
     def _update_invoice(self):
-        self._items = []
-        nights = self._booking.calculate_stay_duration()
-        room_total = nights * self._booking.get_room().get_price_per_night()
-        self._items.append({
-            'description': f"Room {self._booking.get_room().get_room_number()} ({nights} nights)",
-            'amount': room_total
-        })
-        
-        for service in self._booking.get_additional_services():
-            self._items.append({
-                'description': service.get_description(),
-                'amount': service.get_price()
-            })
-        
-        self._total_amount = sum(item['amount'] for item in self._items)
-        
-        if self._booking.get_guest().get_loyalty_program():
-            discount = min(self._booking.get_guest().get_loyalty_program().get_points() * 0.1, 
-                          self._total_amount * 0.2)
-            if discount > 0:
-                self._items.append({
-                    'description': "Loyalty Discount",
-                    'amount': -discount
-                })
-                self._total_amount -= discount
+        self._items, self._subtotal = self._build_items()
+        self._discount_item = None
+        self._apply_discount()
     
     def update_invoice(self):
         self._update_invoice()
     
+    def recompute(self):
+        """Rebuild every line from the booking"""
+        self._update_invoice()
+    
+    def add_service_charge(self, service):
+        """Append a service line and adjust subtotal and discount in O(1)"""
+        item = {'description': service.get_description(), 'amount': service.get_price()}
+        if self._discount_item is None:
+            self._items.append(item)
+        else:
+            self._items.insert(len(self._items) - 1, item)
+        self._subtotal += item['amount']
+        self._apply_discount()
+    
+    def check_consistency(self, tolerance=1e-6):
+        """Compare the incrementally maintained lines against a full rebuild"""
+        items, subtotal = self._build_items()
+        discount = self._calculate_discount(subtotal)
+        if discount > 0:
+            items.append({'description': "Loyalty Discount", 'amount': -discount})
+        else:
+            discount = 0
+        if len(items) != len(self._items):
+            return False
+        for expected, actual in zip(items, self._items):
+            if (expected['description'] != actual['description']
+                    or abs(expected['amount'] - actual['amount']) > tolerance):
+                return False
+        return abs((subtotal - discount) - self._total_amount) <= tolerance
+    
     def __str__(self):
-        invoice_str = (f"Invoice {self._invoice_number}\n"
-                      f"Issue Date: {self._issue_date}\n"
-                      f"Guest: {self._booking.get_guest().get_name()}\n"
-                      f"Room: {self._booking.get_room().get_room_number()}\n"
-                      f"Check-in: {self._booking.get_check_in_date()}\n"
-                      f"Check-out: {self._booking.get_check_out_date()}\n\n"
-                      f"Items:\n")
-        
-        for item in self._items:
-            invoice_str += f"{item['description']:50} ${item['amount']:8.2f}\n"
-        
-        invoice_str += f"\n{'Total Amount':50} ${self._total_amount:8.2f}"
-        return invoice_str
\ No newline at end of file
+        parts = [f"Invoice {self._invoice_number}\n"
+                 f"Issue Date: {self._issue_date}\n"
+                 f"Guest: {self._booking.get_guest().get_name()}\n"
+                 f"Room: {self._booking.get_room().get_room_number()}\n"
+                 f"Check-in: {self._booking.get_check_in_date()}\n"
+                 f"Check-out: {self._booking.get_check_out_date()}\n\n"
+                 f"Items:\n"]
+        parts.extend(f"{item['description']:50} ${item['amount']:8.2f}\n" for item in self._items)
+        parts.append(f"\n{'Total Amount':50} ${self._total_amount:8.2f}")
+        return "".join(parts)
\ No newline at end of file
@@ -0,0 +1,131 @@
+import csv
+import json
+import time
+from datetime import date
+from itertools import islice
+from room import StandardRoom, DeluxeRoom, Suite
+from guest import Guest
+from booking import Booking
+
+ROOM_CLASSES = {'standard': StandardRoom, 'deluxe': DeluxeRoom, 'suite': Suite}
+
+# A missing column, an empty JSON value or text that does not parse as the field's type
+ROW_ERRORS = (KeyError, TypeError, ValueError)
+
+def _reason(error):
+    if isinstance(error, KeyError):
+        return f"Missing field {error.args[0]}"
+    return str(error)
+
+def _iter_rows(path):
+    """Stream rows from a CSV or JSON-lines file as dicts"""
+    with open(path, newline='', encoding='utf-8') as source:
+        if path.endswith('.csv'):
+            yield from csv.DictReader(source)
+        elif path.endswith(('.jsonl', '.ndjson')):
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ValueError(f"Unsupported import format: {path}")
+
+def iter_chunks(path, chunk_size):
+    rows = _iter_rows(path)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def print_progress(kind, rows, elapsed):
+    rate = rows / elapsed if elapsed else 0
+    print(f"{kind}: {rows} rows loaded ({rate:,.0f} rows/s)")
+
+class BulkLoader:
+    """Chunked importer for rooms, guests and bookings.
+    
+    Rows are read and turned into domain objects one chunk at a time and
+    handed to the hotel, which defers booking index maintenance until the
+    whole file is loaded and then builds the indexes in a single pass.
+    """
+    
+    def __init__(self, hotel, chunk_size=10000, progress=None):
+        self._hotel = hotel
+        self._chunk_size = chunk_size
+        self._progress = progress
+        self._rejected = []
+    
+    def get_rejected(self):
+        """(kind, row or object, reason) for rows that could not be imported"""
+        return self._rejected
+    
+    def _load(self, kind, path, build_chunk, import_chunk):
+        started = time.perf_counter()
+        loaded = 0
+        try:
+            for rows in iter_chunks(path, self._chunk_size):
+                for item, reason in import_chunk(build_chunk(rows)):
+                    self._rejected.append((kind, item, reason))
+                loaded += len(rows)
+                if self._progress:
+                    self._progress(kind, loaded, time.perf_counter() - started)
+        finally:
+            # Whatever was imported before a failure still gets indexed
+            self._hotel.finish_import()
+        return loaded
+    
+    def load_rooms(self, path):
+        return self._load('rooms', path, self._build_rooms, self._hotel.import_rooms)
+    
+    def load_guests(self, path):
+        return self._load('guests', path, self._build_guests, self._hotel.import_guests)
+    
+    def load_bookings(self, path):
+        return self._load('bookings', path, self._build_bookings, self._hotel.import_bookings)
+    
+    def _build_rooms(self, rows):
+        rooms = []
+        for row in rows:
+            try:
+                room_class = ROOM_CLASSES.get(str(row['room_type']).strip().lower())
+                if room_class is None:
+                    self._rejected.append(('rooms', row, "Unknown room type"))
+                    continue
+                rooms.append(room_class(str(row['room_number']), float(row['price_per_night'])))
+            except ROW_ERRORS as error:
+                self._rejected.append(('rooms', row, _reason(error)))
+        return rooms
+    
+    def _build_guests(self, rows):
+        guests = []
+        for row in rows:
+            try:
+                guest = Guest(row['name'], row['email'], row.get('phone'), row.get('address') or None)
+                points = row.get('loyalty_points')
+                if points not in (None, ''):
+                    guest.enroll_in_loyalty_program().set_points(int(points))
+            except ROW_ERRORS as error:
+                self._rejected.append(('guests', row, _reason(error)))
+                continue
+            guests.append(guest)
+        return guests
+    
+    def _build_bookings(self, rows):
+        bookings = []
+        for row in rows:
+            try:
+                guest = self._hotel.find_guest_by_email(row['guest_email'])
+                room = self._hotel.get_room_by_number(str(row['room_number']))
+                if guest is None or room is None:
+                    self._rejected.append(('bookings', row, "Unknown guest or room"))
+                    continue
+                booking = Booking(guest, room, date.fromisoformat(row['check_in']),
+                                  date.fromisoformat(row['check_out']))
+                status = row.get('status')
+                if status:
+                    booking.set_status(status)
+            except ROW_ERRORS as error:
+                self._rejected.append(('bookings', row, _reason(error)))
+                continue
+            bookings.append(booking)
+        return bookings
@@ -0,0 +1,100 @@
+import threading
+from contextlib import contextmanager
+
+class LockStripes:
+    """Fixed pool of locks shared out by key.
+    
+    Work on different keys usually lands on different locks and proceeds in
+    parallel, while work on the same key is always serialized.
+    """
+    
+    __slots__ = ('_locks', '_shift')
+    
+    def __init__(self, stripes=256, reentrant=False):
+        if stripes < 1 or stripes & (stripes - 1):
+            raise ValueError("Stripe count must be a power of two")
+        lock_type = threading.RLock if reentrant else threading.Lock
+        self._locks = tuple(lock_type() for _ in range(stripes))
+        self._shift = 64 - (stripes.bit_length() - 1)
+    
+    def _index(self, key):
+        # Fibonacci hashing: object ids are 16-byte aligned, so their low bits are
+        # always zero and a plain modulo would only ever pick a few stripes
+        return ((hash(key) * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> self._shift
+    
+    def lock_for(self, key):
+        return self._locks[self._index(key)]
+    
+    @contextmanager
+    def hold(self, *keys):
+        """Hold the locks of several keys at once, taken in stripe order so two holders cannot deadlock"""
+        locks = [self._locks[index] for index in sorted({self._index(key) for key in keys})]
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+class SharedLock:
+    """Lock held either shared, by any number of threads, or exclusively by one.
+    
+    Shared holds are reentrant within a thread. A thread waiting for the
+    exclusive hold keeps new shared holders out, so it is not starved.
+    """
+    
+    __slots__ = ('_condition', '_holders', '_exclusive', '_waiting', '_local')
+    
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._holders = 0
+        self._exclusive = False
+        self._waiting = 0
+        self._local = threading.local()
+    
+    def is_held(self):
+        """Whether the calling thread holds the lock shared"""
+        return getattr(self._local, 'depth', 0) > 0
+    
+    @contextmanager
+    def shared(self):
+        depth = getattr(self._local, 'depth', 0)
+        if not depth:
+            with self._condition:
+                while self._exclusive or self._waiting:
+                    self._condition.wait()
+                self._holders += 1
+        self._local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            if not depth:
+                with self._condition:
+                    self._holders -= 1
+                    if not self._holders:
+                        self._condition.notify_all()
+    
+    @contextmanager
+    def exclusive(self):
+        if self.is_held():
+            raise RuntimeError("Cannot take the exclusive hold while holding the lock shared")
+        with self._condition:
+            self._waiting += 1
+            try:
+                while self._exclusive or self._holders:
+                    self._condition.wait()
+            finally:
+                self._waiting -= 1
+            self._exclusive = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._exclusive = False
+                self._condition.notify_all()
+
+# Guards check-then-insert on every RoomSchedule, keyed by schedule identity; reentrant
+# so a booking can hold its room's lock across a release and reserve
+room_locks = LockStripes(reentrant=True)
@@ -0,0 +1,160 @@
+import heapq
+import itertools
+import threading
+from datetime import datetime, timedelta
+from service import Housekeeping, RoomService, Transportation
+
+DEPARTMENTS = {
+    Housekeeping: 'housekeeping',
+    RoomService: 'kitchen',
+    Transportation: 'concierge',
+}
+
+# Time allowed from request to the start of work
+DEFAULT_SLA = {
+    'housekeeping': timedelta(hours=4),
+    'kitchen': timedelta(minutes=45),
+    'concierge': timedelta(minutes=30),
+}
+
+def department_for(service):
+    for service_class, department in DEPARTMENTS.items():
+        if isinstance(service, service_class):
+            return department
+    raise ValueError("Invalid service type")
+
+class WorkerPool:
+    """Simulated staff for one department.
+    
+    Each member works on one request at a time for `service_time` (a
+    timedelta, or a callable taking the request). Subclasses can override
+    capacity() and assign() to model shifts or skill-based routing.
+    """
+    
+    def __init__(self, staff, service_time=timedelta(minutes=20)):
+        if staff < 1:
+            raise ValueError("A worker pool needs at least one member of staff")
+        self._staff = staff
+        self._service_time = service_time
+        # Times at which busy staff finish, with the request they are working on
+        self._busy = []
+        self._sequence = itertools.count()
+    
+    def get_staff(self):
+        return self._staff
+    
+    def get_busy(self):
+        return len(self._busy)
+    
+    def _duration(self, request):
+        if callable(self._service_time):
+            return self._service_time(request)
+        return self._service_time
+    
+    def release(self, now):
+        """Complete every request finishing by `now` and return them"""
+        finished = []
+        while self._busy and self._busy[0][0] <= now:
+            finished.append(heapq.heappop(self._busy)[2])
+        for request in finished:
+            request.complete_service()
+        return finished
+    
+    def capacity(self, now):
+        return self._staff - len(self._busy)
+    
+    def assign(self, requests, now):
+        for request in requests:
+            request.set_status("In Progress")
+            heapq.heappush(self._busy, (now + self._duration(request), next(self._sequence), request))
+
+class _DepartmentQueue:
+    __slots__ = ('heap', 'lock', 'waits', 'breaches')
+    
+    def __init__(self):
+        self.heap = []
+        self.lock = threading.Lock()
+        self.waits = []
+        self.breaches = 0
+
+class ServiceDispatcher:
+    """Per-department priority queues of service requests ordered by SLA deadline.
+    
+    submit() is O(log n) and dispatch() hands each department's pool as many
+    of the most urgent requests as it has free staff, up to `batch_size`, in
+    one call. Time is passed in explicitly so rush periods can be simulated;
+    it defaults to the wall clock.
+    """
+    
+    def __init__(self, pools, sla=None, batch_size=50):
+        self._pools = dict(pools)
+        self._sla = dict(DEFAULT_SLA, **(sla or {}))
+        self._batch_size = batch_size
+        self._queues = {department: _DepartmentQueue() for department in self._pools}
+        self._sequence = itertools.count()
+    
+    def get_pool(self, department):
+        return self._pools[department]
+    
+    def get_departments(self):
+        return list(self._pools)
+    
+    def check(self, service):
+        """Raise ValueError if no department here can take the request; returns the department"""
+        department = department_for(service)
+        if department not in self._queues:
+            raise ValueError(f"No worker pool for {department}")
+        return department
+    
+    def submit(self, service, now=None):
+        """Queue a request; returns its SLA deadline"""
+        department = self.check(service)
+        queued_at = service.get_request_date() if now is None else now
+        deadline = queued_at + self._sla[department]
+        queue = self._queues[department]
+        with queue.lock:
+            heapq.heappush(queue.heap, (deadline, next(self._sequence), service, queued_at))
+        return deadline
+    
+    def dispatch(self, now=None):
+        """Finish completed work and assign queued requests; returns {department: [requests]}"""
+        if now is None:
+            now = datetime.now()
+        assigned = {}
+        for department, pool in self._pools.items():
+            queue = self._queues[department]
+            with queue.lock:
+                pool.release(now)
+                count = min(pool.capacity(now), self._batch_size, len(queue.heap))
+                if count <= 0:
+                    continue
+                batch = [heapq.heappop(queue.heap) for _ in range(count)]
+                for deadline, _, _, queued_at in batch:
+                    queue.waits.append((now - queued_at).total_seconds())
+                    if now > deadline:
+                        queue.breaches += 1
+                requests = [entry[2] for entry in batch]
+                pool.assign(requests, now)
+            assigned[department] = requests
+        return assigned
+    
+    def get_queue_depth(self, department=None):
+        if department is not None:
+            return len(self._queues[department].heap)
+        return {name: len(queue.heap) for name, queue in self._queues.items()}
+    
+    def get_wait_stats(self, department):
+        """Count, SLA breaches and mean/p50/p95 wait in seconds for assigned requests"""
+        queue = self._queues[department]
+        with queue.lock:
+            waits = sorted(queue.waits)
+            breaches = queue.breaches
+        if not waits:
+            return {'count': 0, 'breaches': 0, 'mean': 0.0, 'p50': 0.0, 'p95': 0.0}
+        return {
+            'count': len(waits),
+            'breaches': breaches,
+            'mean': sum(waits) / len(waits),
+            'p50': waits[len(waits) // 2],
+            'p95': waits[min(int(len(waits) * 0.95), len(waits) - 1)],
+        }
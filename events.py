@@ -0,0 +1,378 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+_now = time.time
+
+class BackpressureError(Exception):
+    """Raised when an event cannot be queued for a subscriber that is full"""
+
+class Event:
+    """Base class for domain events; `occurred_at` is a Unix timestamp"""
+    
+    __slots__ = ('occurred_at',)
+    
+    def __init__(self):
+        self.occurred_at = _now()
+
+class BookingCreated(Event):
+    __slots__ = ('booking',)
+    
+    def __init__(self, booking):
+        # Set directly rather than through super(): events are built on the hot path
+        self.occurred_at = _now()
+        self.booking = booking
+
+class BookingCancelled(Event):
+    __slots__ = ('booking',)
+    
+    def __init__(self, booking):
+        self.occurred_at = _now()
+        self.booking = booking
+
+class PaymentProcessed(Event):
+    __slots__ = ('booking', 'payment', 'payment_method')
+    
+    def __init__(self, booking, payment, payment_method):
+        self.occurred_at = _now()
+        self.booking = booking
+        self.payment = payment
+        self.payment_method = payment_method
+
+class GroupPaymentProcessed(PaymentProcessed):
+    """A payment against a group's master invoice; `booking` is None"""
+    
+    __slots__ = ('group',)
+    
+    def __init__(self, group, payment, payment_method):
+        self.occurred_at = _now()
+        self.booking = None
+        self.group = group
+        self.payment = payment
+        self.payment_method = payment_method
+
+class ServiceRequested(Event):
+    __slots__ = ('booking', 'service')
+    
+    def __init__(self, booking, service):
+        self.occurred_at = _now()
+        self.booking = booking
+        self.service = service
+
+class FeedbackSubmitted(Event):
+    __slots__ = ('feedback',)
+    
+    def __init__(self, feedback):
+        self.occurred_at = _now()
+        self.feedback = feedback
+
+class PointsEarned(Event):
+    __slots__ = ('program', 'points', 'balance')
+    
+    def __init__(self, program, points, balance):
+        self.occurred_at = _now()
+        self.program = program
+        self.points = points
+        self.balance = balance
+
+class Subscription:
+    """A synchronous subscriber, called on the publishing thread.
+    
+    With no batch size the handler gets each event as it is published;
+    with one it gets lists of that many events, and flush() hands over a
+    partial batch. Handler exceptions are counted, not raised, so a
+    failing subscriber cannot break the operation that published.
+    """
+    
+    def __init__(self, handler, event_types, batch_size=None):
+        self._handler = handler
+        self._event_types = tuple(event_types)
+        self._batch_size = batch_size
+        self._pending = []
+        self._lock = threading.Lock()
+        self._delivered = 0
+        self._errors = 0
+    
+    def get_event_types(self):
+        return self._event_types
+    
+    def get_delivered(self):
+        return self._delivered
+    
+    def get_errors(self):
+        return self._errors
+    
+    def _call(self, payload, count):
+        try:
+            self._handler(payload)
+        except Exception:
+            self._errors += 1
+        self._delivered += count
+    
+    def deliver(self, event):
+        if self._batch_size is None:
+            self._call(event, 1)
+            return
+        with self._lock:
+            self._pending.append(event)
+            if len(self._pending) < self._batch_size:
+                return
+            batch = self._pending
+            self._pending = []
+        self._call(batch, len(batch))
+    
+    def flush(self):
+        with self._lock:
+            batch = self._pending
+            self._pending = []
+        if batch:
+            self._call(batch, len(batch))
+    
+    def pending(self):
+        return len(self._pending)
+
+class AsyncSubscription(Subscription):
+    """A coroutine subscriber fed in micro-batches from a bounded buffer.
+    
+    Publishing appends to the buffer and, only when it was empty, wakes the
+    consumer task on the bus's event loop, which waits up to `max_delay`
+    for a batch to fill and then awaits handler(batch). When `capacity`
+    events are waiting, `overflow` decides: 'block' makes publishers on
+    other threads wait for room, 'drop' discards the new event and 'error'
+    raises BackpressureError. A publisher on the loop's own thread cannot
+    wait for its consumer, so it gets BackpressureError instead of blocking.
+    """
+    
+    OVERFLOW_POLICIES = ('block', 'drop', 'error')
+    
+    def __init__(self, handler, event_types, batch_size=100, max_delay=0.005, capacity=10000, overflow='block'):
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"Overflow policy must be one of {', '.join(self.OVERFLOW_POLICIES)}")
+        super().__init__(handler, event_types, batch_size)
+        self._max_delay = max_delay
+        self._capacity = capacity
+        self._overflow = overflow
+        self._buffer = deque()
+        self._not_full = threading.Condition(self._lock)
+        self._dropped = 0
+        self._loop = None
+        self._loop_thread = None
+        self._wakeup = None
+        self._idle = None
+        self._task = None
+    
+    def get_dropped(self):
+        return self._dropped
+    
+    def pending(self):
+        return len(self._buffer)
+    
+    def start(self, loop):
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task = loop.create_task(self._consume())
+        if self._buffer:
+            self._wakeup.set()
+    
+    def deliver(self, event):
+        with self._not_full:
+            if len(self._buffer) >= self._capacity:
+                if self._overflow == 'drop':
+                    self._dropped += 1
+                    return
+                if self._overflow == 'error' or self._loop is None or threading.get_ident() == self._loop_thread:
+                    raise BackpressureError(f"Subscriber buffer is full ({self._capacity} events)")
+                while len(self._buffer) >= self._capacity:
+                    self._not_full.wait()
+            self._buffer.append(event)
+            wake = len(self._buffer) == 1
+        if wake and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake)
+    
+    def _wake(self):
+        self._idle.clear()
+        self._wakeup.set()
+    
+    def _take(self):
+        with self._not_full:
+            count = min(len(self._buffer), self._batch_size)
+            batch = [self._buffer.popleft() for _ in range(count)]
+            self._not_full.notify_all()
+            return batch
+    
+    async def _consume(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if self._max_delay and len(self._buffer) < self._batch_size:
+                # Give a micro-batch the chance to fill before the first delivery
+                await asyncio.sleep(self._max_delay)
+            while True:
+                batch = self._take()
+                if not batch:
+                    break
+                try:
+                    await self._handler(batch)
+                except Exception:
+                    self._errors += 1
+                self._delivered += len(batch)
+            if not self._buffer:
+                self._idle.set()
+    
+    def flush(self):
+        """Nothing to do synchronously; use `await EventBus.drain()` instead"""
+    
+    async def drain(self):
+        if self._task is None:
+            return
+        while self._buffer or not self._idle.is_set():
+            if self._buffer:
+                self._wake()
+            await self._idle.wait()
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._loop = None
+        self._loop_thread = None
+
+class EventBus:
+    """In-process publish/subscribe for domain events.
+    
+    Subscriptions name event classes and also receive their subclasses.
+    The subscriber list per concrete event type is resolved once and
+    cached, and emit() builds the event only if someone is listening, so
+    an unobserved event costs one dictionary lookup on the hot path.
+    Async subscribers run on the loop passed to start().
+    """
+    
+    def __init__(self):
+        self._subscriptions = ()
+        self._routes = {}
+        self._loop = None
+        self._missed = 0
+        self._lock = threading.Lock()
+    
+    def get_missed(self):
+        """Deliveries skipped by offer() because a subscriber was full"""
+        return self._missed
+    
+    def _route(self, event_type):
+        routes = tuple(subscription for subscription in self._subscriptions
+                       if issubclass(event_type, subscription.get_event_types()))
+        self._routes[event_type] = routes
+        return routes
+    
+    def _add(self, subscription):
+        with self._lock:
+            self._subscriptions += (subscription,)
+            self._routes = {}
+        return subscription
+    
+    def subscribe(self, handler, event_types=(Event,), batch_size=None):
+        """Call handler(event), or handler(list of events) when batch_size is set, on the publishing thread"""
+        return self._add(Subscription(handler, event_types, batch_size))
+    
+    def subscribe_async(self, handler, event_types=(Event,), batch_size=100, max_delay=0.005, capacity=10000,
+                        overflow='block'):
+        """Await handler(list of events) on the bus's event loop; see AsyncSubscription"""
+        subscription = AsyncSubscription(handler, event_types, batch_size, max_delay, capacity, overflow)
+        if self._loop is not None:
+            subscription.start(self._loop)
+        return self._add(subscription)
+    
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions = tuple(existing for existing in self._subscriptions if existing is not subscription)
+            self._routes = {}
+        subscription.flush()
+    
+    def has_subscribers(self, event_type):
+        routes = self._routes.get(event_type)
+        if routes is None:
+            routes = self._route(event_type)
+        return bool(routes)
+    
+    def publish(self, event):
+        routes = self._routes.get(type(event))
+        if routes is None:
+            routes = self._route(type(event))
+        for subscription in routes:
+            subscription.deliver(event)
+    
+    def emit(self, event_type, *args):
+        """Build and publish an event only if some subscriber wants it"""
+        routes = self._routes.get(event_type)
+        if routes is None:
+            routes = self._route(event_type)
+        if routes:
+            event = event_type(*args)
+            for subscription in routes:
+                subscription.deliver(event)
+    
+    def offer(self, event_type, *args):
+        """Like emit(), but a full subscriber misses the event instead of raising BackpressureError.
+        
+        For publishers reporting a change that has already been committed,
+        which must not fail because a consumer is slow. 'block' subscribers
+        still make publishers on other threads wait. Returns how many
+        subscribers missed the event.
+        """
+        routes = self._routes.get(event_type)
+        if routes is None:
+            routes = self._route(event_type)
+        if not routes:
+            return 0
+        event = event_type(*args)
+        missed = 0
+        for subscription in routes:
+            try:
+                subscription.deliver(event)
+            except BackpressureError:
+                missed += 1
+        if missed:
+            with self._lock:
+                self._missed += missed
+        return missed
+    
+    def flush(self):
+        """Hand partial batches to synchronous batched subscribers"""
+        for subscription in self._subscriptions:
+            subscription.flush()
+    
+    async def start(self):
+        """Start the async subscribers on the running event loop"""
+        self._loop = asyncio.get_running_loop()
+        for subscription in self._subscriptions:
+            if isinstance(subscription, AsyncSubscription):
+                subscription.start(self._loop)
+    
+    async def drain(self):
+        """Flush sync batches and wait until every async subscriber has caught up"""
+        self.flush()
+        for subscription in self._subscriptions:
+            if isinstance(subscription, AsyncSubscription):
+                await subscription.drain()
+    
+    async def stop(self):
+        await self.drain()
+        for subscription in self._subscriptions:
+            if isinstance(subscription, AsyncSubscription):
+                await subscription.stop()
+        self._loop = None
+    
+    async def __aenter__(self):
+        await self.start()
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.stop()
@@ -3,6 +3,9 @@ from datetime import datetime
 class Feedback:
     """Class representing guest feedback"""
     
+    __slots__ = ('_guest', '_rating', '_comments', '_date', '_stay_date', '_response',
+                 '_feedback_id', '_change_listeners')
+    
     def __init__(self, guest, rating, comments, stay_date=None):
         """Initialize feedback"""
         self._guest = guest
@@ -11,8 +14,13 @@ class Feedback:
         self._date = datetime.now().date()
         self._stay_date = stay_date if stay_date else self._date
         self._response = None
+        self._feedback_id = None
+        self._change_listeners = ()
     
     # getters
+    def get_feedback_id(self):
+        return self._feedback_id
+    
     def get_guest(self):
         return self._guest
     
@@ -32,22 +40,42 @@ class Feedback:
         return self._response
     
     # Setters
+    def set_feedback_id(self, feedback_id):
+        self._feedback_id = feedback_id
+    
     def set_guest(self, guest):
         self._guest = guest
     
+    def set_date(self, feedback_date):
+        self._date = feedback_date
+    
     def set_rating(self, rating):
         if not 1 <= rating <= 5:
             raise ValueError("Rating must be between 1 and 5")
+        old_rating = self._rating
         self._rating = rating
+        self._notify('rating', old_rating)
     
     def set_comments(self, comments):
+        old_comments = self._comments
         self._comments = comments
+        self._notify('comments', old_comments)
     
     def set_response(self, response_text):
+        old_response = self._response
         self._response = response_text
+        self._notify('response', old_response)
     
     def add_response(self, response_text):
-        self._response = response_text
+        self.set_response(response_text)
+    
+    def add_change_listener(self, listener):
+        """Register a callable invoked as listener(feedback, field, old_value)"""
+        self._change_listeners += (listener,)
+    
+    def _notify(self, field, old_value):
+        for listener in self._change_listeners:
+            listener(self, field, old_value)
     
     def __str__(self):
         feedback_str = (f"Feedback from {self._guest.get_name()}\n"
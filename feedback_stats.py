@@ -0,0 +1,127 @@
+import math
+import threading
+from datetime import timedelta
+
+class RatingStats:
+    """Count, running mean/variance (Welford) and 1-5 star histogram for a set of ratings"""
+    
+    __slots__ = ('_count', '_mean', '_m2', '_histogram')
+    
+    def __init__(self):
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._histogram = [0] * 6
+    
+    def add(self, rating):
+        self._count += 1
+        delta = rating - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (rating - self._mean)
+        self._histogram[rating] += 1
+    
+    def remove(self, rating):
+        self._histogram[rating] -= 1
+        self._count -= 1
+        if self._count == 0:
+            self._mean = 0.0
+            self._m2 = 0.0
+            return
+        delta = rating - self._mean
+        self._mean -= delta / self._count
+        self._m2 = max(self._m2 - delta * (rating - self._mean), 0.0)
+    
+    def get_count(self):
+        return self._count
+    
+    def get_mean(self):
+        return self._mean
+    
+    def get_variance(self):
+        """Population variance of the ratings"""
+        return self._m2 / self._count if self._count else 0.0
+    
+    def get_stddev(self):
+        return math.sqrt(self.get_variance())
+    
+    def get_histogram(self):
+        """Number of ratings per star, keyed 1-5"""
+        return {stars: self._histogram[stars] for stars in range(1, 6)}
+    
+    def summary(self):
+        return {
+            'count': self._count,
+            'mean': self._mean,
+            'variance': self.get_variance(),
+            'histogram': self.get_histogram(),
+        }
+
+def week_start(day):
+    """Monday of the ISO week containing `day`"""
+    return day - timedelta(days=day.weekday())
+
+class FeedbackAggregates:
+    """Rating aggregates kept up to date as feedback is submitted or re-rated.
+    
+    Overall, per-stay-day and per-week RatingStats are adjusted in O(1) on
+    every change, so summaries cost O(1) and trends O(buckets) no matter how
+    many reviews exist.
+    """
+    
+    def __init__(self):
+        self._overall = RatingStats()
+        self._by_day = {}
+        self._by_week = {}
+        self._lock = threading.Lock()
+        self._change_listener = self._on_change
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+    
+    def _buckets(self, stay_date):
+        day = self._by_day.get(stay_date)
+        if day is None:
+            day = self._by_day[stay_date] = RatingStats()
+        week = self._by_week.get(week_start(stay_date))
+        if week is None:
+            week = self._by_week[week_start(stay_date)] = RatingStats()
+        return self._overall, day, week
+    
+    def add(self, feedback):
+        with self._lock:
+            for stats in self._buckets(feedback.get_stay_date()):
+                stats.add(feedback.get_rating())
+        feedback.add_change_listener(self._change_listener)
+    
+    def _on_change(self, feedback, field, old_value):
+        if field != 'rating':
+            return
+        with self._lock:
+            for stats in self._buckets(feedback.get_stay_date()):
+                stats.remove(old_value)
+                stats.add(feedback.get_rating())
+    
+    def get_summary(self):
+        with self._lock:
+            return self._overall.summary()
+    
+    def _range(self, buckets, keys):
+        with self._lock:
+            return [(key, buckets[key].summary()) for key in keys if key in buckets]
+    
+    def get_daily(self, start, end):
+        """Summaries for each stay day in [start, end) that has feedback"""
+        return self._range(self._by_day, (start + timedelta(days=offset)
+                                          for offset in range((end - start).days)))
+    
+    def get_weekly(self, start, end):
+        """Summaries for each week (keyed by its Monday) overlapping [start, end)"""
+        first = week_start(start)
+        return self._range(self._by_week, (first + timedelta(weeks=offset)
+                                           for offset in range(((end - first).days + 6) // 7)))
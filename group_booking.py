@@ -0,0 +1,192 @@
+from datetime import datetime
+from booking import charge_items
+from ids import next_id
+
+class MasterInvoice:
+    """One invoice for a block of bookings, with each room's charges as a sub-line group.
+    
+    Lines are kept per booking and refreshed from the booking's change
+    events, so a change to one room re-totals that room only. Cancelled
+    rooms drop off the invoice. The organizer's loyalty discount is applied
+    once, to the group subtotal.
+    """
+    
+    __slots__ = ('_group', '_invoice_number', '_issue_date', '_lines', '_subtotal', '_discount',
+                 '_total_amount', '_change_listener')
+    
+    def __init__(self, group, invoice_number=None, issue_date=None):
+        self._group = group
+        self._invoice_number = invoice_number or f"INV-{next_id()}"
+        self._issue_date = issue_date or datetime.now().date()
+        # booking id -> {'booking_id', 'room_number', 'items', 'amount'}
+        self._lines = {}
+        self._subtotal = 0
+        self._discount = 0
+        self._total_amount = 0
+        self._change_listener = self._on_change
+        for booking in group.get_bookings():
+            self._set_line(booking)
+            booking.add_change_listener(self._change_listener)
+        self._apply_discount()
+    
+    def get_group(self):
+        return self._group
+    
+    def get_invoice_number(self):
+        return self._invoice_number
+    
+    def get_issue_date(self):
+        return self._issue_date
+    
+    def get_lines(self):
+        return list(self._lines.values())
+    
+    def get_subtotal(self):
+        return self._subtotal
+    
+    def get_discount(self):
+        return self._discount
+    
+    def get_total_amount(self):
+        return self._total_amount
+    
+    @staticmethod
+    def _build_line(booking):
+        items = charge_items(booking)
+        return {
+            'booking_id': booking.get_booking_id(),
+            'room_number': booking.get_room().get_room_number(),
+            'items': items,
+            'amount': sum(item['amount'] for item in items),
+        }
+    
+    def _set_line(self, booking):
+        old = self._lines.get(booking.get_booking_id())
+        if old is not None:
+            self._subtotal -= old['amount']
+        if booking.get_status() == "Cancelled":
+            self._lines.pop(booking.get_booking_id(), None)
+        else:
+            # Replacing in place keeps the lines in room order
+            line = self._build_line(booking)
+            self._lines[booking.get_booking_id()] = line
+            self._subtotal += line['amount']
+    
+    def _calculate_discount(self, subtotal):
+        loyalty_program = self._group.get_guest().get_loyalty_program()
+        if not loyalty_program:
+            return 0
+        return min(loyalty_program.get_points() * 0.1, subtotal * 0.2)
+    
+    def _apply_discount(self):
+        self._discount = max(self._calculate_discount(self._subtotal), 0)
+        self._total_amount = self._subtotal - self._discount
+    
+    def _on_change(self, booking, field, old_value):
+        if field in ('room', 'check_in_date', 'check_out_date', 'status', 'room_total', 'service'):
+            self._set_line(booking)
+            self._apply_discount()
+    
+    def update_invoice(self):
+        """Rebuild every line from the bookings"""
+        self._lines = {}
+        self._subtotal = 0
+        for booking in self._group.get_bookings():
+            self._set_line(booking)
+        self._apply_discount()
+    
+    def check_consistency(self, tolerance=1e-6):
+        """Compare the incrementally maintained lines against a full rebuild"""
+        expected = [self._build_line(booking) for booking in self._group.get_bookings()
+                    if booking.get_status() != "Cancelled"]
+        if {line['booking_id'] for line in expected} != set(self._lines):
+            return False
+        subtotal = sum(line['amount'] for line in expected)
+        for line in expected:
+            if abs(line['amount'] - self._lines[line['booking_id']]['amount']) > tolerance:
+                return False
+        total = subtotal - max(self._calculate_discount(subtotal), 0)
+        return abs(subtotal - self._subtotal) <= tolerance and abs(total - self._total_amount) <= tolerance
+    
+    def __str__(self):
+        parts = [f"Invoice {self._invoice_number}\n"
+                 f"Issue Date: {self._issue_date}\n"
+                 f"Group: {self._group.get_name()}\n"
+                 f"Organizer: {self._group.get_guest().get_name()}\n"
+                 f"Check-in: {self._group.get_check_in_date()}\n"
+                 f"Check-out: {self._group.get_check_out_date()}\n\n"
+                 f"Rooms:\n"]
+        for line in self._lines.values():
+            parts.append(f"{'Room ' + line['room_number']:50} ${line['amount']:8.2f}\n")
+            parts.extend(f"  {item['description']:48} ${item['amount']:8.2f}\n" for item in line['items'])
+        parts.append(f"\n{'Subtotal':50} ${self._subtotal:8.2f}\n")
+        if self._discount:
+            parts.append(f"{'Loyalty Discount':50} ${-self._discount:8.2f}\n")
+        parts.append(f"{'Total Amount':50} ${self._total_amount:8.2f}")
+        return "".join(parts)
+
+class GroupBooking:
+    """A block of rooms booked together for one stay, billed on one master invoice"""
+    
+    __slots__ = ('_group_id', '_name', '_guest', '_check_in_date', '_check_out_date', '_booking_date',
+                 '_bookings', '_invoice')
+    
+    def __init__(self, group_id, name, guest, check_in_date, check_out_date, bookings, invoice_number=None,
+                 issue_date=None):
+        self._group_id = group_id
+        self._name = name
+        self._guest = guest
+        self._check_in_date = check_in_date
+        self._check_out_date = check_out_date
+        self._booking_date = datetime.now().date()
+        self._bookings = list(bookings)
+        self._invoice = MasterInvoice(self, invoice_number, issue_date)
+    
+    def get_group_id(self):
+        return self._group_id
+    
+    def get_name(self):
+        return self._name
+    
+    def get_guest(self):
+        return self._guest
+    
+    def get_check_in_date(self):
+        return self._check_in_date
+    
+    def get_check_out_date(self):
+        return self._check_out_date
+    
+    def get_booking_date(self):
+        return self._booking_date
+    
+    def set_booking_date(self, booking_date):
+        self._booking_date = booking_date
+    
+    def get_bookings(self):
+        return self._bookings
+    
+    def get_active_bookings(self):
+        return [booking for booking in self._bookings if booking.get_status() != "Cancelled"]
+    
+    def get_invoice(self):
+        return self._invoice
+    
+    def get_room_counts(self):
+        """Active rooms per room type"""
+        counts = {}
+        for booking in self.get_active_bookings():
+            room_type = booking.get_room().get_room_type()
+            counts[room_type] = counts.get(room_type, 0) + 1
+        return counts
+    
+    def get_status(self):
+        return "Confirmed" if self.get_active_bookings() else "Cancelled"
+    
+    def __str__(self):
+        counts = ", ".join(f"{count} {room_type}" for room_type, count in sorted(self.get_room_counts().items()))
+        return (f"Group {self._name} for {self._guest.get_name()}\n"
+                f"Rooms: {counts or 'none'}\n"
+                f"Check-in: {self._check_in_date}\n"
+                f"Check-out: {self._check_out_date}\n"
+                f"Status: {self.get_status()}")
@@ -3,6 +3,9 @@ from datetime import datetime
 class Guest:
     """Class representing a hotel guest"""
     
+    __slots__ = ('_name', '_email', '_phone', '_address', '_bookings', '_loyalty_program',
+                 '_registration_date', '_guest_id', '_change_listeners')
+    
     def __init__(self, name, email, phone, address=None):
         """Initialize a guest"""
         self._name = name
@@ -12,8 +15,13 @@ class Guest:
         self._bookings = []
         self._loyalty_program = None
         self._registration_date = datetime.now()
+        self._guest_id = None
+        self._change_listeners = ()
     
     # getters
+    def get_guest_id(self):
+        return self._guest_id
+    
     def get_name(self):
         return self._name
     
@@ -36,18 +44,36 @@ class Guest:
         return self._registration_date
     
     # setters
+    def set_guest_id(self, guest_id):
+        self._guest_id = guest_id
+    
     def set_name(self, name):
         self._name = name
     
     def set_email(self, email):
+        old_email = self._email
         self._email = email
+        self._notify('email', old_email)
     
     def set_phone(self, phone):
+        old_phone = self._phone
         self._phone = phone
+        self._notify('phone', old_phone)
     
     def set_address(self, address):
         self._address = address
     
+    def set_registration_date(self, registration_date):
+        self._registration_date = registration_date
+    
+    def add_change_listener(self, listener):
+        """Register a callable invoked as listener(guest, field, old_value)"""
+        self._change_listeners += (listener,)
+    
+    def _notify(self, field, old_value):
+        for listener in self._change_listeners:
+            listener(self, field, old_value)
+    
     def add_booking(self, booking):
         """Add a booking to the guest's history"""
         self._bookings.append(booking)
@@ -55,6 +81,7 @@ class Guest:
     def enroll_in_loyalty_program(self):
         if not self._loyalty_program:
             self._loyalty_program = LoyaltyProgram()
+            self._notify('loyalty_program', None)
         return self._loyalty_program
     
     def __str__(self):
@@ -67,10 +94,17 @@ class Guest:
 class LoyaltyProgram:
     """Class representing the hotel's loyalty program"""
     
+    __slots__ = ('_points', '_tier', '_free_nights_earned', '_member_id', '_change_listeners')
+    
     def __init__(self):
         self._points = 0
         self._tier = "Basic"
         self._free_nights_earned = 0
+        self._member_id = None
+        self._change_listeners = ()
+    
+    def get_member_id(self):
+        return self._member_id
     
     def get_points(self):
         return self._points
@@ -83,15 +117,19 @@ class LoyaltyProgram:
     
     def add_points(self, points):
         """Add points to the loyalty account"""
+        old_points = self._points
         self._points += points
         self._update_tier()
+        self._notify('earn', old_points)
     
     def redeem_points(self, points):
         """Redeem points for rewards"""
         if points > self._points:
             raise ValueError("Not enough points to redeem")
+        old_points = self._points
         self._points -= points
         self._update_tier()
+        self._notify('redeem', old_points)
     
     def _update_tier(self):
         """Update the loyalty tier based on points"""
@@ -105,14 +143,34 @@ class LoyaltyProgram:
     def earn_free_night(self):
         """Earn a free night when enough points are accumulated"""
         if self._points >= 200:
+            old_points = self._points
             self._points -= 200
             self._free_nights_earned += 1
+            self._notify('free_night', old_points)
             return True
         return False
     
     def set_points(self, points):
+        old_points = self._points
         self._points = points
         self._update_tier()
+        self._notify('adjust', old_points)
+    
+    def set_member_id(self, member_id):
+        self._member_id = member_id
+    
+    def apply_balance(self, points, tier):
+        """Load a balance computed by a batch ledger job without notifying listeners"""
+        self._points = points
+        self._tier = tier
+    
+    def add_change_listener(self, listener):
+        """Register a callable invoked as listener(program, field, old_points)"""
+        self._change_listeners += (listener,)
+    
+    def _notify(self, field, old_points):
+        for listener in self._change_listeners:
+            listener(self, field, old_points)
     
     def set_tier(self, tier):
         self._tier = tier
@@ -1,80 +1,1099 @@
-from datetime import datetime, timedelta
+import functools
+import os
+import threading
+from datetime import date, datetime, timedelta
 from room import StandardRoom, DeluxeRoom, Suite
 from guest import Guest
 from booking import Booking
+from group_booking import GroupBooking
+from assignment import RoomAssignmentPlanner
 from payment import CreditCardPayment, DebitCardPayment, MobileWalletPayment
 from service import Housekeeping, RoomService, Transportation
 from feedback import Feedback
+from occupancy import OccupancyCalendar
+from indexes import GuestIndex, BookingIndex, FeedbackIndex
+from feedback_stats import FeedbackAggregates
+from search import FeedbackSearchIndex
+from loyalty import LoyaltyLedger
+from pricing import PricingEngine
+from reporting import RevenueReports
+from persistence import OperationLog, SnapshotStore
+from billing import run_billing
+from concurrency import SharedLock
+from events import (EventBus, BookingCreated, BookingCancelled, PaymentProcessed, GroupPaymentProcessed,
+                    ServiceRequested, FeedbackSubmitted)
+from export import PAYMENT_METHODS
+from ids import next_id, parse_id
+
+ROOM_CLASSES = {'Standard': StandardRoom, 'Deluxe': DeluxeRoom, 'Suite': Suite}
+PAYMENT_CLASSES = {'CreditCardPayment': CreditCardPayment, 'DebitCardPayment': DebitCardPayment,
+                   'MobileWalletPayment': MobileWalletPayment}
+
+def _encode_date(value):
+    return value.isoformat() if value is not None else None
+
+def _decode_date(value):
+    if value is None:
+        return None
+    if 'T' in value:
+        return datetime.fromisoformat(value)
+    return date.fromisoformat(value)
+
+def _mask_card_number(card_number):
+    return '*' * max(len(card_number) - 4, 0) + card_number[-4:]
+
+def _mask_payment_details(payment_details):
+    """Copy of the payment details that is safe to write to the log"""
+    logged_details = dict(payment_details)
+    if 'card_number' in logged_details:
+        logged_details['card_number'] = _mask_card_number(logged_details['card_number'])
+        logged_details['cvv'] = '***'
+    return logged_details
+
+def _changes_state(method):
+    """Run a HotelSystem method holding the state lock shared, so a checkpoint never
+    snapshots it half done or truncates the log under its entry"""
+    @functools.wraps(method)
+    def changing(self, *args, **kwargs):
+        with self._state_lock.shared():
+            result = method(self, *args, **kwargs)
+        self._checkpoint_if_due()
+        return result
+    return changing
+
+def _restore_service(row, room):
+    """Rebuild a service request from its repository row"""
+    request_date = _decode_date(row['request_date'])
+    if row['service_type'] == 'Housekeeping':
+        service = Housekeeping(request_date, room, row['description'].rsplit(' Cleaning', 1)[0])
+    elif row['service_type'] == 'RoomService':
+        # The ordered items are not stored, only the price they came to
+        service = RoomService(request_date, room, [])
+    elif row['service_type'] == 'Transportation':
+        vehicle_type, _, destination = row['description'].partition(' to ')
+        service = Transportation(request_date, room, vehicle_type, destination)
+    else:
+        raise ValueError(f"Unknown service type {row['service_type']}")
+    service.set_price(row['price'])
+    service.set_status(row['status'])
+    return service
+
+def _restore_payment(row):
+    """Rebuild a payment from its repository row; card and wallet details are not stored"""
+    payment_class = PAYMENT_CLASSES[row['method']]
+    if payment_class is MobileWalletPayment:
+        payment = payment_class(row['amount'], _decode_date(row['payment_date']), '', '')
+    else:
+        payment = payment_class(row['amount'], _decode_date(row['payment_date']), '', '', '', '')
+    payment.set_status(row['status'])
+    payment.set_transaction_id(row['transaction_id'])
+    return payment
 
 class HotelSystem:
-    def __init__(self):
+    # Pickled in this order so the object graph is walked breadth-first
+    _STATE_FIELDS = ('_rooms', '_room_index', '_calendar', '_pricing', '_guests', '_guest_index', '_bookings',
+                     '_booking_index', '_payments', '_payments_by_booking', '_feedbacks', '_feedback_index',
+                     '_feedback_stats', '_feedback_search', '_loyalty', '_reports', '_groups',
+                     '_group_by_booking', '_payments_by_group', '_pending_payments', '_objects_by_id')
+    
+    def __init__(self, data_dir=None, snapshot_interval=None, repository=None, sample_data=True):
+        """Create the hotel; with a data_dir, state is recovered from and logged to disk"""
         self._rooms = []
+        self._room_index = {}
+        self._calendar = OccupancyCalendar()
+        self._pricing = PricingEngine(self._calendar)
+        self._reports = RevenueReports(self._calendar)
         self._guests = []
         self._bookings = []
+        self._payments = []
+        # Booking id -> payments made against its invoice
+        self._payments_by_booking = {}
         self._feedbacks = []
-        self._initialize_sample_data()
+        self._guest_index = GuestIndex()
+        self._booking_index = BookingIndex()
+        self._feedback_index = FeedbackIndex()
+        self._feedback_stats = FeedbackAggregates()
+        self._feedback_search = FeedbackSearchIndex()
+        self._loyalty = LoyaltyLedger()
+        self._groups = {}
+        # Booking id -> the group billing it; group id -> payments made against its master invoice
+        self._group_by_booking = {}
+        self._payments_by_group = {}
+        # Idempotency key -> (booking, payment, method) for async payments the gateway left unknown
+        self._pending_payments = {}
+        # Allocator id -> booking, group, invoice or payment
+        self._objects_by_id = {}
+        self._log = None
+        self._snapshots = None
+        self._snapshot_interval = snapshot_interval
+        self._ops_since_snapshot = 0
+        self._replaying = False
+        self._reassigning = False
+        self._repository = None
+        self._dispatcher = None
+        self._events = EventBus()
+        self._unindexed_bookings = []
+        # Guards id assignment and list appends; room reservations use their own striped locks
+        self._lock = threading.RLock()
+        # Held shared by every change and exclusively by checkpoint()
+        self._state_lock = SharedLock()
+        self._booking_listener = self._on_booking_change
+        self._feedback_listener = self._on_feedback_change
+        self._guest_listener = self._on_guest_change
+        self._loyalty_listener = self._on_loyalty_change
+        self._sample_data = sample_data
+        if data_dir is None:
+            # A repository that already holds a hotel is loaded by attach_repository() instead
+            if sample_data and (repository is None or repository.is_empty()):
+                self._initialize_sample_data()
+        else:
+            self._open_storage(data_dir)
+        # Attached after recovery so replayed history is not published
+        self._loyalty.set_event_bus(self._events)
+        if repository is not None:
+            self.attach_repository(repository)
     
     def get_rooms(self):
         return self._rooms
     
+    def get_occupancy_calendar(self):
+        return self._calendar
+    
     def get_guests(self):
         return self._guests
     
     def get_bookings(self):
         return self._bookings
     
+    def get_payments(self):
+        return self._payments
+    
+    def get_payments_for_booking(self, booking):
+        return self._payments_by_booking.get(booking.get_booking_id(), ())
+    
+    def get_payments_for_group(self, group):
+        return self._payments_by_group.get(group.get_group_id(), ())
+    
     def get_feedbacks(self):
         return self._feedbacks
     
     def _initialize_sample_data(self):
-        self._rooms.extend([
+        for room in [
             StandardRoom("101", 99.99),
             StandardRoom("102", 99.99),
             DeluxeRoom("201", 149.99),
             DeluxeRoom("202", 149.99),
             Suite("301", 249.99),
             Suite("302", 249.99)
-        ])
+        ]:
+            self.add_room(room)
         
-        self._guests.extend([
+        for guest in [
             Guest("John Doe", "john@example.com", "555-0101"),
             Guest("Jane Smith", "jane@example.com", "555-0102"),
             Guest("Robert Johnson", "robert@example.com", "555-0103")
-        ])
+        ]:
+            self._add_guest(guest)
         
         self._guests[0].enroll_in_loyalty_program().add_points(300)
         self._guests[1].enroll_in_loyalty_program().add_points(750)
     
+    def _open_storage(self, data_dir):
+        os.makedirs(data_dir, exist_ok=True)
+        self._snapshots = SnapshotStore(os.path.join(data_dir, 'snapshot.pickle'))
+        log_path = os.path.join(data_dir, 'operations.log')
+        
+        OperationLog.truncate_torn_tail(log_path)
+        state, last_seq = self._snapshots.load(self._persistent_load)
+        if state is None:
+            if self._sample_data:
+                self._initialize_sample_data()
+        else:
+            for name, value in state:
+                setattr(self, name, value)
+        
+        self._replaying = True
+        try:
+            for seq, op, args in OperationLog.read(log_path, last_seq):
+                self._apply(op, args)
+                last_seq = seq
+        finally:
+            self._replaying = False
+        self._log = OperationLog(log_path, start_seq=last_seq)
+    
+    def _persistent_id(self, obj):
+        return 'hotel' if obj is self else None
+    
+    def _persistent_load(self, pid):
+        if pid != 'hotel':
+            raise ValueError(f"Unknown persistent reference {pid!r}")
+        return self
+    
+    def _record(self, op, **args):
+        if self._log is None or self._replaying:
+            return
+        self._log.append(op, args)
+        self._ops_since_snapshot += 1
+    
+    def _checkpoint_if_due(self):
+        # Taken by the outermost change, once it has released its shared hold
+        if (self._log is None or not self._snapshot_interval or self._state_lock.is_held()
+                or self._ops_since_snapshot < self._snapshot_interval):
+            return
+        with self._state_lock.exclusive():
+            if self._log is not None and self._ops_since_snapshot >= self._snapshot_interval:
+                self._checkpoint_locked()
+    
+    def _apply(self, op, args):
+        """Re-execute a logged operation during recovery"""
+        if op == 'add_room':
+            self.add_room(ROOM_CLASSES[args['room_type']](args['room_number'], args['price_per_night']))
+        elif op == 'register_guest':
+            self.register_guest(args['name'], args['email'], args['phone'], args['address'])
+        elif op == 'create_booking':
+            self._create_booking(self.get_guest_by_id(args['guest_id']),
+                                 self._find_room(args['room_number']),
+                                 _decode_date(args['check_in']),
+                                 _decode_date(args['check_out']),
+                                 args.get('booking_id'), args.get('room_total'))
+        elif op == 'create_group_booking':
+            self._create_group_booking(self.get_guest_by_id(args['guest_id']),
+                                       [self._find_room(room_number) for room_number in args['room_numbers']],
+                                       _decode_date(args['check_in']), _decode_date(args['check_out']),
+                                       args['name'], args['group_id'], args['booking_ids'], args['room_totals'],
+                                       args.get('invoice_number'))
+        elif op == 'process_group_payment':
+            self._process_group_payment(self.get_group_booking(args['group_id']), args['payment_method'],
+                                        args['payment_details'], _decode_date(args['payment_date']),
+                                        args['transaction_id'])
+        elif op == 'reassign_rooms':
+            self._reassign_rooms([(self.get_booking_by_id(booking_id), self._find_room(room_number))
+                                  for booking_id, room_number in args['moves']])
+        elif op == 'update_booking':
+            booking = self.get_booking_by_id(args['booking_id'])
+            if args['field'] == 'status':
+                if args['value'] == "Cancelled":
+                    booking.cancel_booking()
+                else:
+                    booking.set_status(args['value'])
+            elif args['field'] == 'room':
+                booking.set_room(self._find_room(args['value']))
+            elif args['field'] == 'guest':
+                booking.set_guest(self.get_guest_by_id(args['value']))
+            elif args['field'] == 'check_in_date':
+                booking.set_check_in_date(_decode_date(args['value']))
+            elif args['field'] == 'check_out_date':
+                booking.set_check_out_date(_decode_date(args['value']))
+            if 'room_total' in args:
+                booking.set_room_total(args['room_total'])
+        elif op == 'process_payment':
+            self._process_payment(self.get_booking_by_id(args['booking_id']),
+                                  args['payment_method'], args['payment_details'],
+                                  _decode_date(args.get('payment_date')), args.get('invoice_number'),
+                                  _decode_date(args.get('issue_date')), args.get('transaction_id'),
+                                  args.get('status'), args.get('idempotency_key'))
+        elif op == 'settle_payment':
+            payment = self._pending_payments[args['idempotency_key']][1]
+            payment.set_status(args['status'])
+            payment.set_transaction_id(args['transaction_id'])
+            self._settle_pending_payment(args['idempotency_key'])
+        elif op == 'add_service_request':
+            self._add_service_request(self.get_booking_by_id(args['booking_id']),
+                                      args['service_type'], args['service_details'],
+                                      _decode_date(args.get('request_date')))
+        elif op == 'submit_feedback':
+            self._submit_feedback(self.get_guest_by_id(args['guest_id']), args['rating'],
+                                  args['comments'], _decode_date(args['stay_date']),
+                                  _decode_date(args.get('date')))
+        elif op == 'enroll_loyalty':
+            self.get_guest_by_id(args['guest_id']).enroll_in_loyalty_program()
+        elif op == 'update_loyalty':
+            program = self.get_guest_by_id(args['guest_id']).get_loyalty_program()
+            if args['field'] == 'earn':
+                program.add_points(args['points'])
+            elif args['field'] == 'redeem':
+                program.redeem_points(args['points'])
+            elif args['field'] == 'free_night':
+                program.earn_free_night()
+            elif args['field'] == 'adjust':
+                program.set_points(args['points'])
+        elif op == 'accrue_loyalty_points':
+            self.accrue_loyalty_points()
+        elif op == 'expire_loyalty_points':
+            self._loyalty.expire_members(args['guest_ids'])
+        elif op == 'update_feedback':
+            feedback = self._find_feedback(args['feedback_id'])
+            if args['field'] == 'rating':
+                feedback.set_rating(args['value'])
+            elif args['field'] == 'comments':
+                feedback.set_comments(args['value'])
+            elif args['field'] == 'response':
+                feedback.set_response(args['value'])
+        else:
+            raise ValueError(f"Unknown logged operation {op!r}")
+    
+    def checkpoint(self):
+        """Write a compacted snapshot and truncate the operation log.
+        
+        Waits for changes in progress to finish and holds new ones back
+        until the log is reset, so none is left out of both.
+        """
+        if self._log is None:
+            raise ValueError("Persistence is not enabled")
+        with self._state_lock.exclusive():
+            self._checkpoint_locked()
+    
+    def _checkpoint_locked(self):
+        self._log.flush()
+        state = [(name, getattr(self, name)) for name in self._STATE_FIELDS]
+        self._snapshots.save(state, self._log.get_seq(), self._persistent_id)
+        self._log.reset()
+        self._ops_since_snapshot = 0
+    
+    def attach_repository(self, repository):
+        """Mirror changes into a repository.
+        
+        An empty hotel attached to a repository that already holds one is
+        loaded from it; otherwise the current state is written to the
+        repository first.
+        """
+        if not self._rooms and not self._guests and not repository.is_empty():
+            self._load_repository(repository)
+            self._repository = repository
+            return
+        self._repository = repository
+        repository.save_rooms(self._rooms)
+        repository.save_guests(self._guests)
+        for group in self._groups.values():
+            repository.save_group_booking(group)
+        repository.save_bookings([booking for booking in self._bookings
+                                  if booking.get_booking_id() not in self._group_by_booking])
+        repository.save_invoices([booking.get_invoice() for booking in self._bookings
+                                  if booking.get_invoice()])
+        for booking in self._bookings:
+            if booking.get_additional_services():
+                repository.save_service_requests(booking)
+        pending = {id(payment) for _, payment, _ in self._pending_payments.values()}
+        repository.save_payments([(booking_id, payment) for booking_id, payments in self._payments_by_booking.items()
+                                  for payment in payments if id(payment) not in pending])
+        for key, (booking, payment, _) in self._pending_payments.items():
+            repository.save_payments([(booking.get_booking_id(), payment)], key)
+        for group_id, payments in self._payments_by_group.items():
+            repository.save_group_payments(self._groups[group_id], payments)
+        repository.save_feedbacks(self._feedbacks)
+        repository.flush()
+    
+    def _load_repository(self, repository):
+        """Rebuild rooms, guests, bookings, group bookings, invoices, payments, services and feedback from a repository.
+        
+        Card and wallet details are not stored, so loaded payments carry
+        only their method, amount, date, status and transaction id.
+        """
+        for row in repository.load_rows('rooms'):
+            self.add_room(ROOM_CLASSES[row['room_type']](row['room_number'], row['price_per_night']))
+        
+        programs = {row['guest_id']: row for row in repository.load_rows('loyalty_programs')}
+        for row in repository.load_rows('guests'):
+            guest = Guest(row['name'], row['email'], row['phone'], row['address'])
+            guest.set_registration_date(_decode_date(row['registration_date']))
+            loyalty = programs.get(row['guest_id'])
+            if loyalty is not None:
+                program = guest.enroll_in_loyalty_program()
+                program.apply_balance(loyalty['points'], loyalty['tier'])
+                program.set_free_nights_earned(loyalty['free_nights_earned'])
+            self._add_guest(guest, row['guest_id'])
+        
+        bookings = {}
+        members = {}
+        for row in repository.load_rows('bookings'):
+            room = self._find_room(row['room_number'])
+            booking = Booking(self.get_guest_by_id(row['guest_id']), room,
+                              _decode_date(row['check_in']), _decode_date(row['check_out']))
+            booking.set_booking_id(row['booking_id'])
+            booking.set_booking_date(_decode_date(row['booking_date']))
+            booking.set_room_total(row['room_total'])
+            booking.set_status(row['status'])
+            if row['status'] != "Cancelled":
+                room.reserve(booking.get_check_in_date(), booking.get_check_out_date())
+            bookings[row['booking_id']] = booking
+            if row['group_id'] is not None:
+                members.setdefault(row['group_id'], []).append(booking)
+        for row in repository.load_rows('service_requests'):
+            service = _restore_service(row, self._find_room(row['room_number']))
+            bookings[row['booking_id']].add_service(service)
+            self._reports.add_service(service)
+        for row in repository.load_rows('invoices'):
+            invoice = bookings[row['booking_id']].generate_invoice(row['invoice_number'],
+                                                                   _decode_date(row['issue_date']))
+            self._objects_by_id[parse_id(invoice.get_invoice_number())] = invoice
+        
+        loaded = list(bookings.values())
+        self._bookings.extend(loaded)
+        for booking in loaded:
+            self._objects_by_id[booking.get_booking_id()] = booking
+            booking.get_guest().add_booking(booking)
+            booking.add_change_listener(self._booking_listener)
+        self._booking_index.add_many(loaded)
+        self._reports.add_bookings(loaded)
+        
+        for row in repository.load_rows('group_bookings'):
+            group = GroupBooking(row['group_id'], row['name'], self.get_guest_by_id(row['guest_id']),
+                                 _decode_date(row['check_in']), _decode_date(row['check_out']),
+                                 members.get(row['group_id'], []), row['invoice_number'],
+                                 _decode_date(row['issue_date']))
+            group.set_booking_date(_decode_date(row['booking_date']))
+            self._groups[group.get_group_id()] = group
+            for booking in group.get_bookings():
+                self._group_by_booking[booking.get_booking_id()] = group
+            self._objects_by_id[group.get_group_id()] = group
+            self._objects_by_id[parse_id(group.get_invoice().get_invoice_number())] = group.get_invoice()
+        
+        credited = [booking for booking in loaded if booking.get_status() == "Completed"]
+        for row in repository.load_rows('payments'):
+            payment = _restore_payment(row)
+            self._payments.append(payment)
+            if row['group_id'] is not None:
+                group = self._groups[row['group_id']]
+                self._payments_by_group.setdefault(group.get_group_id(), []).append(payment)
+                if payment.get_status() == "Completed":
+                    self._reports.add_group_payment(group, payment, PAYMENT_METHODS[row['method']])
+                    credited.extend(group.get_active_bookings())
+            else:
+                booking = bookings[row['booking_id']]
+                self._payments_by_booking.setdefault(booking.get_booking_id(), []).append(payment)
+                if payment.get_status() == "Completed":
+                    self._reports.add_payment(booking, payment, PAYMENT_METHODS[row['method']])
+                    credited.append(booking)
+                elif payment.get_status() == "Pending" and row['idempotency_key'] is not None:
+                    self._pending_payments[row['idempotency_key']] = (booking, payment,
+                                                                      PAYMENT_METHODS[row['method']])
+            if payment.get_transaction_id():
+                self._objects_by_id[parse_id(payment.get_transaction_id())] = payment
+        # Their points are already in the loaded balances
+        self._loyalty.mark_accrued(credited)
+        
+        for row in repository.load_rows('feedback'):
+            feedback = Feedback(self.get_guest_by_id(row['guest_id']), row['rating'], row['comments'],
+                                _decode_date(row['stay_date']))
+            feedback.set_date(_decode_date(row['date']))
+            feedback.set_response(row['response'])
+            self._add_feedback(feedback, row['feedback_id'])
+        
+        for row in repository.load_rows('rooms'):
+            if not row['is_available']:
+                self._find_room(row['room_number']).set_available(False)
+    
+    def get_repository(self):
+        return self._repository
+    
+    def attach_dispatcher(self, dispatcher):
+        """Queue pending service requests on a ServiceDispatcher and route new ones to it"""
+        self._dispatcher = dispatcher
+        for booking in self._bookings:
+            for service in booking.get_additional_services():
+                if service.get_status() == "Pending":
+                    dispatcher.submit(service)
+    
+    def get_dispatcher(self):
+        return self._dispatcher
+    
+    def get_event_bus(self):
+        """Bus publishing BookingCreated, BookingCancelled, PaymentProcessed, GroupPaymentProcessed,
+        ServiceRequested, FeedbackSubmitted and PointsEarned once each change is logged; a full
+        subscriber misses events rather than failing the operation (see EventBus.offer)"""
+        return self._events
+    
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if self._repository is not None:
+            self._repository.flush()
+    
+    def _find_room(self, room_number):
+        if room_number not in self._room_index:
+            raise ValueError(f"Unknown room {room_number}")
+        return self._room_index[room_number]
+    
+    def get_room_by_number(self, room_number):
+        return self._room_index.get(room_number)
+    
+    @_changes_state
+    def add_room(self, room):
+        if room.get_room_number() in self._room_index:
+            raise ValueError("A room with this number already exists")
+        self._rooms.append(room)
+        self._room_index[room.get_room_number()] = room
+        self._calendar.add_room(room)
+        if self._repository is not None:
+            self._repository.save_rooms([room])
+        self._record('add_room', room_type=room.get_room_type(), room_number=room.get_room_number(),
+                     price_per_night=room.get_price_per_night())
+        return room
+    
+    def _add_guest(self, guest, guest_id=None):
+        with self._lock:
+            guest.set_guest_id(len(self._guests) + 1 if guest_id is None else guest_id)
+            self._guest_index.add(guest)
+            self._guests.append(guest)
+        self._loyalty.add_member(guest)
+        guest.add_change_listener(self._guest_listener)
+        if guest.get_loyalty_program() is not None:
+            guest.get_loyalty_program().add_change_listener(self._loyalty_listener)
+        return guest
+    
+    @_changes_state
+    def _on_guest_change(self, guest, field, old_value):
+        if field != 'loyalty_program':
+            return
+        guest.get_loyalty_program().add_change_listener(self._loyalty_listener)
+        self._save_loyalty([guest])
+        self._record('enroll_loyalty', guest_id=guest.get_guest_id())
+    
+    @_changes_state
+    def _on_loyalty_change(self, program, field, old_points):
+        # Booking credits and reversals are replayed with the booking changes that caused them
+        args = {}
+        if field == 'earn':
+            args['points'] = program.get_points() - old_points
+        elif field == 'redeem':
+            args['points'] = old_points - program.get_points()
+        elif field == 'adjust':
+            args['points'] = program.get_points()
+        self._save_loyalty([self.get_guest_by_id(program.get_member_id())])
+        self._record('update_loyalty', guest_id=program.get_member_id(), field=field, **args)
+    
+    def _save_loyalty(self, guests):
+        if self._repository is not None:
+            self._repository.save_loyalty_programs(guests)
+    
+    @_changes_state
     def register_guest(self, name, email, phone, address=None):
-        new_guest = Guest(name, email, phone, address)
-        self._guests.append(new_guest)
-        return new_guest
+        guest = self._add_guest(Guest(name, email, phone, address))
+        if self._repository is not None:
+            self._repository.save_guests([guest])
+        self._record('register_guest', name=name, email=email, phone=phone, address=address)
+        return guest
+    
+    def get_guest_by_id(self, guest_id):
+        return self._guest_index.get_by_id(guest_id)
+    
+    def find_guest_by_email(self, email):
+        return self._guest_index.get_by_email(email)
+    
+    def find_guests_by_phone(self, phone):
+        return self._guest_index.get_by_phone(phone)
     
     def find_available_rooms(self, room_type=None, check_in=None, check_out=None):
-        available_rooms = [room for room in self._rooms if room.is_available()]
-        
-        if room_type:
-            available_rooms = [room for room in available_rooms if room.get_room_type().lower() == room_type.lower()]
+        """Find rooms free for [check_in, check_out), defaulting to tonight"""
+        if check_in is None:
+            check_in = datetime.now().date()
+        if check_out is None:
+            check_out = check_in + timedelta(days=1)
         
-        return available_rooms
+        free_rooms = self._calendar.free_rooms(check_in, check_out, room_type)
+        return [room for room in free_rooms if room.is_available()]
+    
+    def get_occupancy_by_night(self, start=None, days=365, room_type=None):
+        if start is None:
+            start = datetime.now().date()
+        return self._calendar.occupancy_by_night(start, days, room_type)
+    
+    def find_rooms_free_consecutive(self, room_type, start, end, nights):
+        rooms = self._calendar.rooms_free_consecutive(room_type, start, end, nights)
+        return [room for room in rooms if room.is_available()]
+    
+    def get_pricing_engine(self):
+        return self._pricing
+    
+    def quote_stay(self, room, check_in, check_out):
+        """Price [check_in, check_out) in `room` at today's dynamic rates"""
+        return self._pricing.quote(room, check_in, check_out)
+    
+    def get_nightly_rates(self, room, check_in, check_out):
+        return self._pricing.get_nightly_rates(room, check_in, check_out)
     
     def create_booking(self, guest, room, check_in, check_out):
-        if not room.is_available():
-            raise ValueError("Room is not available")
+        return self._create_booking(guest, room, check_in, check_out)
+    
+    @_changes_state
+    def _create_booking(self, guest, room, check_in, check_out, booking_id=None, room_total=None):
+        if room_total is None:
+            # Quoted before reserving so the stay is priced on the occupancy the guest saw
+            room_total = self._pricing.quote(room, check_in, check_out)
+        # Check-and-reserve is atomic per room, so different rooms book in parallel
+        room.reserve(check_in, check_out)
         
         booking = Booking(guest, room, check_in, check_out)
-        self._bookings.append(booking)
+        booking.set_booking_id(next_id() if booking_id is None else booking_id)
+        booking.set_room_total(room_total)
+        with self._lock:
+            self._bookings.append(booking)
+        self._objects_by_id[booking.get_booking_id()] = booking
+        self._booking_index.add(booking)
         guest.add_booking(booking)
-        room.set_available(False)
+        booking.add_change_listener(self._booking_listener)
+        self._reports.add_booking(booking)
+        if self._repository is not None:
+            self._repository.save_bookings([booking])
+        self._record('create_booking', booking_id=booking.get_booking_id(), guest_id=guest.get_guest_id(),
+                     room_number=room.get_room_number(), check_in=_encode_date(check_in),
+                     check_out=_encode_date(check_out), room_total=room_total)
+        # Published only once the booking is logged, and never allowed to fail the operation
+        self._events.offer(BookingCreated, booking)
         return booking
     
+    def create_group_booking(self, guest, room_counts, check_in, check_out, name=None):
+        """Book a block of rooms all-or-nothing; room_counts maps room type to rooms wanted"""
+        selected = self._calendar.select_free_rooms(check_in, check_out, room_counts)
+        rooms = [room for type_rooms in selected.values() for room in type_rooms]
+        return self._create_group_booking(guest, rooms, check_in, check_out, name)
+    
+    @_changes_state
+    def _create_group_booking(self, guest, rooms, check_in, check_out, name=None, group_id=None,
+                              booking_ids=None, room_totals=None, invoice_number=None):
+        if not rooms:
+            raise ValueError("A group booking needs at least one room")
+        if room_totals is None:
+            room_totals = [self._pricing.quote(room, check_in, check_out) for room in rooms]
+        reserved = []
+        try:
+            for room in rooms:
+                room.reserve(check_in, check_out)
+                reserved.append(room)
+        except ValueError as e:
+            # Another booking took a room after selection: give back the ones already held
+            for room in reserved:
+                room.release(check_in, check_out)
+            raise ValueError(f"Room {room.get_room_number()} is no longer available; "
+                             f"no rooms were reserved") from e
+        
+        bookings = []
+        for index, (room, room_total) in enumerate(zip(rooms, room_totals)):
+            booking = Booking(guest, room, check_in, check_out)
+            booking.set_booking_id(next_id() if booking_ids is None else booking_ids[index])
+            booking.set_room_total(room_total)
+            bookings.append(booking)
+        group = GroupBooking(next_id() if group_id is None else group_id, name or guest.get_name(), guest,
+                             check_in, check_out, bookings, invoice_number)
+        with self._lock:
+            self._bookings.extend(bookings)
+            self._groups[group.get_group_id()] = group
+            for booking in bookings:
+                self._group_by_booking[booking.get_booking_id()] = group
+        for booking in bookings:
+            self._objects_by_id[booking.get_booking_id()] = booking
+            guest.add_booking(booking)
+            booking.add_change_listener(self._booking_listener)
+        self._objects_by_id[group.get_group_id()] = group
+        self._objects_by_id[parse_id(group.get_invoice().get_invoice_number())] = group.get_invoice()
+        self._booking_index.add_many(bookings)
+        self._reports.add_bookings(bookings)
+        if self._repository is not None:
+            self._repository.save_group_booking(group)
+        self._record('create_group_booking', group_id=group.get_group_id(), name=group.get_name(),
+                     guest_id=guest.get_guest_id(), check_in=_encode_date(check_in),
+                     check_out=_encode_date(check_out),
+                     room_numbers=[room.get_room_number() for room in rooms],
+                     booking_ids=[booking.get_booking_id() for booking in bookings],
+                     room_totals=list(room_totals),
+                     invoice_number=group.get_invoice().get_invoice_number())
+        for booking in bookings:
+            self._events.offer(BookingCreated, booking)
+        return group
+    
+    @_changes_state
+    def cancel_group_booking(self, group):
+        """Cancel every room of a group still booked"""
+        for booking in group.get_active_bookings():
+            booking.cancel_booking()
+    
+    def get_group_booking(self, group_id):
+        return self._groups.get(group_id)
+    
+    def get_group_bookings(self):
+        return list(self._groups.values())
+    
+    def get_group_for_booking(self, booking):
+        """The group booking a booking belongs to, or None"""
+        return self._group_by_booking.get(booking.get_booking_id())
+    
+    def assign_rooms(self, requests, min_stay=2):
+        """Book type-level requests onto concrete rooms chosen to minimize unsellable gaps.
+        
+        Each request is (guest, room type, check-in, check-out). Requests are
+        placed in arrival order, longest stay first; when a type is full the
+        guest is upgraded and charged the booked type's rate. Returns the
+        bookings in request order, None where nothing could be found.
+        """
+        planner = RoomAssignmentPlanner(self._calendar, min_stay)
+        order = sorted(range(len(requests)),
+                       key=lambda index: (requests[index][2], requests[index][2] - requests[index][3]))
+        bookings = [None] * len(requests)
+        for index in order:
+            guest, room_type, check_in, check_out = requests[index]
+            start = check_in.toordinal()
+            end = check_out.toordinal()
+            room, upgraded = planner.place(room_type, start, end)
+            if room is None:
+                continue
+            room_total = None
+            # Upgrades are billed as the type booked; with no room of that type to price, at the assigned room's rate
+            booked_as = planner.cheapest_room(room_type) if upgraded else None
+            if booked_as is not None:
+                room_total = self._pricing.quote(booked_as, check_in, check_out)
+            try:
+                bookings[index] = self._create_booking(guest, room, check_in, check_out, room_total=room_total)
+            except ValueError:
+                # Taken by a concurrent booking since the plan was made
+                planner.release(room, start, end)
+        return bookings
+    
+    def reoptimize_rooms(self, start=None, min_stay=2, max_moves_per_night=5):
+        """Re-pack confirmed stays arriving from `start` (default tomorrow) to recover sellable nights.
+        
+        Intended as a nightly job. Stays keep their dates and room type (or
+        are upgraded if their type no longer fits) and stay in their room
+        unless moving them helps; the new plan is applied only if it strands
+        fewer room-nights in gaps shorter than `min_stay`, with at most
+        `max_moves_per_night` guests moved for each night recovered.
+        """
+        if start is None:
+            start = date.today() + timedelta(days=1)
+        movable = [booking for booking in self.get_bookings_checking_in(start, date.max)
+                   if booking.get_status() == "Confirmed"]
+        report = {'bookings': len(movable), 'moved': 0, 'upgraded': 0, 'orphan_nights_before': 0,
+                  'orphan_nights_after': 0, 'recovered_nights': 0, 'moves_per_night': 0.0, 'applied': False}
+        if not movable:
+            return report
+        first = start.toordinal()
+        last = max(booking.get_check_out_date() for booking in movable).toordinal() + min_stay
+        planner = RoomAssignmentPlanner(self._calendar, min_stay)
+        report['orphan_nights_before'] = planner.orphan_nights(first, last)
+        for booking in movable:
+            planner.release(booking.get_room(), booking.get_check_in_date().toordinal(),
+                            booking.get_check_out_date().toordinal())
+        movable.sort(key=lambda booking: (booking.get_check_in_date(),
+                                          booking.get_check_in_date() - booking.get_check_out_date(),
+                                          booking.get_booking_id()))
+        moves = []
+        upgrades = 0
+        for booking in movable:
+            room, upgraded = planner.place(booking.get_room().get_room_type(),
+                                           booking.get_check_in_date().toordinal(),
+                                           booking.get_check_out_date().toordinal(), current=booking.get_room())
+            if room is None:
+                # The greedy plan is not guaranteed to fit everyone; keep the current layout
+                return report
+            if room is not booking.get_room():
+                moves.append((booking, room))
+                upgrades += upgraded
+        orphan_nights_after = planner.orphan_nights(first, last)
+        recovered = report['orphan_nights_before'] - orphan_nights_after
+        if recovered <= 0:
+            report['orphan_nights_after'] = report['orphan_nights_before']
+            return report
+        report['moves_per_night'] = len(moves) / recovered
+        if report['moves_per_night'] > max_moves_per_night:
+            # Not worth disturbing this many guests; the planned ratio is reported, nothing is moved
+            report['orphan_nights_after'] = report['orphan_nights_before']
+            return report
+        self._reassign_rooms(moves)
+        report['moved'] = len(moves)
+        report['upgraded'] = upgrades
+        report['orphan_nights_after'] = orphan_nights_after
+        report['recovered_nights'] = recovered
+        report['applied'] = True
+        return report
+    
+    @_changes_state
+    def _reassign_rooms(self, moves):
+        """Move bookings to new rooms as one step, so stays can swap rooms without conflicts"""
+        for booking, _ in moves:
+            booking.get_room().release(booking.get_check_in_date(), booking.get_check_out_date())
+        reserved = []
+        try:
+            for booking, room in moves:
+                room.reserve(booking.get_check_in_date(), booking.get_check_out_date())
+                reserved.append((booking, room))
+        except ValueError:
+            # A concurrent booking took one of the new rooms: put everything back
+            for booking, room in reserved:
+                room.release(booking.get_check_in_date(), booking.get_check_out_date())
+            for booking, _ in moves:
+                booking.get_room().reserve(booking.get_check_in_date(), booking.get_check_out_date())
+            raise
+        self._reassigning = True
+        try:
+            for booking, room in moves:
+                booking.assign_room(room)
+        finally:
+            self._reassigning = False
+        self._record('reassign_rooms', moves=[[booking.get_booking_id(), room.get_room_number()]
+                                              for booking, room in moves])
+    
+    @_changes_state
+    def _on_booking_change(self, booking, field, old_value):
+        if field == 'invoice':
+            invoice = booking.get_invoice()
+            self._objects_by_id[parse_id(invoice.get_invoice_number())] = invoice
+            return
+        if field in ('room_total', 'service'):
+            # Logged with the change or service request that caused it
+            return
+        if field == 'room' and self._reassigning:
+            # Logged once for the whole batch; the guest keeps the price they were quoted
+            if self._repository is not None:
+                self._repository.save_bookings([booking])
+            return
+        if field == 'status' and booking.get_status() == "Completed":
+            if self._loyalty.earn_for_booking(booking):
+                self._save_loyalty([booking.get_guest()])
+        elif field == 'status' and booking.get_status() == "Cancelled":
+            if self._loyalty.reverse_for_booking(booking):
+                self._save_loyalty([booking.get_guest()])
+        if field == 'room':
+            value = booking.get_room().get_room_number()
+        elif field == 'guest':
+            value = booking.get_guest().get_guest_id()
+        elif field == 'status':
+            value = booking.get_status()
+        else:
+            value = _encode_date(getattr(booking, f"get_{field}")())
+        args = {}
+        if field in ('room', 'check_in_date', 'check_out_date'):
+            if not self._replaying:
+                booking.set_room_total(self._pricing.quote(booking.get_room(), booking.get_check_in_date(),
+                                                           booking.get_check_out_date()))
+            args['room_total'] = booking.get_room_total()
+        if self._repository is not None:
+            self._repository.save_bookings([booking])
+        self._record('update_booking', booking_id=booking.get_booking_id(), field=field, value=value, **args)
+        if field == 'status' and booking.get_status() == "Cancelled":
+            self._events.offer(BookingCancelled, booking)
+    
+    @_changes_state
+    def import_rooms(self, rooms):
+        """Add a batch of rooms; returns (room, reason) for rejected ones"""
+        rejected = []
+        accepted = []
+        for room in rooms:
+            if room.get_room_number() in self._room_index:
+                rejected.append((room, "Duplicate room number"))
+                continue
+            self._rooms.append(room)
+            self._room_index[room.get_room_number()] = room
+            self._calendar.add_room(room)
+            accepted.append(room)
+        if self._repository is not None:
+            self._repository.save_rooms(accepted)
+        return rejected
+    
+    @_changes_state
+    def import_guests(self, guests):
+        """Add a batch of guests; returns (guest, reason) for rejected ones"""
+        rejected = []
+        accepted = []
+        for guest in guests:
+            try:
+                self._add_guest(guest)
+            except ValueError as e:
+                rejected.append((guest, str(e)))
+            else:
+                accepted.append(guest)
+        if self._repository is not None:
+            self._repository.save_guests(accepted)
+        return rejected
+    
+    @_changes_state
+    def import_bookings(self, bookings):
+        """Add a batch of bookings; indexing is deferred until finish_import()"""
+        rejected = []
+        for booking in bookings:
+            if booking.get_status() != "Cancelled":
+                try:
+                    booking.get_room().reserve(booking.get_check_in_date(), booking.get_check_out_date())
+                except ValueError as e:
+                    rejected.append((booking, str(e)))
+                    continue
+            booking.set_booking_id(next_id())
+            with self._lock:
+                self._bookings.append(booking)
+                self._unindexed_bookings.append(booking)
+            self._objects_by_id[booking.get_booking_id()] = booking
+        return rejected
+    
+    def finish_import(self):
+        """Index everything added through import_* and persist it"""
+        with self._state_lock.shared():
+            bookings = self._unindexed_bookings
+            self._unindexed_bookings = []
+            self._booking_index.add_many(bookings)
+            for booking in bookings:
+                booking.get_guest().add_booking(booking)
+                booking.add_change_listener(self._booking_listener)
+            self._reports.add_bookings(bookings)
+            if self._repository is not None:
+                self._repository.save_bookings(bookings)
+                self._repository.flush()
+        if self._log is not None:
+            self.checkpoint()
+    
+    def get_loyalty_ledger(self):
+        return self._loyalty
+    
+    @_changes_state
+    def accrue_loyalty_points(self):
+        """Credit every completed booking that has not earned points yet; returns (bookings, points)"""
+        result = self._loyalty.accrue_completed(self._booking_index.get_by_status("Completed"))
+        if result[0]:
+            self._save_loyalty(self._guests)
+        self._record('accrue_loyalty_points')
+        return result
+    
+    @_changes_state
+    def expire_loyalty_points(self, as_of=None, inactive_days=730):
+        """Expire balances of members inactive for `inactive_days`; returns points expired"""
+        # Logged by member, since inactivity depends on the day the job runs
+        guest_ids = self._loyalty.find_inactive(as_of, inactive_days)
+        expired = self._loyalty.expire_members(guest_ids)
+        if guest_ids:
+            self._save_loyalty([self.get_guest_by_id(guest_id) for guest_id in guest_ids])
+        self._record('expire_loyalty_points', guest_ids=guest_ids)
+        return expired
+    
+    def get_daily_report(self, start, end, room_type=None):
+        """Occupancy %, ADR, RevPAR, service revenue and payment mix for each night in [start, end)"""
+        return self._reports.daily(start, end, room_type)
+    
+    def get_revenue_summary(self, start, end, room_type=None):
+        return self._reports.summary(start, end, room_type)
+    
+    def get_booking_by_id(self, booking_id):
+        return self._booking_index.get_by_id(booking_id)
+    
+    def find_by_id(self, identifier):
+        """Look up a booking, invoice or payment by id, e.g. 1234, 'INV-1234' or 'CC-1234'"""
+        try:
+            return self._objects_by_id.get(parse_id(identifier))
+        except ValueError:
+            return None
+    
+    def get_bookings_for_room(self, room):
+        return self._booking_index.get_by_room(room.get_room_number())
+    
+    def get_bookings_for_guest(self, guest):
+        return self._booking_index.get_by_guest(guest.get_guest_id())
+    
+    def get_bookings_by_status(self, status):
+        return self._booking_index.get_by_status(status)
+    
+    def get_bookings_checking_in(self, start, end=None):
+        return self._booking_index.get_by_check_in(start, end)
+    
+    def run_nightly_billing(self, processes=None, chunk_size=20000):
+        """Bill every confirmed booking in one pass and return BillingRecords"""
+        return run_billing(self._booking_index.get_by_status("Confirmed"), processes, chunk_size)
+    
+    def _check_not_grouped(self, booking):
+        group = self._group_by_booking.get(booking.get_booking_id())
+        if group is not None:
+            raise ValueError(f"Booking {booking.get_booking_id()} is billed to group {group.get_group_id()}; "
+                             f"pay the group's master invoice instead")
+    
     def process_payment(self, booking, payment_method, payment_details):
+        self._check_not_grouped(booking)
+        return self._process_payment(booking, payment_method, payment_details)
+    
+    @_changes_state
+    def _process_payment(self, booking, payment_method, payment_details, payment_date=None,
+                         invoice_number=None, issue_date=None, transaction_id=None, status=None,
+                         idempotency_key=None):
+        invoice = booking.generate_invoice(invoice_number, issue_date)
+        payment = self._build_payment(invoice.get_total_amount(), payment_method, payment_details, payment_date)
+        # A replayed Pending payment stays Pending until its settle_payment entry
+        if status != "Pending":
+            payment.process_payment()
+        if transaction_id is not None:
+            # Replayed: reuse the logged id so existing references to it still resolve
+            payment.set_transaction_id(transaction_id)
+        self._record_payment(booking, payment, payment_method, payment_details, idempotency_key)
+        return payment
+    
+    async def process_payment_async(self, booking, payment_method, payment_details, pipeline,
+                                    idempotency_key=None):
+        """Settle a payment through a PaymentPipeline without blocking the caller's event loop.
+        
+        The idempotency key defaults to the booking id and invoice number, so
+        paying the same invoice again resubmits a Pending payment under its
+        original key and the gateway cannot charge it twice. A payment whose
+        outcome is still unknown is recorded as Pending; a declined one is
+        not recorded.
+        """
+        self._check_not_grouped(booking)
         invoice = booking.generate_invoice()
-        today = datetime.now().date()
+        if idempotency_key is None:
+            idempotency_key = f"{booking.get_booking_id()}-{invoice.get_invoice_number()}"
+        pending = self._pending_payments.get(idempotency_key)
+        if pending is not None:
+            payment = pending[1]
+            await pipeline.submit(payment, pending[2], idempotency_key)
+            if payment.get_status() != "Pending":
+                self._settle_pending_payment(idempotency_key)
+            return payment
+        payment = self._build_payment(invoice.get_total_amount(), payment_method, payment_details)
+        await pipeline.submit(payment, payment_method, idempotency_key)
+        if payment.get_status() != "Failed":
+            self._record_payment(booking, payment, payment_method, payment_details, idempotency_key)
+        return payment
+    
+    def get_pending_payments(self):
+        """(idempotency key, booking, payment) for async payments whose outcome is still unknown"""
+        return [(key, booking, payment) for key, (booking, payment, _) in self._pending_payments.items()]
+    
+    def process_group_payment(self, group, payment_method, payment_details):
+        """Pay a group's master invoice in one payment covering all of its rooms"""
+        if not group.get_active_bookings() or group.get_invoice().get_total_amount() <= 0:
+            raise ValueError(f"Group {group.get_group_id()} has nothing left to pay")
+        if any(payment.get_status() == "Completed" for payment in self.get_payments_for_group(group)):
+            raise ValueError(f"Group {group.get_group_id()}'s master invoice is already paid")
+        return self._process_group_payment(group, payment_method, payment_details)
+    
+    @_changes_state
+    def _process_group_payment(self, group, payment_method, payment_details, payment_date=None,
+                               transaction_id=None):
+        invoice = group.get_invoice()
+        payment = self._build_payment(invoice.get_total_amount(), payment_method, payment_details, payment_date)
+        payment.process_payment()
+        if transaction_id is not None:
+            payment.set_transaction_id(transaction_id)
+        with self._lock:
+            self._payments.append(payment)
+            self._payments_by_group.setdefault(group.get_group_id(), []).append(payment)
+        if payment.get_status() == "Completed":
+            credited = [booking.get_guest() for booking in group.get_active_bookings()
+                        if self._loyalty.earn_for_booking(booking)]
+            if credited:
+                self._save_loyalty(credited)
+            self._reports.add_group_payment(group, payment, payment_method)
+        if payment.get_transaction_id():
+            self._objects_by_id[parse_id(payment.get_transaction_id())] = payment
+        if self._repository is not None:
+            self._repository.save_group_payments(group, [payment])
+        self._record('process_group_payment', group_id=group.get_group_id(), payment_method=payment_method,
+                     payment_details=_mask_payment_details(payment_details),
+                     payment_date=_encode_date(payment.get_payment_date()),
+                     transaction_id=payment.get_transaction_id())
+        self._events.offer(GroupPaymentProcessed, group, payment, payment_method)
+        return payment
+    
+    def _build_payment(self, amount, payment_method, payment_details, payment_date=None):
+        # Replayed payments keep the date they were made on
+        today = payment_date or datetime.now().date()
         
         if payment_method.lower() == 'credit':
             payment = CreditCardPayment(
-                invoice.get_total_amount(), today,
+                amount, today,
                 payment_details['card_number'],
                 payment_details['card_holder'],
                 payment_details['expiry_date'],
@@ -82,7 +1101,7 @@ class HotelSystem:
             )
         elif payment_method.lower() == 'debit':
             payment = DebitCardPayment(
-                invoice.get_total_amount(), today,
+                amount, today,
                 payment_details['card_number'],
                 payment_details['card_holder'],
                 payment_details['expiry_date'],
@@ -90,18 +1109,62 @@ class HotelSystem:
             )
         elif payment_method.lower() == 'mobile':
             payment = MobileWalletPayment(
-                invoice.get_total_amount(), today,
+                amount, today,
                 payment_details['wallet_type'],
                 payment_details['phone_number']
             )
         else:
             raise ValueError("Invalid payment method")
-        
-        payment.process_payment()
         return payment
     
+    @_changes_state
+    def _record_payment(self, booking, payment, payment_method, payment_details, idempotency_key=None):
+        with self._lock:
+            self._payments.append(payment)
+            self._payments_by_booking.setdefault(booking.get_booking_id(), []).append(payment)
+            if payment.get_status() == "Pending":
+                self._pending_payments[idempotency_key] = (booking, payment, payment_method)
+        self._credit_payment(booking, payment, payment_method)
+        if self._repository is not None:
+            self._repository.save_invoices([booking.get_invoice()])
+            self._repository.save_payments([(booking.get_booking_id(), payment)], idempotency_key)
+        self._record('process_payment', booking_id=booking.get_booking_id(),
+                     payment_method=payment_method, payment_details=_mask_payment_details(payment_details),
+                     payment_date=_encode_date(payment.get_payment_date()),
+                     invoice_number=booking.get_invoice().get_invoice_number(),
+                     issue_date=_encode_date(booking.get_invoice().get_issue_date()),
+                     transaction_id=payment.get_transaction_id(), status=payment.get_status(),
+                     idempotency_key=idempotency_key)
+        if payment.get_status() != "Pending":
+            self._events.offer(PaymentProcessed, booking, payment, payment_method)
+    
+    @_changes_state
+    def _settle_pending_payment(self, idempotency_key):
+        """Apply the outcome of a Pending payment once a resubmission has completed or failed it"""
+        with self._lock:
+            booking, payment, payment_method = self._pending_payments.pop(idempotency_key)
+        self._credit_payment(booking, payment, payment_method)
+        if self._repository is not None:
+            self._repository.save_payments([(booking.get_booking_id(), payment)], idempotency_key)
+        self._record('settle_payment', idempotency_key=idempotency_key, status=payment.get_status(),
+                     transaction_id=payment.get_transaction_id())
+        if payment.get_status() == "Completed":
+            self._events.offer(PaymentProcessed, booking, payment, payment_method)
+    
+    def _credit_payment(self, booking, payment, payment_method):
+        if payment.get_status() == "Completed":
+            if self._loyalty.earn_for_booking(booking):
+                self._save_loyalty([booking.get_guest()])
+            self._reports.add_payment(booking, payment, payment_method)
+        if payment.get_transaction_id():
+            self._objects_by_id[parse_id(payment.get_transaction_id())] = payment
+    
     def add_service_request(self, booking, service_type, service_details):
-        today = datetime.now()
+        return self._add_service_request(booking, service_type, service_details)
+    
+    @_changes_state
+    def _add_service_request(self, booking, service_type, service_details, request_date=None):
+        today = request_date or datetime.now()
         
         if service_type.lower() == 'housekeeping':
             service = Housekeeping(today, booking.get_room(), service_details.get('service_type', 'Standard'))
@@ -115,18 +1178,86 @@ class HotelSystem:
             )
         else:
             raise ValueError("Invalid service type")
+        if self._dispatcher is not None:
+            # Refused before the guest is charged for a request no one can carry out
+            self._dispatcher.check(service)
         
         booking.add_service(service)
+        self._reports.add_service(service)
+        if self._dispatcher is not None:
+            self._dispatcher.submit(service)
+        if self._repository is not None:
+            self._repository.save_service_requests(booking)
+            if booking.get_invoice():
+                self._repository.save_invoices([booking.get_invoice()])
+        self._record('add_service_request', booking_id=booking.get_booking_id(),
+                     service_type=service_type, service_details=service_details,
+                     request_date=_encode_date(service.get_request_date()))
+        self._events.offer(ServiceRequested, booking, service)
         return service
     
     def submit_feedback(self, guest, rating, comments, stay_date=None):
+        return self._submit_feedback(guest, rating, comments, stay_date)
+    
+    @_changes_state
+    def _submit_feedback(self, guest, rating, comments, stay_date=None, feedback_date=None):
         if not 1 <= rating <= 5:
             raise ValueError("Rating must be between 1 and 5")
         
         feedback = Feedback(guest, rating, comments, stay_date)
-        self._feedbacks.append(feedback)
+        if feedback_date is not None:
+            feedback.set_date(feedback_date)
+        self._add_feedback(feedback)
+        if self._repository is not None:
+            self._repository.save_feedbacks([feedback])
+        self._record('submit_feedback', guest_id=guest.get_guest_id(), rating=rating,
+                     comments=comments, stay_date=_encode_date(feedback.get_stay_date()),
+                     date=_encode_date(feedback.get_date()))
+        self._events.offer(FeedbackSubmitted, feedback)
+        return feedback
+    
+    def _add_feedback(self, feedback, feedback_id=None):
+        with self._lock:
+            feedback.set_feedback_id(len(self._feedbacks) + 1 if feedback_id is None else feedback_id)
+            self._feedbacks.append(feedback)
+        self._feedback_index.add(feedback)
+        self._feedback_stats.add(feedback)
+        self._feedback_search.add(feedback)
+        feedback.add_change_listener(self._feedback_listener)
         return feedback
     
+    def _find_feedback(self, feedback_id):
+        # Feedback ids are assigned consecutively from 1
+        if not 1 <= feedback_id <= len(self._feedbacks):
+            raise ValueError(f"Unknown feedback {feedback_id}")
+        return self._feedbacks[feedback_id - 1]
+    
+    @_changes_state
+    def _on_feedback_change(self, feedback, field, old_value):
+        if field not in ('rating', 'comments', 'response'):
+            return
+        if self._repository is not None:
+            self._repository.save_feedbacks([feedback])
+        self._record('update_feedback', feedback_id=feedback.get_feedback_id(), field=field,
+                     value=getattr(feedback, f"get_{field}")())
+    
+    def get_feedbacks_for_guest(self, guest):
+        return self._feedback_index.get_by_guest(guest.get_guest_id())
+    
+    def search_feedback(self, query, limit=20):
+        """Ranked full-text search over comments and responses, e.g. 'noise -street OR "air con"'"""
+        return [feedback for feedback, _ in self._feedback_search.search(query, limit)]
+    
+    def get_rating_summary(self):
+        """Count, mean, variance and star histogram over all feedback"""
+        return self._feedback_stats.get_summary()
+    
+    def get_rating_trend(self, start, end, weekly=False):
+        """Per-day (or per-week) rating summaries for stays in [start, end)"""
+        if weekly:
+            return self._feedback_stats.get_weekly(start, end)
+        return self._feedback_stats.get_daily(start, end)
+    
     def __str__(self):
         return (f"Royal Stay Hotel Management System\n"
                 f"Rooms: {len(self._rooms)}\n"
@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+
+# 2024-01-01T00:00:00Z; 41 bits of milliseconds from here last until 2093
+EPOCH_MS = 1704067200000
+WORKER_BITS = 5
+THREAD_BITS = 5
+SEQUENCE_BITS = 12
+MAX_WORKER = (1 << WORKER_BITS) - 1
+MAX_THREAD_SLOT = (1 << THREAD_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+class _SlotState:
+    """Millisecond and sequence counters for one thread slot"""
+    
+    __slots__ = ('slot', 'last_ms', 'sequence')
+    
+    def __init__(self, slot):
+        self.slot = slot
+        self.last_ms = -1
+        self.sequence = 0
+
+class _SlotLease:
+    """Thread-local handle that gives its slot back to the pool when the thread exits"""
+    
+    __slots__ = ('state', '_pool')
+    
+    def __init__(self, state, pool):
+        self.state = state
+        self._pool = pool
+    
+    def __del__(self):
+        # The counters travel with the slot, so a later owner cannot reissue an id
+        self._pool.append(self.state)
+
+class IdAllocator:
+    """Snowflake-style 63-bit ids: milliseconds | worker | thread slot | sequence.
+    
+    Each thread owns a slot with its own millisecond/sequence counters, so
+    allocation needs no lock. Up to 4096 ids per millisecond per thread; the
+    allocator waits for the next millisecond when a thread exhausts that.
+    Threads beyond the first 31 share the last slot behind a lock.
+    """
+    
+    def __init__(self, worker_id=None):
+        if worker_id is None:
+            worker_id = int(os.environ.get('HOTEL_WORKER_ID', os.getpid())) & MAX_WORKER
+        if not 0 <= worker_id <= MAX_WORKER:
+            raise ValueError(f"Worker id must be between 0 and {MAX_WORKER}")
+        self._worker_id = worker_id
+        self._local = threading.local()
+        self._free_slots = [_SlotState(slot) for slot in range(MAX_THREAD_SLOT - 1, -1, -1)]
+        self._overflow = _SlotState(MAX_THREAD_SLOT)
+        self._overflow_lock = threading.Lock()
+    
+    def get_worker_id(self):
+        return self._worker_id
+    
+    def _state(self):
+        lease = getattr(self._local, 'lease', None)
+        if lease is not None:
+            return lease.state
+        try:
+            state = self._free_slots.pop()
+        except IndexError:
+            return self._overflow
+        self._local.lease = _SlotLease(state, self._free_slots)
+        return state
+    
+    def _advance(self, state):
+        now = time.time_ns() // 1_000_000 - EPOCH_MS
+        if now > state.last_ms:
+            state.last_ms = now
+            state.sequence = 0
+        else:
+            # Same millisecond or the clock stepped back: keep counting from the last one
+            state.sequence += 1
+            if state.sequence > MAX_SEQUENCE:
+                while time.time_ns() // 1_000_000 - EPOCH_MS <= state.last_ms:
+                    time.sleep(0.0001)
+                state.last_ms = time.time_ns() // 1_000_000 - EPOCH_MS
+                state.sequence = 0
+        return ((state.last_ms << (WORKER_BITS + THREAD_BITS + SEQUENCE_BITS))
+                | (self._worker_id << (THREAD_BITS + SEQUENCE_BITS))
+                | (state.slot << SEQUENCE_BITS)
+                | state.sequence)
+    
+    def next_id(self):
+        state = self._state()
+        if state is self._overflow:
+            with self._overflow_lock:
+                return self._advance(state)
+        return self._advance(state)
+    
+    @staticmethod
+    def decode(object_id):
+        """Split an id into (unix milliseconds, worker id, thread slot, sequence)"""
+        sequence = object_id & MAX_SEQUENCE
+        slot = (object_id >> SEQUENCE_BITS) & MAX_THREAD_SLOT
+        worker = (object_id >> (THREAD_BITS + SEQUENCE_BITS)) & MAX_WORKER
+        millis = (object_id >> (WORKER_BITS + THREAD_BITS + SEQUENCE_BITS)) + EPOCH_MS
+        return millis, worker, slot, sequence
+
+def parse_id(identifier):
+    """Accept a raw id or a prefixed one such as 'INV-123' or 'CC-123'"""
+    if isinstance(identifier, int):
+        return identifier
+    return int(str(identifier).rsplit('-', 1)[-1])
+
+default_allocator = IdAllocator()
+
+def next_id():
+    return default_allocator.next_id()
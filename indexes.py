@@ -0,0 +1,182 @@
+import threading
+from bisect import bisect_left, insort
+
+def normalize_email(email):
+    return email.strip().lower() if email else email
+
+def normalize_phone(phone):
+    return ''.join(ch for ch in phone if ch.isdigit()) if phone else phone
+
+class GuestIndex:
+    """Hash indexes over guests by id, email and phone"""
+    
+    def __init__(self):
+        self._by_id = {}
+        self._by_email = {}
+        self._by_phone = {}
+        self._lock = threading.RLock()
+        # One bound method shared by every guest rather than one per guest
+        self._change_listener = self._on_change
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+    
+    def add(self, guest):
+        with self._lock:
+            email = normalize_email(guest.get_email())
+            if email in self._by_email:
+                raise ValueError("A guest with this email already exists")
+            self._by_id[guest.get_guest_id()] = guest
+            self._by_email[email] = guest
+            phone = normalize_phone(guest.get_phone())
+            if phone:
+                self._by_phone.setdefault(phone, []).append(guest)
+            guest.add_change_listener(self._change_listener)
+    
+    def _on_change(self, guest, field, old_value):
+        with self._lock:
+            if field == 'email':
+                self._by_email.pop(normalize_email(old_value), None)
+                self._by_email[normalize_email(guest.get_email())] = guest
+            elif field == 'phone':
+                guests = self._by_phone.get(normalize_phone(old_value), [])
+                if guest in guests:
+                    guests.remove(guest)
+                phone = normalize_phone(guest.get_phone())
+                if phone:
+                    self._by_phone.setdefault(phone, []).append(guest)
+    
+    def get_by_id(self, guest_id):
+        return self._by_id.get(guest_id)
+    
+    def get_by_email(self, email):
+        return self._by_email.get(normalize_email(email))
+    
+    def get_by_phone(self, phone):
+        return list(self._by_phone.get(normalize_phone(phone), []))
+    
+    def __len__(self):
+        return len(self._by_id)
+
+class BookingIndex:
+    """Secondary indexes over bookings by id, room, guest, status and check-in date"""
+    
+    def __init__(self):
+        self._by_id = {}
+        self._by_room = {}
+        self._by_guest = {}
+        self._by_status = {}
+        self._by_check_in = []
+        self._lock = threading.RLock()
+        self._change_listener = self._on_change
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+    
+    @staticmethod
+    def _add_to(index, key, booking):
+        index.setdefault(key, {})[booking.get_booking_id()] = booking
+    
+    @staticmethod
+    def _remove_from(index, key, booking):
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.pop(booking.get_booking_id(), None)
+            if not bucket:
+                del index[key]
+    
+    def add(self, booking):
+        with self._lock:
+            booking_id = booking.get_booking_id()
+            self._by_id[booking_id] = booking
+            self._add_to(self._by_room, booking.get_room().get_room_number(), booking)
+            self._add_to(self._by_guest, booking.get_guest().get_guest_id(), booking)
+            self._add_to(self._by_status, booking.get_status(), booking)
+            insort(self._by_check_in, (booking.get_check_in_date().toordinal(), booking_id))
+            booking.add_change_listener(self._change_listener)
+    
+    def add_many(self, bookings):
+        """Index a batch of bookings, sorting the check-in index once"""
+        with self._lock:
+            by_id = self._by_id
+            for booking in bookings:
+                by_id[booking.get_booking_id()] = booking
+                self._add_to(self._by_room, booking.get_room().get_room_number(), booking)
+                self._add_to(self._by_guest, booking.get_guest().get_guest_id(), booking)
+                self._add_to(self._by_status, booking.get_status(), booking)
+                booking.add_change_listener(self._change_listener)
+            self._by_check_in.extend((booking.get_check_in_date().toordinal(), booking.get_booking_id())
+                                     for booking in bookings)
+            self._by_check_in.sort()
+    
+    def _on_change(self, booking, field, old_value):
+        with self._lock:
+            if field == 'status':
+                self._remove_from(self._by_status, old_value, booking)
+                self._add_to(self._by_status, booking.get_status(), booking)
+            elif field == 'room':
+                self._remove_from(self._by_room, old_value.get_room_number(), booking)
+                self._add_to(self._by_room, booking.get_room().get_room_number(), booking)
+            elif field == 'guest':
+                self._remove_from(self._by_guest, old_value.get_guest_id(), booking)
+                self._add_to(self._by_guest, booking.get_guest().get_guest_id(), booking)
+            elif field == 'check_in_date':
+                key = (old_value.toordinal(), booking.get_booking_id())
+                idx = bisect_left(self._by_check_in, key)
+                if idx < len(self._by_check_in) and self._by_check_in[idx] == key:
+                    del self._by_check_in[idx]
+                insort(self._by_check_in, (booking.get_check_in_date().toordinal(), booking.get_booking_id()))
+    
+    def get_by_id(self, booking_id):
+        return self._by_id.get(booking_id)
+    
+    def get_by_room(self, room_number):
+        with self._lock:
+            return list(self._by_room.get(room_number, {}).values())
+    
+    def get_by_guest(self, guest_id):
+        with self._lock:
+            return list(self._by_guest.get(guest_id, {}).values())
+    
+    def get_by_status(self, status):
+        with self._lock:
+            return list(self._by_status.get(status, {}).values())
+    
+    def count_by_status(self, status):
+        return len(self._by_status.get(status, {}))
+    
+    def get_by_check_in(self, start, end=None):
+        """Bookings checking in on [start, end), or on `start` alone if no end is given"""
+        with self._lock:
+            first = start.toordinal()
+            last = end.toordinal() if end is not None else first + 1
+            lo = bisect_left(self._by_check_in, (first,))
+            hi = bisect_left(self._by_check_in, (last,))
+            return [self._by_id[booking_id] for _, booking_id in self._by_check_in[lo:hi]]
+    
+    def __len__(self):
+        return len(self._by_id)
+
+class FeedbackIndex:
+    """Index of feedback by guest"""
+    
+    def __init__(self):
+        self._by_guest = {}
+    
+    def add(self, feedback):
+        self._by_guest.setdefault(feedback.get_guest().get_guest_id(), []).append(feedback)
+    
+    def get_by_guest(self, guest_id):
+        return list(self._by_guest.get(guest_id, []))
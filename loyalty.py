@@ -0,0 +1,287 @@
+import threading
+from array import array
+from datetime import date
+from status import StatusTable
+from events import PointsEarned
+
+ENTRY_KINDS = StatusTable("Earn", "Redeem", "Expire", "Free Night", "Adjust", "Reverse")
+_EARN = ENTRY_KINDS.code("Earn")
+_EXPIRE = ENTRY_KINDS.code("Expire")
+_FREE_NIGHT = ENTRY_KINDS.code("Free Night")
+_REVERSE = ENTRY_KINDS.code("Reverse")
+
+# LoyaltyProgram change fields -> ledger entry kind
+_FIELD_KINDS = {
+    'earn': _EARN,
+    'redeem': ENTRY_KINDS.code("Redeem"),
+    'free_night': _FREE_NIGHT,
+    'adjust': ENTRY_KINDS.code("Adjust"),
+}
+
+TIERS = ("Basic", "Silver", "Gold")
+SILVER_POINTS = 500
+GOLD_POINTS = 1000
+POINTS_PER_DOLLAR = 0.1
+
+def tier_code(points):
+    return (points >= SILVER_POINTS) + (points >= GOLD_POINTS)
+
+def points_for_booking(booking):
+    """Points earned by a stay: room nights plus services, before discounts"""
+    spend = booking.get_room_total()
+    spend += sum(service.get_price() for service in booking.get_additional_services())
+    return int(spend * POINTS_PER_DOLLAR)
+
+class LoyaltyLedger:
+    """Append-only ledger of loyalty point movements with cached balances.
+    
+    Entries are stored column-wise (member slot, kind, points, day ordinal,
+    booking id). Balances, free nights, tiers and last activity are
+    materialized per member in parallel arrays, so balance reads are O(1)
+    and batch jobs (accrual, expiry, tier recomputation) run as single passes
+    over compact arrays. Booking credits and their reversals are posted here
+    and pushed to the LoyaltyProgram; every other LoyaltyProgram change is
+    recorded through its change listener. check_consistency() replays the
+    ledger against the cache.
+    """
+    
+    def __init__(self):
+        self._entry_members = array('l')
+        self._entry_kinds = array('b')
+        self._entry_points = array('q')
+        self._entry_days = array('l')
+        self._entry_references = array('q')
+        self._slots = {}
+        self._programs = []
+        self._balances = array('q')
+        self._free_nights = array('l')
+        self._tiers = array('b')
+        self._last_activity = array('l')
+        # Booking id -> points it earned (0 once reversed), so a stay is credited only once
+        self._accrued = {}
+        self._lock = threading.RLock()
+        self._event_bus = None
+        self._change_listener = self._on_change
+        self._guest_listener = self._on_guest_change
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        state['_event_bus'] = None
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+    
+    def set_event_bus(self, event_bus):
+        """Publish PointsEarned on `event_bus` for booking credits and add_points() calls"""
+        self._event_bus = event_bus
+    
+    def __len__(self):
+        return len(self._entry_kinds)
+    
+    def _append(self, slot, kind, points, reference=0):
+        today = date.today().toordinal()
+        self._entry_members.append(slot)
+        self._entry_kinds.append(kind)
+        self._entry_points.append(points)
+        self._entry_days.append(today)
+        self._entry_references.append(reference)
+        self._last_activity[slot] = today
+    
+    def add_member(self, guest):
+        """Track a guest's loyalty program now or whenever they enroll"""
+        guest.add_change_listener(self._guest_listener)
+        self._enroll(guest)
+    
+    def _enroll(self, guest):
+        # An existing balance is carried over as an opening adjustment
+        program = guest.get_loyalty_program()
+        if program is None:
+            return
+        with self._lock:
+            if guest.get_guest_id() in self._slots:
+                return
+            slot = len(self._programs)
+            self._slots[guest.get_guest_id()] = slot
+            self._programs.append(program)
+            self._balances.append(program.get_points())
+            self._free_nights.append(program.get_free_nights_earned())
+            self._tiers.append(TIERS.index(program.get_tier()))
+            self._last_activity.append(date.today().toordinal())
+            if program.get_points():
+                self._append(slot, _FIELD_KINDS['adjust'], program.get_points())
+            program.set_member_id(guest.get_guest_id())
+            program.add_change_listener(self._change_listener)
+    
+    def _on_guest_change(self, guest, field, old_value):
+        if field == 'loyalty_program':
+            self._enroll(guest)
+    
+    def _on_change(self, program, field, old_points):
+        with self._lock:
+            slot = self._slots[program.get_member_id()]
+            kind = _FIELD_KINDS[field]
+            self._append(slot, kind, program.get_points() - old_points)
+            self._balances[slot] = program.get_points()
+            self._tiers[slot] = TIERS.index(program.get_tier())
+            if kind == _FREE_NIGHT:
+                self._free_nights[slot] += 1
+        if kind == _EARN and self._event_bus is not None:
+            self._event_bus.offer(PointsEarned, program, program.get_points() - old_points, program.get_points())
+    
+    def _post(self, slot, kind, points, reference):
+        """Book a booking credit or reversal and push the new balance to the program"""
+        self._append(slot, kind, points, reference)
+        self._balances[slot] += points
+        balance = self._balances[slot]
+        self._tiers[slot] = tier_code(balance)
+        self._programs[slot].apply_balance(balance, TIERS[self._tiers[slot]])
+        return balance
+    
+    def earn_for_booking(self, booking):
+        """Credit a stay to the guest once, on payment or checkout; returns points earned"""
+        with self._lock:
+            slot = self._slots.get(booking.get_guest().get_guest_id())
+            if slot is None or booking.get_booking_id() in self._accrued:
+                return 0
+            points = points_for_booking(booking)
+            self._accrued[booking.get_booking_id()] = points
+            if not points:
+                return 0
+            balance = self._post(slot, _EARN, points, booking.get_booking_id())
+            program = self._programs[slot]
+        # Published outside the lock so a slow subscriber cannot stall other ledger operations
+        if self._event_bus is not None:
+            self._event_bus.offer(PointsEarned, program, points, balance)
+        return points
+    
+    def reverse_for_booking(self, booking):
+        """Take back the points a cancelled stay earned, never below a zero balance; returns points reversed"""
+        with self._lock:
+            slot = self._slots.get(booking.get_guest().get_guest_id())
+            points = self._accrued.get(booking.get_booking_id())
+            if slot is None or not points:
+                return 0
+            # Kept as a zero entry so the stay cannot be credited again
+            self._accrued[booking.get_booking_id()] = 0
+            points = min(points, self._balances[slot])
+            if points:
+                self._post(slot, _REVERSE, -points, booking.get_booking_id())
+            return points
+    
+    def mark_accrued(self, bookings):
+        """Note stays whose points are already in the members' balances, e.g. after loading them"""
+        with self._lock:
+            for booking in bookings:
+                self._accrued.setdefault(booking.get_booking_id(),
+                                         0 if booking.get_status() == "Cancelled" else points_for_booking(booking))
+    
+    def accrue_completed(self, bookings):
+        """Batch-credit completed bookings not yet accrued; returns (bookings credited, points)"""
+        credited = 0
+        total = 0
+        with self._lock:
+            touched = set()
+            for booking in bookings:
+                if booking.get_status() != "Completed" or booking.get_booking_id() in self._accrued:
+                    continue
+                slot = self._slots.get(booking.get_guest().get_guest_id())
+                if slot is None:
+                    continue
+                points = points_for_booking(booking)
+                self._accrued[booking.get_booking_id()] = points
+                if not points:
+                    continue
+                self._append(slot, _EARN, points, booking.get_booking_id())
+                self._balances[slot] += points
+                touched.add(slot)
+                credited += 1
+                total += points
+            self.recompute_tiers(touched)
+        return credited, total
+    
+    def find_inactive(self, as_of=None, inactive_days=730):
+        """Guest ids of members with a balance and no activity for `inactive_days`"""
+        cutoff = (as_of or date.today()).toordinal() - inactive_days
+        with self._lock:
+            return [self._programs[slot].get_member_id()
+                    for slot, (balance, last_activity) in enumerate(zip(self._balances, self._last_activity))
+                    if balance > 0 and last_activity < cutoff]
+    
+    def expire_members(self, guest_ids):
+        """Expire the whole balance of each listed member; returns points expired"""
+        expired = 0
+        with self._lock:
+            touched = set()
+            for guest_id in guest_ids:
+                slot = self._slot(guest_id)
+                balance = self._balances[slot]
+                if balance <= 0:
+                    continue
+                last_activity = self._last_activity[slot]
+                self._append(slot, _EXPIRE, -balance)
+                # Expiry is not member activity
+                self._last_activity[slot] = last_activity
+                self._balances[slot] = 0
+                touched.add(slot)
+                expired += balance
+            self.recompute_tiers(touched)
+        return expired
+    
+    def expire_inactive(self, as_of=None, inactive_days=730):
+        """Expire whole balances of members with no activity for `inactive_days`"""
+        with self._lock:
+            return self.expire_members(self.find_inactive(as_of, inactive_days))
+    
+    def recompute_tiers(self, touched=None):
+        """Recompute every tier from the cached balances in one pass and push changes to programs"""
+        with self._lock:
+            tiers = array('b', map(tier_code, self._balances))
+            changed = touched or set()
+            changed.update(slot for slot, (old, new) in enumerate(zip(self._tiers, tiers)) if old != new)
+            self._tiers = tiers
+            for slot in changed:
+                self._programs[slot].apply_balance(self._balances[slot], TIERS[tiers[slot]])
+            return len(changed)
+    
+    def _slot(self, guest_id):
+        if guest_id not in self._slots:
+            raise ValueError("Guest is not enrolled in the loyalty program")
+        return self._slots[guest_id]
+    
+    def get_balance(self, guest_id):
+        return self._balances[self._slot(guest_id)]
+    
+    def get_tier(self, guest_id):
+        return TIERS[self._tiers[self._slot(guest_id)]]
+    
+    def get_free_nights(self, guest_id):
+        return self._free_nights[self._slot(guest_id)]
+    
+    def get_tier_counts(self):
+        counts = [0] * len(TIERS)
+        for tier in self._tiers:
+            counts[tier] += 1
+        return dict(zip(TIERS, counts))
+    
+    def get_entries(self, guest_id):
+        """Statement for one member as (kind, points, date, booking id) tuples"""
+        slot = self._slot(guest_id)
+        with self._lock:
+            return [(ENTRY_KINDS.name(kind), points, date.fromordinal(day), reference or None)
+                    for member, kind, points, day, reference in zip(
+                        self._entry_members, self._entry_kinds, self._entry_points,
+                        self._entry_days, self._entry_references)
+                    if member == slot]
+    
+    def check_consistency(self):
+        """Replay the ledger and compare against the cached balances"""
+        with self._lock:
+            balances = [0] * len(self._programs)
+            for member, points in zip(self._entry_members, self._entry_points):
+                balances[member] += points
+            return (balances == list(self._balances)
+                    and all(program.get_points() == balance
+                            for program, balance in zip(self._programs, balances)))
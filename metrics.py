@@ -0,0 +1,289 @@
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+
+# Log-linear buckets: values below 2**PRECISION_BITS get their own bucket,
+# above that each power of two is split into 2**(PRECISION_BITS - 1) buckets
+PRECISION_BITS = 5
+_HALF = 1 << (PRECISION_BITS - 1)
+
+def _bucket(value):
+    if value < (1 << PRECISION_BITS):
+        return value
+    shift = value.bit_length() - PRECISION_BITS
+    return shift * _HALF + (value >> shift)
+
+def _bucket_bounds(index):
+    """[low, high) nanoseconds covered by a bucket"""
+    if index < (1 << PRECISION_BITS):
+        return index, index + 1
+    shift = index // _HALF - 1
+    top = index % _HALF + _HALF
+    return top << shift, (top + 1) << shift
+
+class LatencyHistogram:
+    """HDR-style histogram of nanosecond latencies with ~6% relative precision"""
+    
+    __slots__ = ('_counts', '_count', '_total', '_max')
+    
+    def __init__(self):
+        self._counts = {}
+        self._count = 0
+        self._total = 0
+        self._max = 0
+    
+    def record(self, nanoseconds):
+        index = _bucket(nanoseconds)
+        self._counts[index] = self._counts.get(index, 0) + 1
+        self._count += 1
+        self._total += nanoseconds
+        if nanoseconds > self._max:
+            self._max = nanoseconds
+    
+    def get_count(self):
+        return self._count
+    
+    def get_total(self):
+        return self._total
+    
+    def get_max(self):
+        return self._max
+    
+    def percentile(self, fraction):
+        """Upper bound in nanoseconds of the bucket holding the given fraction of samples"""
+        if not self._count:
+            return 0
+        rank = max(int(self._count * fraction + 0.5), 1)
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= rank:
+                return min(_bucket_bounds(index)[1] - 1, self._max)
+        return self._max
+    
+    def cumulative_buckets(self):
+        """(upper bound in nanoseconds, cumulative count) for every non-empty bucket"""
+        seen = 0
+        buckets = []
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            buckets.append((_bucket_bounds(index)[1], seen))
+        return buckets
+
+class OperationStats:
+    """Call and error counters plus a latency histogram for one operation"""
+    
+    __slots__ = ('_name', '_calls', '_errors', '_histogram', '_lock')
+    
+    def __init__(self, name):
+        self._name = name
+        self._calls = 0
+        self._errors = 0
+        self._histogram = LatencyHistogram()
+        self._lock = threading.Lock()
+    
+    def reset(self):
+        with self._lock:
+            self._calls = 0
+            self._errors = 0
+            self._histogram = LatencyHistogram()
+    
+    def get_name(self):
+        return self._name
+    
+    def get_calls(self):
+        return self._calls
+    
+    def get_errors(self):
+        return self._errors
+    
+    def get_histogram(self):
+        return self._histogram
+    
+    def tick(self, period):
+        """Count a call; returns True when this call should be timed"""
+        with self._lock:
+            self._calls += 1
+            return self._calls % period == 0
+    
+    def error(self):
+        with self._lock:
+            self._errors += 1
+    
+    def record(self, nanoseconds):
+        with self._lock:
+            self._histogram.record(nanoseconds)
+    
+    def snapshot(self):
+        with self._lock:
+            histogram = self._histogram
+            return {
+                'calls': self._calls,
+                'errors': self._errors,
+                'sampled': histogram.get_count(),
+                'mean_us': histogram.get_total() / histogram.get_count() / 1000 if histogram.get_count() else 0.0,
+                'p50_us': histogram.percentile(0.5) / 1000,
+                'p90_us': histogram.percentile(0.9) / 1000,
+                'p99_us': histogram.percentile(0.99) / 1000,
+                'max_us': histogram.get_max() / 1000,
+            }
+
+def default_targets():
+    """(class, method names, label) for the public HotelSystem API and its hot internals"""
+    from hotel_system import HotelSystem
+    from booking import Invoice
+    from payment import CreditCardPayment, DebitCardPayment, MobileWalletPayment
+    from occupancy import OccupancyCalendar
+    public = [name for name, member in vars(HotelSystem).items()
+              if not name.startswith('_') and callable(member)]
+    return [
+        (HotelSystem, public, 'HotelSystem'),
+        (Invoice, ['_update_invoice'], 'Invoice'),
+        (CreditCardPayment, ['process_payment'], 'CreditCardPayment'),
+        (DebitCardPayment, ['process_payment'], 'DebitCardPayment'),
+        (MobileWalletPayment, ['process_payment'], 'MobileWalletPayment'),
+        (OccupancyCalendar, ['free_rooms'], 'OccupancyCalendar'),
+    ]
+
+class Instrumentation:
+    """Counts, errors and sampled latency for selected methods.
+    
+    enable() swaps each target method for a timing wrapper on its class and
+    disable() puts the original back, so while disabled the code runs with
+    no instrumentation at all. Every call is counted; with sample_rate below
+    1 only every n-th call is timed.
+    """
+    
+    def __init__(self):
+        self._stats = {}
+        self._originals = []
+        self._lock = threading.Lock()
+    
+    def is_enabled(self):
+        return bool(self._originals)
+    
+    def get_stats(self, name):
+        return self._stats.get(name)
+    
+    def _wrap(self, function, stats, period):
+        clock = time.perf_counter_ns
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def timed_async(*args, **kwargs):
+                if not stats.tick(period):
+                    try:
+                        return await function(*args, **kwargs)
+                    except Exception:
+                        stats.error()
+                        raise
+                started = clock()
+                try:
+                    return await function(*args, **kwargs)
+                except Exception:
+                    stats.error()
+                    raise
+                finally:
+                    stats.record(clock() - started)
+            return timed_async
+        
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            if not stats.tick(period):
+                try:
+                    return function(*args, **kwargs)
+                except Exception:
+                    stats.error()
+                    raise
+            started = clock()
+            try:
+                return function(*args, **kwargs)
+            except Exception:
+                stats.error()
+                raise
+            finally:
+                stats.record(clock() - started)
+        return timed
+    
+    def enable(self, targets=None, sample_rate=1.0):
+        """Instrument `targets` ((class, method names, label) tuples; default_targets() if None)"""
+        if not 0 < sample_rate <= 1:
+            raise ValueError("Sample rate must be in (0, 1]")
+        period = max(int(round(1 / sample_rate)), 1)
+        with self._lock:
+            if self._originals:
+                raise ValueError("Instrumentation is already enabled")
+            for target_class, names, label in (targets or default_targets()):
+                for name in names:
+                    original = target_class.__dict__[name]
+                    metric = f"{label}.{name}"
+                    stats = self._stats.get(metric)
+                    if stats is None:
+                        stats = self._stats[metric] = OperationStats(metric)
+                    setattr(target_class, name, self._wrap(original, stats, period))
+                    self._originals.append((target_class, name, original))
+    
+    def disable(self):
+        with self._lock:
+            for target_class, name, original in reversed(self._originals):
+                setattr(target_class, name, original)
+            self._originals = []
+    
+    def reset(self):
+        """Zero every counter and histogram; installed wrappers keep recording into them"""
+        for stats in self._stats.values():
+            stats.reset()
+    
+    def to_dict(self):
+        return {name: stats.snapshot() for name, stats in sorted(self._stats.items())}
+    
+    def to_prometheus(self, prefix='hotel'):
+        """Prometheus text exposition: call/error counters and a latency histogram per operation"""
+        lines = [
+            f"# HELP {prefix}_operation_calls_total Calls per operation",
+            f"# TYPE {prefix}_operation_calls_total counter",
+        ]
+        stats_items = sorted(self._stats.items())
+        lines.extend(f'{prefix}_operation_calls_total{{operation="{name}"}} {stats.get_calls()}'
+                     for name, stats in stats_items)
+        lines.append(f"# HELP {prefix}_operation_errors_total Calls that raised, per operation")
+        lines.append(f"# TYPE {prefix}_operation_errors_total counter")
+        lines.extend(f'{prefix}_operation_errors_total{{operation="{name}"}} {stats.get_errors()}'
+                     for name, stats in stats_items)
+        lines.append(f"# HELP {prefix}_operation_latency_seconds Sampled latency per operation")
+        lines.append(f"# TYPE {prefix}_operation_latency_seconds histogram")
+        for name, stats in stats_items:
+            histogram = stats.get_histogram()
+            for upper, count in histogram.cumulative_buckets():
+                lines.append(f'{prefix}_operation_latency_seconds_bucket{{operation="{name}",le="{upper / 1e9:.9g}"}} '
+                             f'{count}')
+            lines.append(f'{prefix}_operation_latency_seconds_bucket{{operation="{name}",le="+Inf"}} '
+                         f'{histogram.get_count()}')
+            lines.append(f'{prefix}_operation_latency_seconds_sum{{operation="{name}"}} '
+                         f'{histogram.get_total() / 1e9:.9g}')
+            lines.append(f'{prefix}_operation_latency_seconds_count{{operation="{name}"}} {histogram.get_count()}')
+        return "\n".join(lines) + "\n"
+    
+    @staticmethod
+    def _write(path, text):
+        # Written beside the target and renamed so scrapers never read a partial file
+        temporary = f"{path}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as target:
+            target.write(text)
+        os.replace(temporary, path)
+    
+    def write_prometheus(self, path, prefix='hotel'):
+        self._write(path, self.to_prometheus(prefix))
+    
+    def write_json(self, path):
+        self._write(path, json.dumps(self.to_dict(), indent=2))
+
+metrics = Instrumentation()
+
+def enable(targets=None, sample_rate=1.0):
+    metrics.enable(targets, sample_rate)
+
+def disable():
+    metrics.disable()
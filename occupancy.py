@@ -0,0 +1,210 @@
+import threading
+from collections import deque
+from itertools import islice
+
+class _CalendarRow:
+    """Schedule listener that mirrors one room's reservations into the calendar"""
+    
+    __slots__ = ('_calendar', '_bit')
+    
+    def __init__(self, calendar, slot):
+        self._calendar = calendar
+        self._bit = 1 << slot
+    
+    def __call__(self, start_day, end_day, reserved):
+        self._calendar._mark(self._bit, start_day, end_day, reserved)
+
+class OccupancyCalendar:
+    """Rooms x days occupancy bitmap.
+    
+    Each night is stored as one integer whose bit i is set when the room in
+    slot i is occupied, so a column of the matrix is a single integer.
+    Stay-level queries reduce a slice of nights with OR/AND, which runs in C
+    over all rooms at once instead of looping over Room objects.
+    """
+    
+    def __init__(self):
+        """Initialize an empty calendar"""
+        self._rooms = []
+        self._type_masks = {}
+        self._all_mask = 0
+        self._nights = {}
+        self._version = 0
+        # (version, first night, last night + 1) of recent changes, for incremental consumers
+        self._changes = deque(maxlen=4096)
+        self._lock = threading.Lock()
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _to_day(value):
+        return value.toordinal()
+    
+    def get_rooms(self):
+        return self._rooms
+    
+    def get_version(self):
+        """Counter bumped on every occupancy change, usable for cache invalidation"""
+        return self._version
+    
+    def changes_since(self, version):
+        """Night ranges changed after `version`, or None if they are no longer all retained"""
+        with self._lock:
+            if version == self._version:
+                return []
+            if not self._changes or self._changes[0][0] > version + 1:
+                return None
+            # Versions are consecutive, so the newest entries are exactly the ones needed
+            return [(start_day, end_day) for _, start_day, end_day
+                    in islice(reversed(self._changes), self._version - version)]
+    
+    def add_room(self, room):
+        """Assign the room a slot and start tracking its schedule"""
+        with self._lock:
+            slot = len(self._rooms)
+            self._rooms.append(room)
+            bit = 1 << slot
+            self._all_mask |= bit
+            room_type = room.get_room_type().lower()
+            self._type_masks[room_type] = self._type_masks.get(room_type, 0) | bit
+        for start_day, end_day in room.get_schedule().get_reservations():
+            self._mark(bit, start_day, end_day, True)
+        room.get_schedule().add_listener(_CalendarRow(self, slot))
+        return slot
+    
+    def _mark(self, bit, start_day, end_day, reserved):
+        nights = self._nights
+        with self._lock:
+            for day in range(start_day, end_day):
+                if reserved:
+                    nights[day] = nights.get(day, 0) | bit
+                else:
+                    mask = nights.get(day, 0) & ~bit
+                    if mask:
+                        nights[day] = mask
+                    else:
+                        nights.pop(day, None)
+            self._version += 1
+            self._changes.append((self._version, start_day, end_day))
+    
+    def get_nights(self):
+        """Copy of the night -> occupied-rooms bitmask map, for planning against a scratch state"""
+        with self._lock:
+            return dict(self._nights)
+    
+    def get_type_mask(self, room_type=None):
+        """Bitmask of the slots holding rooms of a type (all rooms if None)"""
+        return self._type_mask(room_type)
+    
+    def _type_mask(self, room_type):
+        if room_type is None:
+            return self._all_mask
+        return self._type_masks.get(room_type.lower(), 0)
+    
+    def _rooms_in(self, mask):
+        rooms = []
+        while mask:
+            low = mask & -mask
+            rooms.append(self._rooms[low.bit_length() - 1])
+            mask ^= low
+        return rooms
+    
+    def occupied_mask(self, check_in, check_out):
+        """Bitmask of rooms occupied on at least one night of [check_in, check_out)"""
+        nights = self._nights
+        mask = 0
+        for day in range(self._to_day(check_in), self._to_day(check_out)):
+            mask |= nights.get(day, 0)
+        return mask
+    
+    def free_mask(self, check_in, check_out, room_type=None):
+        """Bitmask of rooms free for every night of [check_in, check_out)"""
+        if self._to_day(check_out) <= self._to_day(check_in):
+            raise ValueError("Check-out must be after check-in")
+        return self._type_mask(room_type) & ~self.occupied_mask(check_in, check_out)
+    
+    def free_rooms(self, check_in, check_out, room_type=None):
+        return self._rooms_in(self.free_mask(check_in, check_out, room_type))
+    
+    def select_free_rooms(self, check_in, check_out, room_counts):
+        """Pick rooms free for [check_in, check_out): room_counts maps room type to rooms wanted.
+        
+        The stay's nights are OR-ed once and every type is picked from the
+        same mask, lowest slots first, skipping rooms taken out of service.
+        Raises ValueError naming the first type that cannot be filled.
+        """
+        if self._to_day(check_out) <= self._to_day(check_in):
+            raise ValueError("Check-out must be after check-in")
+        free = ~self.occupied_mask(check_in, check_out)
+        selected = {}
+        for room_type, count in room_counts.items():
+            mask = self._type_mask(room_type) & free
+            rooms = []
+            while mask and len(rooms) < count:
+                low = mask & -mask
+                room = self._rooms[low.bit_length() - 1]
+                if room.is_available():
+                    rooms.append(room)
+                mask ^= low
+            if len(rooms) < count:
+                raise ValueError(f"Only {len(rooms)} {room_type} rooms are free, {count} requested")
+            selected[room_type] = rooms
+        return selected
+    
+    def count_free(self, check_in, check_out, room_type=None):
+        return self.free_mask(check_in, check_out, room_type).bit_count()
+    
+    def count_rooms(self, room_type=None):
+        return self._type_mask(room_type).bit_count()
+    
+    def occupied_count(self, night, room_type=None):
+        return (self._nights.get(self._to_day(night), 0) & self._type_mask(room_type)).bit_count()
+    
+    def occupancy_by_night(self, start, days=365, room_type=None):
+        """Occupancy percentage for each of the `days` nights starting at `start`"""
+        type_mask = self._type_mask(room_type)
+        total = type_mask.bit_count()
+        if not total:
+            return [0.0] * days
+        first = self._to_day(start)
+        nights = self._nights
+        return [(nights.get(day, 0) & type_mask).bit_count() * 100.0 / total
+                for day in range(first, first + days)]
+    
+    def rooms_free_consecutive(self, room_type, start, end, nights=3):
+        """Rooms with at least `nights` consecutive free nights inside [start, end)"""
+        type_mask = self._type_mask(room_type)
+        first = self._to_day(start)
+        last = self._to_day(end)
+        if nights <= 0 or last - first < nights:
+            return []
+        free = [type_mask & ~self._nights.get(day, 0) for day in range(first, last)]
+        # Doubling: run[k] has bit i set when room i is free for 2**k nights from that day
+        result_mask = 0
+        run = free
+        span = 1
+        windows = [(free, 1)]
+        while span * 2 <= nights:
+            run = [run[i] & run[i + span] for i in range(len(run) - span)]
+            span *= 2
+            windows.append((run, span))
+        for offset in range(last - first - nights + 1):
+            mask = type_mask
+            covered = 0
+            for run, span in reversed(windows):
+                while covered + span <= nights:
+                    mask &= run[offset + covered]
+                    covered += span
+                if not mask:
+                    break
+            result_mask |= mask
+            if result_mask == type_mask:
+                break
+        return self._rooms_in(result_mask)
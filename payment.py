@@ -1,11 +1,18 @@
+from status import StatusTable
+from ids import next_id
+
+PAYMENT_STATUSES = StatusTable("Pending", "Completed", "Failed")
+
 class Payment:
     """Base class for payment methods"""
     
+    __slots__ = ('_amount', '_payment_date', '_status', '_transaction_id')
+    
     def __init__(self, amount, payment_date):
         """Initialize a payment"""
         self._amount = amount
         self._payment_date = payment_date
-        self._status = "Pending"
+        self._status = PAYMENT_STATUSES.code("Pending")
         self._transaction_id = None
     
     def get_amount(self):
@@ -15,7 +22,7 @@ class Payment:
         return self._payment_date
     
     def get_status(self):
-        return self._status
+        return PAYMENT_STATUSES.name(self._status)
     
     def get_transaction_id(self):
         return self._transaction_id
@@ -27,7 +34,10 @@ class Payment:
         self._payment_date = payment_date
     
     def set_status(self, status):
-        self._status = status
+        self._status = PAYMENT_STATUSES.code(status)
+    
+    def set_transaction_id(self, transaction_id):
+        self._transaction_id = transaction_id
     
     def process_payment(self):
         raise NotImplementedError
@@ -35,11 +45,13 @@ class Payment:
     def __str__(self):
         return (f"Payment Amount: ${self._amount:.2f}\n"
                 f"Date: {self._payment_date}\n"
-                f"Status: {self._status}")
+                f"Status: {self.get_status()}")
 
 class CreditCardPayment(Payment):
     """Credit card payment method"""
     
+    __slots__ = ('_card_number', '_card_holder', '_expiry_date', '_cvv')
+    
     def __init__(self, amount, payment_date, card_number, card_holder, expiry_date, cvv):
         super().__init__(amount, payment_date)
         self._card_number = card_number
@@ -73,8 +85,8 @@ class CreditCardPayment(Payment):
     
     def process_payment(self):
         """Process the credit card payment"""
-        self._transaction_id = f"CC-{self._payment_date.strftime('%Y%m%d%H%M%S')}"
-        self._status = "Completed"
+        self._transaction_id = f"CC-{next_id()}"
+        self._status = PAYMENT_STATUSES.code("Completed")
         return True
     
     def __str__(self):
@@ -86,6 +98,8 @@ class CreditCardPayment(Payment):
 class DebitCardPayment(Payment):
     """Debit card payment method"""
     
+    __slots__ = ('_card_number', '_card_holder', '_expiry_date', '_cvv')
+    
     def __init__(self, amount, payment_date, card_number, card_holder, expiry_date, cvv):
         super().__init__(amount, payment_date)
         self._card_number = card_number
@@ -119,8 +133,8 @@ class DebitCardPayment(Payment):
     
     def process_payment(self):
         """Process the debit card payment"""
-        self._transaction_id = f"DC-{self._payment_date.strftime('%Y%m%d%H%M%S')}"
-        self._status = "Completed"
+        self._transaction_id = f"DC-{next_id()}"
+        self._status = PAYMENT_STATUSES.code("Completed")
         return True
     
     def __str__(self):
@@ -132,6 +146,8 @@ class DebitCardPayment(Payment):
 class MobileWalletPayment(Payment):
     """Mobile wallet payment method"""
     
+    __slots__ = ('_wallet_type', '_phone_number')
+    
     def __init__(self, amount, payment_date, wallet_type, phone_number):
         super().__init__(amount, payment_date)
         self._wallet_type = wallet_type
@@ -151,8 +167,8 @@ class MobileWalletPayment(Payment):
     
     def process_payment(self):
         """Process the mobile wallet payment"""
-        self._transaction_id = f"MW-{self._payment_date.strftime('%Y%m%d%H%M%S')}"
-        self._status = "Completed"
+        self._transaction_id = f"MW-{next_id()}"
+        self._status = PAYMENT_STATUSES.code("Completed")
         return True
     
     def __str__(self):
@@ -0,0 +1,261 @@
+import asyncio
+import random
+import time
+from ids import next_id
+
+class GatewayError(Exception):
+    """Raised by a payment gateway when a charge is declined or fails"""
+
+class LocalGatewayStub:
+    """In-process gateway that simulates network latency, declines and batch settlement.
+    
+    Charges are idempotent by key, as with a real gateway: a key that was
+    already charged is answered from the record without charging again. A
+    charge is booked before the response is sent, so with `stall_rate` some
+    responses arrive only after `stall` seconds, after the caller has timed
+    out, even though the money has moved.
+    """
+    
+    supports_batch = True
+    
+    def __init__(self, latency=0.005, jitter=0.002, failure_rate=0.02, batch_limit=50, seed=None,
+                 stall_rate=0.0, stall=10.0):
+        self._latency = latency
+        self._jitter = jitter
+        self._failure_rate = failure_rate
+        self._batch_limit = batch_limit
+        self._random = random.Random(seed)
+        self._stall_rate = stall_rate
+        self._stall = stall
+        self._calls = 0
+        # idempotency key -> True once charged, False while only declined
+        self._charges = {}
+    
+    def get_calls(self):
+        return self._calls
+    
+    def get_charged(self):
+        """Number of distinct payments actually charged"""
+        return sum(self._charges.values())
+    
+    def get_batch_limit(self):
+        return self._batch_limit
+    
+    async def _round_trip(self):
+        self._calls += 1
+        delay = self._latency + self._random.uniform(-self._jitter, self._jitter)
+        if self._stall_rate and self._random.random() < self._stall_rate:
+            delay += self._stall
+        await asyncio.sleep(max(delay, 0))
+    
+    def _charge(self, idempotency_key):
+        if self._charges.get(idempotency_key):
+            return True
+        succeeded = self._random.random() >= self._failure_rate
+        self._charges[idempotency_key] = succeeded
+        return succeeded
+    
+    async def charge(self, payment, idempotency_key):
+        succeeded = self._charge(idempotency_key)
+        await self._round_trip()
+        if not succeeded:
+            raise GatewayError("Charge declined")
+        return True
+    
+    async def settle_batch(self, payments, idempotency_keys):
+        """Settle several payments in one round trip; returns a success flag per payment"""
+        if len(payments) > self._batch_limit:
+            raise ValueError("Batch exceeds gateway limit")
+        results = [self._charge(key) for key in idempotency_keys]
+        await self._round_trip()
+        return results
+    
+    async def get_statuses(self, idempotency_keys):
+        """True if charged, False if declined, None if the gateway never saw the key"""
+        await self._round_trip()
+        return [self._charges.get(key) for key in idempotency_keys]
+
+class PaymentPipeline:
+    """Queue payments and dispatch them to a gateway with bounded concurrency.
+    
+    Queued payments are grouped into batches of up to `batch_size` (waiting at
+    most `batch_window` seconds to fill one), split per payment method so each
+    method gets its own timeout, and settled in one gateway call when the
+    gateway supports batching. Failed or timed-out payments are retried with
+    exponential backoff before being marked Failed.
+    
+    Every payment carries an idempotency key that is sent again on each
+    retry, so the gateway never charges it twice. A call that times out or
+    breaks off leaves its payments unknown rather than failed: the pipeline
+    asks the gateway for their status and only re-sends the ones it has
+    not charged. Payments still unknown after the last retry stay Pending.
+    """
+    
+    DEFAULT_TIMEOUTS = {'credit': 2.0, 'debit': 2.0, 'mobile': 3.0}
+    
+    def __init__(self, gateway, concurrency=32, batch_size=20, batch_window=0.002,
+                 max_retries=3, backoff=0.01, timeouts=None):
+        self._gateway = gateway
+        self._concurrency = concurrency
+        self._batch_size = min(batch_size, getattr(gateway, 'get_batch_limit', lambda: batch_size)())
+        self._batch_window = batch_window
+        self._max_retries = max_retries
+        self._backoff = backoff
+        self._timeouts = dict(self.DEFAULT_TIMEOUTS, **(timeouts or {}))
+        self._queue = None
+        self._semaphore = None
+        self._dispatcher = None
+        self._in_flight = set()
+        self._unresolved = 0
+        self._latencies = []
+        self._failures = 0
+        self._unknown = 0
+    
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._semaphore = asyncio.Semaphore(self._concurrency)
+        self._dispatcher = asyncio.create_task(self._dispatch())
+    
+    async def __aenter__(self):
+        await self.start()
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.close()
+    
+    def submit(self, payment, payment_method, idempotency_key=None):
+        """Queue a payment; the returned future resolves to it once settled or failed"""
+        future = asyncio.get_running_loop().create_future()
+        if idempotency_key is None:
+            idempotency_key = str(next_id())
+        self._unresolved += 1
+        self._queue.put_nowait((payment, payment_method.lower(), future, time.perf_counter(), idempotency_key))
+        return future
+    
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self._batch_window
+        while len(batch) < self._batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+    
+    async def _dispatch(self):
+        while True:
+            batch = await self._next_batch()
+            by_method = {}
+            for entry in batch:
+                by_method.setdefault(entry[1], []).append(entry)
+            for payment_method, entries in by_method.items():
+                await self._semaphore.acquire()
+                task = asyncio.create_task(self._settle(payment_method, entries))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+    
+    async def _send(self, payment_method, entries):
+        """True (charged), False (declined) or None (unknown) for each entry"""
+        timeout = self._timeouts.get(payment_method, 2.0)
+        if getattr(self._gateway, 'supports_batch', False) and len(entries) > 1:
+            try:
+                return await asyncio.wait_for(
+                    self._gateway.settle_batch([entry[0] for entry in entries], [entry[4] for entry in entries]),
+                    timeout)
+            except GatewayError:
+                return [False] * len(entries)
+            except Exception:
+                # The gateway may have charged some or all of the batch before the call broke off
+                return [None] * len(entries)
+        results = []
+        for entry in entries:
+            try:
+                results.append(await asyncio.wait_for(self._gateway.charge(entry[0], entry[4]), timeout))
+            except GatewayError:
+                results.append(False)
+            except Exception:
+                results.append(None)
+        return results
+    
+    async def _check_unknown(self, payment_method, entries, results):
+        """Replace unknown results with what the gateway reports for those keys"""
+        unknown = [index for index, result in enumerate(results) if result is None]
+        if not unknown or not hasattr(self._gateway, 'get_statuses'):
+            return results
+        try:
+            statuses = await asyncio.wait_for(self._gateway.get_statuses([entries[index][4] for index in unknown]),
+                                              self._timeouts.get(payment_method, 2.0))
+        except Exception:
+            return results
+        results = list(results)
+        for index, status in zip(unknown, statuses):
+            # A key the gateway never saw was not charged, so it is safe to send again
+            results[index] = False if status is None else status
+        return results
+    
+    async def _settle(self, payment_method, entries):
+        try:
+            pending = entries
+            results = []
+            for attempt in range(self._max_retries + 1):
+                results = await self._send(payment_method, pending)
+                results = await self._check_unknown(payment_method, pending, results)
+                retry = []
+                retry_results = []
+                for entry, succeeded in zip(pending, results):
+                    if succeeded:
+                        entry[0].process_payment()
+                        self._resolve(entry)
+                    else:
+                        # Retried with the same idempotency key, so an unknown charge is not repeated
+                        retry.append(entry)
+                        retry_results.append(succeeded)
+                pending = retry
+                results = retry_results
+                if not pending:
+                    return
+                if attempt < self._max_retries:
+                    await asyncio.sleep(self._backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+            for entry, result in zip(pending, results):
+                if result is None:
+                    # Neither charged nor declined as far as we know; left Pending for reconciliation
+                    self._unknown += 1
+                else:
+                    entry[0].set_status("Failed")
+                    self._failures += 1
+                self._resolve(entry)
+        finally:
+            self._semaphore.release()
+    
+    def _resolve(self, entry):
+        payment, _, future, queued_at, _ = entry
+        self._unresolved -= 1
+        self._latencies.append(time.perf_counter() - queued_at)
+        if not future.done():
+            future.set_result(payment)
+    
+    async def close(self):
+        """Wait for queued and in-flight payments, then stop the dispatcher"""
+        while self._unresolved:
+            await asyncio.sleep(self._batch_window)
+        self._dispatcher.cancel()
+        try:
+            await self._dispatcher
+        except asyncio.CancelledError:
+            pass
+    
+    def get_stats(self):
+        """Count, failures, unknown outcomes and p50/p99 latency in seconds for resolved payments"""
+        latencies = sorted(self._latencies)
+        if not latencies:
+            return {'count': 0, 'failures': 0, 'unknown': 0, 'p50': 0.0, 'p99': 0.0}
+        return {
+            'count': len(latencies),
+            'failures': self._failures,
+            'unknown': self._unknown,
+            'p50': latencies[len(latencies) // 2],
+            'p99': latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)],
+        }
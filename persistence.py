@@ -0,0 +1,145 @@
+import json
+import os
+import pickle
+import threading
+import time
+
+class OperationLog:
+    """Append-only JSON-lines operation log with group commit.
+    
+    Appends only go to an in-memory buffer; the buffer is written and fsynced
+    once it holds `batch_size` entries or `sync_interval` seconds have passed,
+    either on the next append or from a background flusher thread.
+    """
+    
+    def __init__(self, path, start_seq=0, batch_size=256, sync_interval=0.01, background=True):
+        self._path = path
+        self._file = open(path, 'ab')
+        self._seq = start_seq
+        self._batch_size = batch_size
+        self._sync_interval = sync_interval
+        self._buffer = []
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._flusher = None
+        if background and sync_interval:
+            self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+            self._flusher.start()
+    
+    def get_path(self):
+        return self._path
+    
+    def get_seq(self):
+        return self._seq
+    
+    def append(self, op, args):
+        """Buffer an operation and return its sequence number"""
+        with self._lock:
+            self._seq += 1
+            self._buffer.append(json.dumps({'seq': self._seq, 'op': op, 'args': args},
+                                           separators=(',', ':')))
+            if (len(self._buffer) >= self._batch_size
+                    or time.monotonic() - self._last_sync >= self._sync_interval):
+                self._flush_locked()
+            return self._seq
+    
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+    
+    def _flush_locked(self):
+        if self._buffer:
+            self._file.write(('\n'.join(self._buffer) + '\n').encode('utf-8'))
+            self._buffer = []
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._last_sync = time.monotonic()
+    
+    def _flush_periodically(self):
+        while not self._closed.wait(self._sync_interval):
+            self.flush()
+    
+    def reset(self):
+        """Drop all logged entries, e.g. once they are covered by a snapshot"""
+        with self._lock:
+            self._flush_locked()
+            self._file.close()
+            self._file = open(self._path, 'wb')
+            os.fsync(self._file.fileno())
+    
+    def close(self):
+        self._closed.set()
+        if self._flusher:
+            self._flusher.join()
+        with self._lock:
+            self._flush_locked()
+            self._file.close()
+    
+    @staticmethod
+    def truncate_torn_tail(path):
+        """Cut off a partially written last entry left behind by a crash"""
+        if not os.path.exists(path):
+            return
+        valid_end = 0
+        with open(path, 'rb') as log_file:
+            for line in log_file:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    json.loads(line)
+                except ValueError:
+                    break
+                valid_end += len(line)
+        if valid_end < os.path.getsize(path):
+            with open(path, 'r+b') as log_file:
+                log_file.truncate(valid_end)
+    
+    @staticmethod
+    def read(path, after_seq=0):
+        """Yield (seq, op, args) for entries after `after_seq`, stopping at a torn tail"""
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb') as log_file:
+            for line in log_file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if entry['seq'] > after_seq:
+                    yield entry['seq'], entry['op'], entry['args']
+
+class SnapshotStore:
+    """Atomically written pickle snapshots tagged with the last covered log sequence"""
+    
+    def __init__(self, path):
+        self._path = path
+    
+    def get_path(self):
+        return self._path
+    
+    def exists(self):
+        return os.path.exists(self._path)
+    
+    def save(self, state, seq, persistent_id=None):
+        tmp_path = self._path + '.tmp'
+        with open(tmp_path, 'wb') as snapshot_file:
+            pickle.dump(seq, snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+            pickler = pickle.Pickler(snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+            if persistent_id:
+                pickler.persistent_id = persistent_id
+            pickler.dump(state)
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(tmp_path, self._path)
+    
+    def load(self, persistent_load=None):
+        """Return (state, seq), or (None, 0) when no snapshot has been written"""
+        if not self.exists():
+            return None, 0
+        with open(self._path, 'rb') as snapshot_file:
+            seq = pickle.load(snapshot_file)
+            unpickler = pickle.Unpickler(snapshot_file)
+            if persistent_load:
+                unpickler.persistent_load = persistent_load
+            return unpickler.load(), seq
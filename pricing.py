@@ -0,0 +1,170 @@
+import threading
+from array import array
+from datetime import date
+from itertools import accumulate
+
+class PricingRules:
+    """Multipliers applied to a room's list price for one night.
+    
+    `occupancy_bands` and `lead_time_bands` are (threshold, multiplier) pairs;
+    the last band whose threshold is reached applies. Occupancy is the
+    percentage of rooms of that type already sold for the night, lead time
+    is days between the quote and the night.
+    """
+    
+    def __init__(self, weekday_multipliers=(1.0, 1.0, 1.0, 1.0, 1.15, 1.2, 1.0),
+                 occupancy_bands=((0, 1.0), (50, 1.05), (70, 1.12), (85, 1.25), (95, 1.4)),
+                 lead_time_bands=((0, 1.1), (3, 1.0), (60, 0.92))):
+        if len(weekday_multipliers) != 7:
+            raise ValueError("Weekday multipliers need one value per day")
+        self._weekday_multipliers = tuple(weekday_multipliers)
+        self._occupancy_bands = sorted(occupancy_bands)
+        self._lead_time_bands = sorted(lead_time_bands)
+    
+    @staticmethod
+    def _band(bands, value):
+        multiplier = 1.0
+        for threshold, band_multiplier in bands:
+            if value < threshold:
+                break
+            multiplier = band_multiplier
+        return multiplier
+    
+    def multiplier(self, night, occupancy, lead_days):
+        return (self._weekday_multipliers[night.weekday()]
+                * self._band(self._occupancy_bands, occupancy)
+                * self._band(self._lead_time_bands, lead_days))
+    
+    def multipliers(self, first_day, occupancy):
+        """Multipliers for consecutive nights from `first_day` (an ordinal, quoted that day)"""
+        weekday = date.fromordinal(first_day).weekday()
+        occupancy_factors = [self._band(self._occupancy_bands, value) for value in occupancy]
+        # Lead-time bands only change at their thresholds, so expand them as runs
+        nights = len(occupancy)
+        lead_factors = []
+        current = 1.0
+        for threshold, multiplier in self._lead_time_bands:
+            lead_factors.extend([current] * max(min(threshold, nights) - len(lead_factors), 0))
+            current = multiplier
+        lead_factors.extend([current] * (nights - len(lead_factors)))
+        weekdays = self._weekday_multipliers
+        return array('d', (weekdays[(weekday + offset) % 7] * occupancy_factor * lead_factor
+                           for offset, (occupancy_factor, lead_factor)
+                           in enumerate(zip(occupancy_factors, lead_factors))))
+
+class _RateTable:
+    __slots__ = ('first_day', 'version', 'multipliers', 'prefix')
+    
+    def __init__(self, first_day, version, multipliers):
+        self.first_day = first_day
+        self.version = version
+        self.multipliers = multipliers
+        self.prefix = array('d', accumulate(multipliers, initial=0.0))
+
+class PricingEngine:
+    """Nightly rates per room type from occupancy, lead time and day of week.
+    
+    For each room type a table of multipliers for the next `horizon` nights
+    is precomputed, with prefix sums, so quoting any stay inside the horizon
+    is one subtraction regardless of its length. When the occupancy calendar
+    changes, only the nights it reports as changed are re-evaluated and the
+    prefix sums re-accumulated; the table is rebuilt when the day rolls over
+    or the change journal has moved on. Nights outside the horizon are priced
+    rule by rule.
+    """
+    
+    def __init__(self, calendar, rules=None, horizon=365):
+        self._calendar = calendar
+        self._rules = rules or PricingRules()
+        self._horizon = horizon
+        self._tables = {}
+        self._lock = threading.Lock()
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        state['_tables'] = {}
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+    
+    def get_rules(self):
+        return self._rules
+    
+    def set_rules(self, rules):
+        with self._lock:
+            self._rules = rules
+            self._tables = {}
+    
+    def _table(self, room_type):
+        key = room_type.lower()
+        today = date.today().toordinal()
+        version = self._calendar.get_version()
+        table = self._tables.get(key)
+        if table is not None and table.first_day == today and table.version == version:
+            return table
+        with self._lock:
+            table = self._tables.get(key)
+            changes = None
+            if table is not None and table.first_day == today:
+                changes = self._calendar.changes_since(table.version)
+            if changes is None:
+                occupancy = self._calendar.occupancy_by_night(date.fromordinal(today), self._horizon, room_type)
+                table = _RateTable(today, version, self._rules.multipliers(today, occupancy))
+                self._tables[key] = table
+            elif changes:
+                self._update(table, room_type, changes, version)
+        return table
+    
+    def _update(self, table, room_type, changes, version):
+        calendar = self._calendar
+        rooms = max(calendar.count_rooms(room_type), 1)
+        multipliers = table.multipliers
+        first = table.first_day
+        # A block booking reports the same nights once per room; price each night once
+        days = set()
+        for start_day, end_day in changes:
+            days.update(range(max(start_day, first), min(end_day, first + self._horizon)))
+        for day in days:
+            night = date.fromordinal(day)
+            multipliers[day - first] = self._rules.multiplier(
+                night, calendar.occupied_count(night, room_type) * 100.0 / rooms, day - first)
+        table.prefix = array('d', accumulate(multipliers, initial=0.0))
+        table.version = version
+    
+    def _multiplier_sum(self, room_type, first, last):
+        table = self._table(room_type)
+        start = max(first - table.first_day, 0)
+        end = min(last - table.first_day, self._horizon)
+        total = table.prefix[end] - table.prefix[start] if start < end else 0.0
+        for day in range(first, last):
+            if not 0 <= day - table.first_day < self._horizon:
+                night = date.fromordinal(day)
+                total += self._rules.multiplier(night, self._calendar.occupied_count(night, room_type)
+                                                * 100.0 / max(self._calendar.count_rooms(room_type), 1),
+                                                max(day - table.first_day, 0))
+        return total
+    
+    def quote(self, room, check_in, check_out):
+        """Room charge for [check_in, check_out) at today's rates"""
+        first = check_in.toordinal()
+        last = check_out.toordinal()
+        if last <= first:
+            raise ValueError("Check-out must be after check-in")
+        return round(room.get_price_per_night() * self._multiplier_sum(room.get_room_type(), first, last), 2)
+    
+    def get_nightly_rates(self, room, check_in, check_out):
+        """Per-night rates for [check_in, check_out) as (night, rate) pairs"""
+        table = self._table(room.get_room_type())
+        price = room.get_price_per_night()
+        rates = []
+        for day in range(check_in.toordinal(), check_out.toordinal()):
+            offset = day - table.first_day
+            if 0 <= offset < self._horizon:
+                rates.append((date.fromordinal(day), round(price * table.multipliers[offset], 2)))
+            else:
+                rates.append((date.fromordinal(day),
+                              round(price * self._multiplier_sum(room.get_room_type(), day, day + 1), 2)))
+        return rates
@@ -0,0 +1,187 @@
+import threading
+from datetime import timedelta
+
+class RevenueReports:
+    """Daily rollups of room, service and payment revenue per room type.
+    
+    Every table maps a key (room type, plus service or payment method where
+    relevant) to {day ordinal: value}. Bookings, cancellations and changes
+    adjust the room-night tables by removing the booking's previous
+    contribution and adding its current one; services and payments are
+    added as they happen. A report over D days costs O(D x room types).
+    """
+    
+    def __init__(self, calendar):
+        self._calendar = calendar
+        self._rooms_sold = {}
+        self._room_revenue = {}
+        self._service_revenue = {}
+        self._payment_counts = {}
+        self._payment_amounts = {}
+        # booking id -> (room type, first night, last night + 1, nightly revenue)
+        self._contributions = {}
+        self._lock = threading.Lock()
+        self._change_listener = self._on_change
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _bump(table, key, day, value):
+        days = table.get(key)
+        if days is None:
+            days = table[key] = {}
+        total = days.get(day, 0) + value
+        if total:
+            days[day] = total
+        else:
+            days.pop(day, None)
+    
+    def _apply(self, contribution, sign):
+        room_type, first, last, nightly = contribution
+        for day in range(first, last):
+            self._bump(self._rooms_sold, room_type, day, sign)
+            self._bump(self._room_revenue, room_type, day, sign * nightly)
+    
+    def _refresh(self, booking):
+        old = self._contributions.pop(booking.get_booking_id(), None)
+        if old is not None:
+            self._apply(old, -1)
+        if booking.get_status() == "Cancelled":
+            return
+        nights = booking.calculate_stay_duration()
+        if nights <= 0:
+            return
+        contribution = (booking.get_room().get_room_type(), booking.get_check_in_date().toordinal(),
+                        booking.get_check_out_date().toordinal(), booking.get_room_total() / nights)
+        self._contributions[booking.get_booking_id()] = contribution
+        self._apply(contribution, 1)
+    
+    def add_booking(self, booking):
+        self.add_bookings([booking])
+    
+    def add_bookings(self, bookings):
+        with self._lock:
+            for booking in bookings:
+                self._refresh(booking)
+                booking.add_change_listener(self._change_listener)
+    
+    def _on_change(self, booking, field, old_value):
+        if field in ('room', 'check_in_date', 'check_out_date', 'status', 'room_total'):
+            with self._lock:
+                self._refresh(booking)
+    
+    def add_service(self, service):
+        with self._lock:
+            key = (service.get_room().get_room_type(), service.__class__.__name__)
+            self._bump(self._service_revenue, key, service.get_request_date().toordinal(),
+                       service.get_price())
+    
+    def add_payment(self, booking, payment, payment_method):
+        with self._lock:
+            key = (booking.get_room().get_room_type(), payment_method.lower())
+            day = payment.get_payment_date().toordinal()
+            self._bump(self._payment_counts, key, day, 1)
+            self._bump(self._payment_amounts, key, day, payment.get_amount())
+    
+    def add_group_payment(self, group, payment, payment_method):
+        """Add a master-invoice payment: the amount is split by each room type's charges and the
+        payment is counted once, under the room type with the largest share"""
+        room_types = {booking.get_booking_id(): booking.get_room().get_room_type()
+                      for booking in group.get_active_bookings()}
+        charges = {}
+        for line in group.get_invoice().get_lines():
+            room_type = room_types[line['booking_id']]
+            charges[room_type] = charges.get(room_type, 0) + line['amount']
+        if not charges:
+            return
+        subtotal = sum(charges.values())
+        counted = max(charges, key=charges.get)
+        with self._lock:
+            day = payment.get_payment_date().toordinal()
+            for room_type, charge in charges.items():
+                key = (room_type, payment_method.lower())
+                if room_type == counted:
+                    self._bump(self._payment_counts, key, day, 1)
+                self._bump(self._payment_amounts, key, day,
+                           payment.get_amount() * (charge / subtotal if subtotal else 1 / len(charges)))
+    
+    def _room_types(self, room_type):
+        room_types = sorted({room.get_room_type() for room in self._calendar.get_rooms()})
+        if room_type is None:
+            return room_types
+        # Matched case-insensitively, like the calendar's type masks
+        wanted = room_type.lower()
+        return [name for name in room_types if name.lower() == wanted] or [room_type]
+    
+    @staticmethod
+    def _sum(table, keys, day):
+        return sum(table.get(key, {}).get(day, 0) for key in keys)
+    
+    def daily(self, start, end, room_type=None):
+        """One row per night in [start, end) with occupancy, ADR, RevPAR and revenue mix"""
+        room_types = self._room_types(room_type)
+        available = sum(self._calendar.count_rooms(name) for name in room_types)
+        rows = []
+        with self._lock:
+            service_keys = [key for key in self._service_revenue if key[0] in room_types]
+            # Amounts, since a group payment's share can sit under a room type it was not counted in
+            payment_keys = [key for key in self._payment_amounts if key[0] in room_types]
+            for day in range(start.toordinal(), end.toordinal()):
+                sold = self._sum(self._rooms_sold, room_types, day)
+                revenue = self._sum(self._room_revenue, room_types, day)
+                services = {}
+                for key in service_keys:
+                    amount = self._service_revenue[key].get(day)
+                    if amount:
+                        services[key[1]] = services.get(key[1], 0) + amount
+                payments = {}
+                for key in payment_keys:
+                    count = self._payment_counts.get(key, {}).get(day, 0)
+                    paid = self._payment_amounts[key].get(day, 0)
+                    if count or paid:
+                        method_count, amount = payments.get(key[1], (0, 0))
+                        payments[key[1]] = (method_count + count, amount + paid)
+                rows.append({
+                    'date': start + timedelta(days=day - start.toordinal()),
+                    'rooms_available': available,
+                    'rooms_sold': sold,
+                    'occupancy': sold * 100.0 / available if available else 0.0,
+                    'room_revenue': revenue,
+                    'adr': revenue / sold if sold else 0.0,
+                    'revpar': revenue / available if available else 0.0,
+                    'service_revenue': services,
+                    'payments': payments,
+                })
+        return rows
+    
+    def summary(self, start, end, room_type=None):
+        """Totals over [start, end): the same measures as daily(), aggregated"""
+        rows = self.daily(start, end, room_type)
+        available = sum(row['rooms_available'] for row in rows)
+        sold = sum(row['rooms_sold'] for row in rows)
+        revenue = sum(row['room_revenue'] for row in rows)
+        services = {}
+        payments = {}
+        for row in rows:
+            for name, amount in row['service_revenue'].items():
+                services[name] = services.get(name, 0) + amount
+            for method, (count, amount) in row['payments'].items():
+                method_count, method_amount = payments.get(method, (0, 0))
+                payments[method] = (method_count + count, method_amount + amount)
+        return {
+            'rooms_available': available,
+            'rooms_sold': sold,
+            'occupancy': sold * 100.0 / available if available else 0.0,
+            'room_revenue': revenue,
+            'adr': revenue / sold if sold else 0.0,
+            'revpar': revenue / available if available else 0.0,
+            'service_revenue': services,
+            'payments': payments,
+        }
@@ -0,0 +1,403 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rooms (
+    room_number TEXT PRIMARY KEY,
+    room_type TEXT NOT NULL,
+    price_per_night REAL NOT NULL,
+    is_available INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_rooms_type ON rooms (room_type);
+
+CREATE TABLE IF NOT EXISTS guests (
+    guest_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    phone TEXT,
+    address TEXT,
+    registration_date TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_guests_email ON guests (email);
+CREATE INDEX IF NOT EXISTS idx_guests_phone ON guests (phone);
+
+CREATE TABLE IF NOT EXISTS loyalty_programs (
+    guest_id INTEGER PRIMARY KEY REFERENCES guests (guest_id),
+    points INTEGER NOT NULL,
+    tier TEXT NOT NULL,
+    free_nights_earned INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS group_bookings (
+    group_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    guest_id INTEGER NOT NULL REFERENCES guests (guest_id),
+    check_in TEXT NOT NULL,
+    check_out TEXT NOT NULL,
+    booking_date TEXT,
+    invoice_number TEXT NOT NULL,
+    issue_date TEXT
+);
+
+CREATE TABLE IF NOT EXISTS bookings (
+    booking_id INTEGER PRIMARY KEY,
+    guest_id INTEGER NOT NULL REFERENCES guests (guest_id),
+    room_number TEXT NOT NULL REFERENCES rooms (room_number),
+    check_in TEXT NOT NULL,
+    check_out TEXT NOT NULL,
+    booking_date TEXT,
+    status TEXT NOT NULL,
+    room_total REAL,
+    group_id INTEGER REFERENCES group_bookings (group_id)
+);
+CREATE INDEX IF NOT EXISTS idx_bookings_room_dates ON bookings (room_number, check_in, check_out);
+CREATE INDEX IF NOT EXISTS idx_bookings_guest ON bookings (guest_id);
+CREATE INDEX IF NOT EXISTS idx_bookings_status ON bookings (status);
+CREATE INDEX IF NOT EXISTS idx_bookings_check_in ON bookings (check_in);
+
+CREATE TABLE IF NOT EXISTS invoices (
+    booking_id INTEGER PRIMARY KEY REFERENCES bookings (booking_id),
+    invoice_number TEXT NOT NULL,
+    issue_date TEXT,
+    total_amount REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_invoices_issue_date ON invoices (issue_date);
+
+CREATE TABLE IF NOT EXISTS invoice_items (
+    booking_id INTEGER NOT NULL REFERENCES invoices (booking_id),
+    position INTEGER NOT NULL,
+    description TEXT NOT NULL,
+    amount REAL NOT NULL,
+    PRIMARY KEY (booking_id, position)
+);
+
+CREATE TABLE IF NOT EXISTS payments (
+    payment_id INTEGER PRIMARY KEY,
+    booking_id INTEGER REFERENCES bookings (booking_id),
+    transaction_id TEXT,
+    method TEXT NOT NULL,
+    amount REAL NOT NULL,
+    payment_date TEXT,
+    status TEXT NOT NULL,
+    group_id INTEGER REFERENCES group_bookings (group_id),
+    idempotency_key TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_payments_booking ON payments (booking_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_payments_transaction ON payments (transaction_id);
+CREATE INDEX IF NOT EXISTS idx_payments_date ON payments (payment_date);
+
+CREATE TABLE IF NOT EXISTS service_requests (
+    booking_id INTEGER NOT NULL REFERENCES bookings (booking_id),
+    position INTEGER NOT NULL,
+    room_number TEXT,
+    service_type TEXT NOT NULL,
+    description TEXT,
+    status TEXT NOT NULL,
+    price REAL NOT NULL,
+    request_date TEXT,
+    PRIMARY KEY (booking_id, position)
+);
+
+CREATE TABLE IF NOT EXISTS feedback (
+    feedback_id INTEGER PRIMARY KEY,
+    guest_id INTEGER REFERENCES guests (guest_id),
+    rating INTEGER NOT NULL,
+    comments TEXT,
+    date TEXT,
+    stay_date TEXT,
+    response TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_feedback_guest ON feedback (guest_id);
+CREATE INDEX IF NOT EXISTS idx_feedback_stay_date ON feedback (stay_date);
+"""
+
+UPSERT_ROOM = "INSERT OR REPLACE INTO rooms VALUES (?, ?, ?, ?)"
+UPSERT_GUEST = "INSERT OR REPLACE INTO guests VALUES (?, ?, ?, ?, ?, ?)"
+UPSERT_LOYALTY = "INSERT OR REPLACE INTO loyalty_programs VALUES (?, ?, ?, ?)"
+UPSERT_GROUP = "INSERT OR REPLACE INTO group_bookings VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+# A booking saved without a group keeps the one it was stored with
+UPSERT_BOOKING = """
+INSERT INTO bookings VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (booking_id) DO UPDATE SET
+    guest_id = excluded.guest_id, room_number = excluded.room_number, check_in = excluded.check_in,
+    check_out = excluded.check_out, booking_date = excluded.booking_date, status = excluded.status,
+    room_total = excluded.room_total, group_id = COALESCE(excluded.group_id, bookings.group_id)
+"""
+UPSERT_INVOICE = "INSERT OR REPLACE INTO invoices VALUES (?, ?, ?, ?)"
+DELETE_INVOICE_ITEMS = "DELETE FROM invoice_items WHERE booking_id = ?"
+INSERT_INVOICE_ITEM = "INSERT INTO invoice_items VALUES (?, ?, ?, ?)"
+# Keyed on transaction id, so saving the same payment again does not duplicate it
+# A settled payment replaces its Pending row through the unique idempotency key
+UPSERT_PAYMENT = ("INSERT OR REPLACE INTO payments (booking_id, group_id, transaction_id, method, amount, payment_date, "
+                  "status, idempotency_key) VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+UPSERT_SERVICE = "INSERT OR REPLACE INTO service_requests VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+UPSERT_FEEDBACK = "INSERT OR REPLACE INTO feedback VALUES (?, ?, ?, ?, ?, ?, ?)"
+
+# Statements are flushed in this order so rows never reference missing parents
+_WRITE_ORDER = (UPSERT_ROOM, UPSERT_GUEST, UPSERT_LOYALTY, UPSERT_GROUP, UPSERT_BOOKING, UPSERT_INVOICE,
+                DELETE_INVOICE_ITEMS, INSERT_INVOICE_ITEM, UPSERT_PAYMENT, UPSERT_SERVICE,
+                UPSERT_FEEDBACK)
+
+FIND_AVAILABLE_ROOMS = """
+SELECT r.room_number FROM rooms r
+WHERE r.is_available = 1 AND (? IS NULL OR lower(r.room_type) = lower(?))
+AND NOT EXISTS (
+    SELECT 1 FROM bookings b
+    WHERE b.room_number = r.room_number AND b.status != 'Cancelled'
+    AND b.check_in < ? AND b.check_out > ?
+)
+ORDER BY r.room_number
+"""
+
+# Row order when loading each table back, so rebuilt ids and slots follow the original order
+_LOAD_ORDER = {
+    'rooms': 'rowid',
+    'guests': 'guest_id',
+    'loyalty_programs': 'guest_id',
+    'group_bookings': 'group_id',
+    'bookings': 'booking_id',
+    'invoices': 'booking_id',
+    'payments': 'payment_id',
+    'service_requests': 'booking_id, position',
+    'feedback': 'feedback_id',
+}
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+class ConnectionPool:
+    """Fixed-size pool of SQLite connections opened in WAL mode"""
+    
+    def __init__(self, path, size=4):
+        self._path = path
+        self._connections = queue.Queue()
+        for _ in range(size):
+            self._connections.put(self._connect())
+    
+    def _connect(self):
+        connection = sqlite3.connect(self._path, check_same_thread=False, cached_statements=256)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA foreign_keys=OFF")
+        return connection
+    
+    @contextmanager
+    def connection(self):
+        connection = self._connections.get()
+        try:
+            yield connection
+        finally:
+            self._connections.put(connection)
+    
+    def close(self):
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
+
+class SQLiteRepository:
+    """SQLite storage for the hotel domain objects.
+    
+    Writes are buffered per statement and flushed with executemany() in a
+    single transaction once `batch_size` rows are pending. Reads go through
+    the pool and push filtering and aggregation into SQL; load_rows() hands
+    whole tables back so a HotelSystem can be rebuilt from the file.
+    """
+    
+    def __init__(self, path, pool_size=4, batch_size=1000):
+        self._pool = ConnectionPool(path, pool_size)
+        self._batch_size = batch_size
+        self._pending = {}
+        self._pending_invoices = {}
+        self._pending_count = 0
+        self._lock = threading.Lock()
+        with self._pool.connection() as connection:
+            connection.executescript(SCHEMA)
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(bookings)")}
+            if 'room_total' not in columns:
+                # Files written before quoted room totals were stored
+                connection.execute("ALTER TABLE bookings ADD COLUMN room_total REAL")
+            if 'group_id' not in columns:
+                # Files written before group bookings were stored
+                connection.execute("ALTER TABLE bookings ADD COLUMN group_id INTEGER")
+                connection.execute("ALTER TABLE payments ADD COLUMN group_id INTEGER")
+            connection.execute("CREATE INDEX IF NOT EXISTS idx_bookings_group ON bookings (group_id)")
+            if 'idempotency_key' not in {row[1] for row in connection.execute("PRAGMA table_info(payments)")}:
+                # Files written before Pending payments were stored
+                connection.execute("ALTER TABLE payments ADD COLUMN idempotency_key TEXT")
+            connection.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_payments_key ON payments (idempotency_key)")
+    
+    def _queue(self, statement, rows):
+        with self._lock:
+            self._pending.setdefault(statement, []).extend(rows)
+            self._pending_count += len(rows)
+            if self._pending_count >= self._batch_size:
+                self._flush_locked()
+    
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+    
+    def _flush_locked(self):
+        if not self._pending_count:
+            return
+        pending = self._pending
+        self._pending = {}
+        self._pending_count = 0
+        if self._pending_invoices:
+            # Invoices are keyed by booking so an invoice saved twice in a batch is written once
+            invoices = self._pending_invoices.values()
+            self._pending_invoices = {}
+            pending[UPSERT_INVOICE] = [
+                (invoice.get_booking().get_booking_id(), invoice.get_invoice_number(),
+                 _iso(invoice.get_issue_date()), invoice.get_total_amount())
+                for invoice in invoices
+            ]
+            pending[DELETE_INVOICE_ITEMS] = [(row[0],) for row in pending[UPSERT_INVOICE]]
+            pending[INSERT_INVOICE_ITEM] = [
+                (invoice.get_booking().get_booking_id(), position, item['description'], item['amount'])
+                for invoice in invoices
+                for position, item in enumerate(invoice.get_items())
+            ]
+        with self._pool.connection() as connection:
+            with connection:
+                for statement in _WRITE_ORDER:
+                    if statement in pending:
+                        connection.executemany(statement, pending[statement])
+    
+    def close(self):
+        self.flush()
+        self._pool.close()
+    
+    # writes
+    def save_rooms(self, rooms):
+        self._queue(UPSERT_ROOM, [
+            (room.get_room_number(), room.get_room_type(), room.get_price_per_night(),
+             int(room.is_available()))
+            for room in rooms
+        ])
+    
+    def save_guests(self, guests):
+        self._queue(UPSERT_GUEST, [
+            (guest.get_guest_id(), guest.get_name(), guest.get_email(), guest.get_phone(),
+             guest.get_address(), _iso(guest.get_registration_date()))
+            for guest in guests
+        ])
+        self.save_loyalty_programs(guests)
+    
+    def save_loyalty_programs(self, guests):
+        """Save the loyalty balances of the enrolled guests among `guests`"""
+        loyalty_rows = []
+        for guest in guests:
+            loyalty = guest.get_loyalty_program()
+            if loyalty:
+                loyalty_rows.append((guest.get_guest_id(), loyalty.get_points(), loyalty.get_tier(),
+                                     loyalty.get_free_nights_earned()))
+        if loyalty_rows:
+            self._queue(UPSERT_LOYALTY, loyalty_rows)
+    
+    def save_bookings(self, bookings, group_id=None):
+        self._queue(UPSERT_BOOKING, [
+            (booking.get_booking_id(), booking.get_guest().get_guest_id(),
+             booking.get_room().get_room_number(), _iso(booking.get_check_in_date()),
+             _iso(booking.get_check_out_date()), _iso(booking.get_booking_date()),
+             booking.get_status(), booking.get_room_total(), group_id)
+            for booking in bookings
+        ])
+    
+    def save_group_booking(self, group):
+        """Save a group and its bookings, linked to it by group_id"""
+        invoice = group.get_invoice()
+        self._queue(UPSERT_GROUP, [
+            (group.get_group_id(), group.get_name(), group.get_guest().get_guest_id(),
+             _iso(group.get_check_in_date()), _iso(group.get_check_out_date()), _iso(group.get_booking_date()),
+             invoice.get_invoice_number(), _iso(invoice.get_issue_date()))
+        ])
+        self.save_bookings(group.get_bookings(), group.get_group_id())
+    
+    def save_invoices(self, invoices):
+        with self._lock:
+            for invoice in invoices:
+                self._pending_invoices[invoice.get_booking().get_booking_id()] = invoice
+                self._pending_count += 1
+            if self._pending_count >= self._batch_size:
+                self._flush_locked()
+    
+    def save_payments(self, booking_payments, idempotency_key=None):
+        """Save (booking id, payment) pairs; `idempotency_key` is the key a single payment was
+        submitted under, so it is saved again in place once it settles"""
+        self._queue(UPSERT_PAYMENT, [
+            (booking_id, None, payment.get_transaction_id(), payment.__class__.__name__,
+             payment.get_amount(), _iso(payment.get_payment_date()), payment.get_status(), idempotency_key)
+            for booking_id, payment in booking_payments
+        ])
+    
+    def save_group_payments(self, group, payments):
+        """Save payments made against a group's master invoice"""
+        self._queue(UPSERT_PAYMENT, [
+            (None, group.get_group_id(), payment.get_transaction_id(), payment.__class__.__name__,
+             payment.get_amount(), _iso(payment.get_payment_date()), payment.get_status(), None)
+            for payment in payments
+        ])
+    
+    def save_service_requests(self, booking):
+        self._queue(UPSERT_SERVICE, [
+            (booking.get_booking_id(), position, service.get_room().get_room_number(),
+             service.__class__.__name__, service.get_description(), service.get_status(),
+             service.get_price(), _iso(service.get_request_date()))
+            for position, service in enumerate(booking.get_additional_services())
+        ])
+    
+    def save_feedbacks(self, feedbacks):
+        self._queue(UPSERT_FEEDBACK, [
+            (feedback.get_feedback_id(), feedback.get_guest().get_guest_id(),
+             feedback.get_rating(), feedback.get_comments(), _iso(feedback.get_date()),
+             _iso(feedback.get_stay_date()), feedback.get_response())
+            for feedback in feedbacks
+        ])
+    
+    # reads
+    def _query(self, sql, params=()):
+        self.flush()
+        with self._pool.connection() as connection:
+            return connection.execute(sql, params).fetchall()
+    
+    def count(self, table):
+        if table not in ('rooms', 'guests', 'loyalty_programs', 'group_bookings', 'bookings', 'invoices',
+                         'invoice_items', 'payments', 'service_requests', 'feedback'):
+            raise ValueError(f"Unknown table {table}")
+        return self._query(f"SELECT COUNT(*) FROM {table}")[0][0]
+    
+    def is_empty(self):
+        return not self.count('rooms') and not self.count('guests')
+    
+    def load_rows(self, table):
+        """Every row of a table as a dict keyed by column name, in the order it was created"""
+        if table not in _LOAD_ORDER:
+            raise ValueError(f"Unknown table {table}")
+        self.flush()
+        with self._pool.connection() as connection:
+            cursor = connection.execute(f"SELECT * FROM {table} ORDER BY {_LOAD_ORDER[table]}")
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor]
+    
+    def find_available_room_numbers(self, check_in, check_out, room_type=None):
+        rows = self._query(FIND_AVAILABLE_ROOMS,
+                           (room_type, room_type, _iso(check_out), _iso(check_in)))
+        return [row[0] for row in rows]
+    
+    def find_guest_id_by_email(self, email):
+        rows = self._query("SELECT guest_id FROM guests WHERE email = ?", (email,))
+        return rows[0][0] if rows else None
+    
+    def get_invoice_total(self, booking_id):
+        rows = self._query("SELECT COALESCE(SUM(amount), 0) FROM invoice_items WHERE booking_id = ?",
+                           (booking_id,))
+        return rows[0][0]
+    
+    def get_invoice_totals(self, start, end):
+        """Invoiced totals per issue date over [start, end)"""
+        return self._query(
+            "SELECT issue_date, COUNT(*), SUM(total_amount) FROM invoices "
+            "WHERE issue_date >= ? AND issue_date < ? GROUP BY issue_date ORDER BY issue_date",
+            (_iso(start), _iso(end)))
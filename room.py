@@ -1,6 +1,11 @@
+from availability import RoomSchedule
+
 class Room:
     """Base class for all room types in the hotel"""
     
+    __slots__ = ('_room_number', '_room_type', '_amenities', '_price_per_night',
+                 '_is_available', '_schedule')
+    
     def __init__(self, room_number, room_type, amenities, price_per_night, is_available=True):
         """Initialize a room"""
         self._room_number = room_number
@@ -8,11 +13,15 @@ class Room:
         self._amenities = amenities
         self._price_per_night = price_per_night
         self._is_available = is_available
+        self._schedule = RoomSchedule()
     
     # Getters
     def room_number(self):
         return self._room_number
     
+    def get_room_number(self):
+        return self._room_number
+    
     def get_room_type(self):
         return self._room_type
     
@@ -25,6 +34,13 @@ class Room:
     def is_available(self):
         return self._is_available
     
+    def get_schedule(self):
+        return self._schedule
+    
+    def is_available_between(self, check_in, check_out):
+        """Check whether the room is in service and free for [check_in, check_out)"""
+        return self._is_available and self._schedule.is_free(check_in, check_out)
+    
     # setters
     def set_room_number(self, room_number):
         self._room_number = room_number
@@ -41,6 +57,14 @@ class Room:
     def set_available(self, is_available):
         self._is_available = is_available
     
+    def reserve(self, check_in, check_out):
+        if not self._is_available:
+            raise ValueError("Room is not available")
+        self._schedule.reserve(check_in, check_out)
+    
+    def release(self, check_in, check_out):
+        self._schedule.release(check_in, check_out)
+    
     def __str__(self):
         return (f"Room {self._room_number} - {self._room_type}\n"
                 f"Amenities: {', '.join(self._amenities)}\n"
@@ -50,9 +74,13 @@ class Room:
 class StandardRoom(Room):
     """Standard room type with basic amenities"""
     
+    __slots__ = ('_max_occupancy', '_has_balcony')
+    
+    # Shared by every instance instead of a fresh list per room
+    AMENITIES = ("Wi-Fi", "Television", "Air Conditioning")
+    
     def __init__(self, room_number, price_per_night, is_available=True):
-        amenities = ["Wi-Fi", "Television", "Air Conditioning"]
-        super().__init__(room_number, "Standard", amenities, price_per_night, is_available)
+        super().__init__(room_number, "Standard", self.AMENITIES, price_per_night, is_available)
         self._max_occupancy = 2
         self._has_balcony = False
     
@@ -74,9 +102,12 @@ class StandardRoom(Room):
 class DeluxeRoom(Room):
     """Deluxe room type with additional amenities"""
     
+    __slots__ = ('_max_occupancy', '_has_balcony')
+    
+    AMENITIES = ("Wi-Fi", "Television", "Air Conditioning", "Mini-Bar", "Coffee Maker")
+    
     def __init__(self, room_number, price_per_night, is_available=True):
-        amenities = ["Wi-Fi", "Television", "Air Conditioning", "Mini-Bar", "Coffee Maker"]
-        super().__init__(room_number, "Deluxe", amenities, price_per_night, is_available)
+        super().__init__(room_number, "Deluxe", self.AMENITIES, price_per_night, is_available)
         self._max_occupancy = 4
         self._has_balcony = True
     
@@ -98,10 +129,13 @@ class DeluxeRoom(Room):
 class Suite(Room):
     """Suite room type with premium amenities"""
     
+    __slots__ = ('_max_occupancy', '_has_balcony', '_separate_bedroom')
+    
+    AMENITIES = ("Wi-Fi", "Television", "Air Conditioning", "Mini-Bar",
+                 "Coffee Maker", "Jacuzzi", "Living Area")
+    
     def __init__(self, room_number, price_per_night, is_available=True):
-        amenities = ["Wi-Fi", "Television", "Air Conditioning", "Mini-Bar", 
-                    "Coffee Maker", "Jacuzzi", "Living Area"]
-        super().__init__(room_number, "Suite", amenities, price_per_night, is_available)
+        super().__init__(room_number, "Suite", self.AMENITIES, price_per_night, is_available)
         self._max_occupancy = 6
         self._has_balcony = True
         self._separate_bedroom = True
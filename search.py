@@ -0,0 +1,188 @@
+import heapq
+import math
+import re
+import sys
+import threading
+from array import array
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_QUERY = re.compile(r'(-?)"([^"]*)"|(\S+)')
+
+# Separates the comments and the response so phrases cannot span both
+_FIELD_BREAK = ''
+
+def tokenize(text):
+    """Lower-case word tokens; apostrophes stay inside words such as "didn't" """
+    if not text:
+        return []
+    return [sys.intern(token) for token in _TOKEN.findall(text.lower())]
+
+def parse_query(query):
+    """Split a query into OR-ed groups of (required, excluded) clauses.
+    
+    Bare words are required, "quoted words" are phrases, a leading - excludes
+    a word or phrase and OR separates alternatives: `noise -street OR "air
+    conditioning"`. Every clause is a tuple of tokens.
+    """
+    groups = []
+    required, excluded = [], []
+    for match in _QUERY.finditer(query):
+        negated, phrase, word = match.groups()
+        if word == 'OR':
+            groups.append((required, excluded))
+            required, excluded = [], []
+            continue
+        if word is not None:
+            negated = word.startswith('-')
+            phrase = word[1:] if negated else word
+        tokens = tuple(tokenize(phrase))
+        if tokens:
+            (excluded if negated else required).append(tokens)
+    groups.append((required, excluded))
+    return [group for group in groups if group[0]]
+
+def _contains(tokens, clause):
+    if len(clause) == 1:
+        return clause[0] in tokens
+    first = clause[0]
+    width = len(clause)
+    start = 0
+    while True:
+        try:
+            position = tokens.index(first, start)
+        except ValueError:
+            return False
+        if tokens[position:position + width] == clause:
+            return True
+        start = position + 1
+
+class FeedbackSearchIndex:
+    """Inverted index over feedback comments and management responses.
+    
+    Each term maps to a compact array of feedback ids. A query walks the
+    shortest posting list of each OR group and checks the remaining words and
+    phrases against the candidate's stored token tuple, then ranks matches
+    with BM25. Feedback is re-indexed when its comments or response change.
+    """
+    
+    K1 = 1.2
+    B = 0.75
+    
+    def __init__(self):
+        self._postings = {}
+        # feedback id -> (feedback, tokens of comments + break + response)
+        self._documents = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+        self._change_listener = self._on_change
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+    
+    def __len__(self):
+        return len(self._documents)
+    
+    def _index(self, feedback):
+        tokens = tokenize(feedback.get_comments())
+        response = tokenize(feedback.get_response())
+        if response:
+            tokens.append(_FIELD_BREAK)
+            tokens.extend(response)
+        tokens = tuple(tokens)
+        feedback_id = feedback.get_feedback_id()
+        self._documents[feedback_id] = (feedback, tokens)
+        self._total_length += len(tokens)
+        for term in set(tokens):
+            if term is _FIELD_BREAK:
+                continue
+            posting = self._postings.get(term)
+            if posting is None:
+                posting = self._postings[term] = array('q')
+            posting.append(feedback_id)
+    
+    def _unindex(self, feedback_id):
+        _, tokens = self._documents.pop(feedback_id)
+        self._total_length -= len(tokens)
+        for term in set(tokens):
+            if term is _FIELD_BREAK:
+                continue
+            posting = self._postings[term]
+            del posting[posting.index(feedback_id)]
+            if not posting:
+                del self._postings[term]
+    
+    def add(self, feedback):
+        with self._lock:
+            self._index(feedback)
+        feedback.add_change_listener(self._change_listener)
+    
+    def _on_change(self, feedback, field, old_value):
+        if field not in ('comments', 'response'):
+            return
+        with self._lock:
+            self._unindex(feedback.get_feedback_id())
+            self._index(feedback)
+    
+    def get_document_frequency(self, term):
+        return len(self._postings.get(term, ()))
+    
+    def _match_group(self, required, excluded):
+        """Feedback ids satisfying every required clause and no excluded one"""
+        postings = self._postings
+        terms = sorted({term for clause in required for term in clause}, key=self.get_document_frequency)
+        matches = set(postings.get(terms[0], ()))
+        for term in terms[1:]:
+            if not matches:
+                break
+            matches.intersection_update(postings.get(term, ()))
+        for clause in excluded:
+            if len(clause) == 1:
+                matches.difference_update(postings.get(clause[0], ()))
+        # Only phrases need the stored tokens; single words are settled by the postings
+        phrases = [clause for clause in required if len(clause) > 1]
+        excluded_phrases = [clause for clause in excluded if len(clause) > 1]
+        if phrases or excluded_phrases:
+            documents = self._documents
+            matches = {feedback_id for feedback_id in matches
+                       if all(_contains(documents[feedback_id][1], clause) for clause in phrases)
+                       and not any(_contains(documents[feedback_id][1], clause)
+                                   for clause in excluded_phrases)}
+        return matches
+    
+    def search(self, query, limit=20):
+        """Return up to `limit` (feedback, score) pairs, best first"""
+        groups = parse_query(query)
+        with self._lock:
+            if not groups or not self._documents:
+                return []
+            matches = set()
+            for required, excluded in groups:
+                matches |= self._match_group(required, excluded)
+            
+            documents = self._documents
+            count = len(documents)
+            terms = {term for required, _ in groups for clause in required for term in clause}
+            weighted = [(term, math.log(1 + (count - df + 0.5) / (df + 0.5)))
+                        for term, df in ((term, self.get_document_frequency(term)) for term in terms)]
+            k1 = self.K1
+            length_scale = k1 * self.B / (self._total_length / count or 1)
+            length_base = k1 * (1 - self.B)
+            
+            def score(feedback_id):
+                tokens = documents[feedback_id][1]
+                length_norm = length_base + length_scale * len(tokens)
+                total = 0.0
+                for term, idf in weighted:
+                    frequency = tokens.count(term)
+                    if frequency:
+                        total += idf * frequency * (k1 + 1) / (frequency + length_norm)
+                return total, -feedback_id
+            
+            ranked = heapq.nlargest(limit, map(score, matches))
+            return [(documents[-negated_id][0], total) for total, negated_id in ranked]
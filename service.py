@@ -1,4 +1,6 @@
 class ServiceRequest:
+    __slots__ = ('_request_date', '_room', '_description', '_status', '_price')
+    
     def __init__(self, request_date, room, description):
         self._request_date = request_date
         self._room = room
@@ -47,6 +49,8 @@ class ServiceRequest:
                 f"Price: ${self._price:.2f}")
 
 class Housekeeping(ServiceRequest):
+    __slots__ = ('_service_type',)
+    
     def __init__(self, request_date, room, service_type="Standard"):
         description = f"{service_type} Cleaning"
         super().__init__(request_date, room, description)
@@ -72,6 +76,8 @@ class Housekeeping(ServiceRequest):
         return super().__str__()
 
 class RoomService(ServiceRequest):
+    __slots__ = ('_items',)
+    
     def __init__(self, request_date, room, items):
         description = "Room Service Order"
         super().__init__(request_date, room, description)
@@ -94,6 +100,8 @@ class RoomService(ServiceRequest):
                 f"Items Ordered:\n{items_str}")
 
 class Transportation(ServiceRequest):
+    __slots__ = ('_vehicle_type', '_destination')
+    
     def __init__(self, request_date, room, vehicle_type, destination):
         description = f"{vehicle_type} to {destination}"
         super().__init__(request_date, room, description)
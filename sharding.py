@@ -0,0 +1,316 @@
+import multiprocessing
+import os
+import threading
+import ids
+from ids import IdAllocator, MAX_WORKER, parse_id
+from bulk_import import ROOM_CLASSES
+
+def _booking_row(booking):
+    return {
+        'booking_id': booking.get_booking_id(),
+        'guest_email': booking.get_guest().get_email(),
+        'room_number': booking.get_room().get_room_number(),
+        'check_in': booking.get_check_in_date(),
+        'check_out': booking.get_check_out_date(),
+        'room_total': booking.get_room_total(),
+        'status': booking.get_status(),
+    }
+
+class _ShardServer:
+    """Runs inside a shard process: one HotelSystem answering plain-data commands"""
+    
+    def __init__(self, hotel):
+        self._hotel = hotel
+    
+    def add_room(self, room_type, room_number, price_per_night):
+        room_class = ROOM_CLASSES.get(room_type.lower())
+        if room_class is None:
+            raise ValueError("Invalid room type")
+        self._hotel.add_room(room_class(room_number, price_per_night))
+        return room_number
+    
+    def _guest(self, guest):
+        found = self._hotel.find_guest_by_email(guest['email'])
+        if found is not None:
+            return found
+        return self._hotel.register_guest(guest['name'], guest['email'], guest['phone'], guest.get('address'))
+    
+    def _booking(self, booking_id):
+        booking = self._hotel.get_booking_by_id(booking_id)
+        if booking is None:
+            raise ValueError(f"Unknown booking {booking_id}")
+        return booking
+    
+    def create_booking(self, guest, room_number, check_in, check_out):
+        room = self._hotel.get_room_by_number(room_number)
+        if room is None:
+            raise ValueError(f"Unknown room {room_number}")
+        return _booking_row(self._hotel.create_booking(self._guest(guest), room, check_in, check_out))
+    
+    def cancel_booking(self, booking_id):
+        booking = self._booking(booking_id)
+        booking.cancel_booking()
+        return _booking_row(booking)
+    
+    def get_booking(self, booking_id):
+        return _booking_row(self._booking(booking_id))
+    
+    def process_payment(self, booking_id, payment_method, payment_details):
+        payment = self._hotel.process_payment(self._booking(booking_id), payment_method, payment_details)
+        return {
+            'transaction_id': payment.get_transaction_id(),
+            'amount': payment.get_amount(),
+            'status': payment.get_status(),
+        }
+    
+    def find_available_rooms(self, room_type, check_in, check_out):
+        hotel = self._hotel
+        return [(room.get_room_number(), room.get_room_type(), room.get_price_per_night(),
+                 hotel.quote_stay(room, check_in, check_out))
+                for room in hotel.find_available_rooms(room_type, check_in, check_out)]
+    
+    def get_daily_report(self, start, end, room_type):
+        return self._hotel.get_daily_report(start, end, room_type)
+    
+    def get_revenue_summary(self, start, end, room_type):
+        return self._hotel.get_revenue_summary(start, end, room_type)
+    
+    def populate(self, rooms, guests, bookings, seed):
+        from synthetic import SyntheticDataGenerator
+        return SyntheticDataGenerator(seed).populate(self._hotel, rooms, guests, bookings)
+    
+    def get_counts(self):
+        hotel = self._hotel
+        return {'rooms': len(hotel.get_rooms()), 'guests': len(hotel.get_guests()),
+                'bookings': len(hotel.get_bookings())}
+
+def _serve(connection, shard_index, data_dir):
+    """Shard process main loop: (command, args) in, ('ok', result) or ('error', exception) out"""
+    from hotel_system import HotelSystem
+    
+    # Ids minted here carry the shard index in their worker bits, which is how the router finds them
+    ids.default_allocator = IdAllocator(worker_id=shard_index)
+    hotel = HotelSystem(data_dir, sample_data=False)
+    server = _ShardServer(hotel)
+    try:
+        while True:
+            try:
+                command, args = connection.recv()
+            except EOFError:
+                return
+            if command == 'close':
+                connection.send(('ok', None))
+                return
+            try:
+                connection.send(('ok', getattr(server, command)(*args)))
+            except Exception as error:
+                connection.send(('error', error))
+    finally:
+        hotel.close()
+        connection.close()
+
+class _Shard:
+    """Router-side handle for one shard process; the lock keeps request/reply pairs together"""
+    
+    def __init__(self, context, property_id, index, data_dir):
+        self.property_id = property_id
+        self.index = index
+        self.lock = threading.Lock()
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child, index, data_dir),
+                                       name=f"hotel-shard-{property_id}", daemon=True)
+        self.process.start()
+        child.close()
+    
+    def send(self, command, args):
+        self.connection.send((command, args))
+    
+    def receive(self):
+        status, result = self.connection.recv()
+        if status == 'error':
+            raise result
+        return result
+    
+    def call(self, command, *args):
+        with self.lock:
+            self.send(command, args)
+            return self.receive()
+
+def merge_summaries(summaries):
+    """Combine RevenueReports.summary() dicts from several shards, recomputing the ratios"""
+    available = sum(summary['rooms_available'] for summary in summaries)
+    sold = sum(summary['rooms_sold'] for summary in summaries)
+    revenue = sum(summary['room_revenue'] for summary in summaries)
+    services = {}
+    payments = {}
+    for summary in summaries:
+        for name, amount in summary['service_revenue'].items():
+            services[name] = services.get(name, 0) + amount
+        for method, (count, amount) in summary['payments'].items():
+            method_count, method_amount = payments.get(method, (0, 0))
+            payments[method] = (method_count + count, method_amount + amount)
+    return {
+        'rooms_available': available,
+        'rooms_sold': sold,
+        'occupancy': sold * 100.0 / available if available else 0.0,
+        'room_revenue': revenue,
+        'adr': revenue / sold if sold else 0.0,
+        'revpar': revenue / available if available else 0.0,
+        'service_revenue': services,
+        'payments': payments,
+    }
+
+class ShardedHotel:
+    """One HotelSystem per property, each in its own process, behind a router.
+    
+    Room, booking and payment calls go to the shard owning the property;
+    booking ids minted by a shard carry its index in the id's worker bits,
+    so later calls need only the id. Searches and reports are sent to every
+    shard before any reply is read, so shards work in parallel, and the
+    replies are merged. Shards exchange plain data (room numbers, dates,
+    dicts) with the router, never object graphs. At most 32 shards, the
+    worker id range of the id allocator.
+    """
+    
+    def __init__(self, property_ids, data_dir=None):
+        property_ids = list(property_ids)
+        if not property_ids:
+            raise ValueError("At least one property is required")
+        if len(property_ids) > MAX_WORKER + 1:
+            raise ValueError(f"At most {MAX_WORKER + 1} shards are supported")
+        if len(set(property_ids)) != len(property_ids):
+            raise ValueError("Property ids must be unique")
+        method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+        context = multiprocessing.get_context(method)
+        self._shards = []
+        self._by_property = {}
+        for index, property_id in enumerate(property_ids):
+            shard_dir = os.path.join(data_dir, str(property_id)) if data_dir is not None else None
+            shard = _Shard(context, property_id, index, shard_dir)
+            self._shards.append(shard)
+            self._by_property[property_id] = shard
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def get_property_ids(self):
+        return [shard.property_id for shard in self._shards]
+    
+    def _shard(self, property_id):
+        if property_id not in self._by_property:
+            raise ValueError(f"Unknown property {property_id}")
+        return self._by_property[property_id]
+    
+    def _shard_for_booking(self, booking_id):
+        index = IdAllocator.decode(parse_id(booking_id))[1]
+        if index >= len(self._shards):
+            raise ValueError(f"Unknown booking {booking_id}")
+        return self._shards[index]
+    
+    def property_for_booking(self, booking_id):
+        return self._shard_for_booking(booking_id).property_id
+    
+    def _scatter(self, command, *args, arguments=None):
+        """Send one command to every shard, then gather (shard, result) pairs.
+        
+        `arguments`, if given, maps a shard to its own argument tuple.
+        """
+        # Locks are always taken in shard order so concurrent scatters cannot deadlock
+        for shard in self._shards:
+            shard.lock.acquire()
+        try:
+            for shard in self._shards:
+                shard.send(command, args if arguments is None else arguments(shard))
+            replies = []
+            failure = None
+            for shard in self._shards:
+                try:
+                    replies.append((shard, shard.receive()))
+                except Exception as error:
+                    # Keep reading so every pipe is drained before the locks are released
+                    failure = failure or error
+            if failure is not None:
+                raise failure
+            return replies
+        finally:
+            for shard in self._shards:
+                shard.lock.release()
+    
+    def add_room(self, property_id, room_type, room_number, price_per_night):
+        return self._shard(property_id).call('add_room', room_type, room_number, price_per_night)
+    
+    def create_booking(self, property_id, guest, room_number, check_in, check_out):
+        """Book a room at one property; `guest` is a dict of name, email, phone and address.
+        
+        Guests are per property: the shard registers the email on first use.
+        """
+        booking = self._shard(property_id).call('create_booking', guest, room_number, check_in, check_out)
+        booking['property_id'] = property_id
+        return booking
+    
+    def get_booking(self, booking_id):
+        shard = self._shard_for_booking(booking_id)
+        booking = shard.call('get_booking', booking_id)
+        booking['property_id'] = shard.property_id
+        return booking
+    
+    def cancel_booking(self, booking_id):
+        shard = self._shard_for_booking(booking_id)
+        booking = shard.call('cancel_booking', booking_id)
+        booking['property_id'] = shard.property_id
+        return booking
+    
+    def process_payment(self, booking_id, payment_method, payment_details):
+        return self._shard_for_booking(booking_id).call('process_payment', booking_id, payment_method,
+                                                        payment_details)
+    
+    def find_available_rooms(self, room_type=None, check_in=None, check_out=None, limit=None):
+        """Free rooms across every property as dicts, cheapest quote first"""
+        rooms = []
+        for shard, rows in self._scatter('find_available_rooms', room_type, check_in, check_out):
+            rooms.extend({'property_id': shard.property_id, 'room_number': room_number, 'room_type': kind,
+                          'price_per_night': price, 'quote': quote}
+                         for room_number, kind, price, quote in rows)
+        rooms.sort(key=lambda room: room['quote'])
+        return rooms if limit is None else rooms[:limit]
+    
+    def get_revenue_summary(self, start, end, room_type=None):
+        """Chain-wide totals over [start, end), plus the per-property summaries"""
+        replies = self._scatter('get_revenue_summary', start, end, room_type)
+        summary = merge_summaries([result for _, result in replies])
+        summary['properties'] = {shard.property_id: result for shard, result in replies}
+        return summary
+    
+    def get_daily_report(self, start, end, room_type=None):
+        """Chain-wide daily rows over [start, end)"""
+        replies = self._scatter('get_daily_report', start, end, room_type)
+        rows = []
+        for nights in zip(*(result for _, result in replies)):
+            row = merge_summaries(nights)
+            row['date'] = nights[0]['date']
+            rows.append(row)
+        return rows
+    
+    def populate(self, rooms, guests, bookings, seed=42):
+        """Fill every shard with its own synthetic dataset of the given size"""
+        replies = self._scatter('populate', arguments=lambda shard: (rooms, guests, bookings, seed + shard.index))
+        return {shard.property_id: result for shard, result in replies}
+    
+    def get_counts(self):
+        return {shard.property_id: result for shard, result in self._scatter('get_counts')}
+    
+    def close(self):
+        for shard in self._shards:
+            if not shard.process.is_alive():
+                continue
+            try:
+                shard.call('close')
+            except (EOFError, OSError):
+                pass
+            shard.connection.close()
+            shard.process.join()
+        self._shards = []
+        self._by_property = {}
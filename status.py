@@ -0,0 +1,30 @@
+class StatusTable:
+    """Interned mapping between status names and small integer codes.
+    
+    Objects store the code, so every instance shares CPython's cached small
+    int instead of holding its own reference to a status string. The names
+    are fixed when the table is built, so a code means the same status in
+    every process that unpickles it.
+    """
+    
+    __slots__ = ('_names', '_codes')
+    
+    def __init__(self, *names):
+        self._names = []
+        self._codes = {}
+        for name in names:
+            self._codes[name] = len(self._names)
+            self._names.append(name)
+    
+    def code(self, name):
+        """Return the code for a status name; raises ValueError for a name not in the table"""
+        code = self._codes.get(name)
+        if code is None:
+            raise ValueError(f"Unknown status {name!r}; expected one of {', '.join(self._names)}")
+        return code
+    
+    def name(self, code):
+        return self._names[code]
+    
+    def names(self):
+        return tuple(self._names)
@@ -0,0 +1,148 @@
+import csv
+import math
+import os
+import random
+from datetime import date, timedelta
+from itertools import islice
+from guest import Guest
+from booking import Booking
+from bulk_import import ROOM_CLASSES
+
+# Room type, share of rooms, typical list price
+ROOM_MIX = (("Standard", 0.6, 99.99), ("Deluxe", 0.3, 149.99), ("Suite", 0.1, 249.99))
+STAY_LENGTHS = (1, 2, 3, 4, 5, 7, 14)
+STAY_WEIGHTS = (30, 25, 18, 10, 7, 7, 3)
+FIRST_NAMES = ("James", "Mary", "Wanjiru", "Kamau", "Aisha", "Chen", "Sofia", "Liam", "Amara", "Mateo")
+LAST_NAMES = ("Otieno", "Smith", "Mwangi", "Garcia", "Njoroge", "Kim", "Muller", "Okafor", "Rossi", "Patel")
+
+def _chunks(items, size):
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+class SyntheticDataGenerator:
+    """Seeded generator of rooms, guests and bookings with realistic dates.
+    
+    Rows use the BulkLoader column names, so a dataset can be written to CSV
+    and loaded back, or turned into objects directly with populate(). About a
+    quarter of stays are in the past (Completed), lead times are roughly
+    exponential with a 30-day mean, stays skew short, weekend arrivals and
+    summer nights are more likely, and 5% of bookings are cancelled.
+    """
+    
+    def __init__(self, seed=42, today=None):
+        self._seed = seed
+        self._today = today or date.today()
+    
+    def room_rows(self, count):
+        rng = random.Random(f"{self._seed}-rooms")
+        room_types = [room_type for room_type, _, _ in ROOM_MIX]
+        weights = [weight for _, weight, _ in ROOM_MIX]
+        prices = {room_type: price for room_type, _, price in ROOM_MIX}
+        for index in range(count):
+            room_type = rng.choices(room_types, weights)[0]
+            yield {
+                'room_number': f"R{index:06d}",
+                'room_type': room_type,
+                'price_per_night': round(prices[room_type] * rng.uniform(0.9, 1.1), 2),
+            }
+    
+    def guest_rows(self, count):
+        rng = random.Random(f"{self._seed}-guests")
+        for index in range(count):
+            first = rng.choice(FIRST_NAMES)
+            last = rng.choice(LAST_NAMES)
+            yield {
+                'name': f"{first} {last}",
+                'email': f"{first.lower()}.{last.lower()}.{index}@example.com",
+                'phone': f"555-{index:07d}",
+                'address': None,
+                'loyalty_points': rng.choice((None, None, 0, rng.randint(0, 1500))),
+            }
+    
+    def _check_in(self, rng):
+        while True:
+            if rng.random() < 0.25:
+                offset = -rng.randint(1, 365)
+            else:
+                offset = min(int(rng.expovariate(1 / 30)), 365)
+            check_in = self._today + timedelta(days=offset)
+            if rng.random() < 0.3:
+                # Pull towards a Friday arrival
+                check_in += timedelta(days=(4 - check_in.weekday()) % 7)
+            # Summer peak: accept mid-year nights more often than winter ones
+            season = 0.75 + 0.25 * math.sin((check_in.timetuple().tm_yday - 80) * 2 * math.pi / 365)
+            if rng.random() < season:
+                return check_in
+    
+    def booking_rows(self, count, room_count, guest_count):
+        rng = random.Random(f"{self._seed}-bookings")
+        guest_emails = [row['email'] for row in self.guest_rows(guest_count)]
+        for _ in range(count):
+            check_in = self._check_in(rng)
+            check_out = check_in + timedelta(days=rng.choices(STAY_LENGTHS, STAY_WEIGHTS)[0])
+            if rng.random() < 0.05:
+                status = "Cancelled"
+            elif check_out <= self._today:
+                status = "Completed"
+            else:
+                status = "Confirmed"
+            yield {
+                'guest_email': rng.choice(guest_emails),
+                'room_number': f"R{rng.randrange(room_count):06d}",
+                'check_in': check_in.isoformat(),
+                'check_out': check_out.isoformat(),
+                'status': status,
+            }
+    
+    def populate(self, hotel, rooms, guests, bookings, chunk_size=10000):
+        """Add a generated dataset to `hotel`; returns counts of accepted and rejected rows"""
+        rejected = 0
+        for chunk in _chunks(self.room_rows(rooms), chunk_size):
+            rejected += len(hotel.import_rooms([ROOM_CLASSES[row['room_type'].lower()](row['room_number'],
+                                                                                      row['price_per_night'])
+                                                for row in chunk]))
+        guest_objects = []
+        for chunk in _chunks(self.guest_rows(guests), chunk_size):
+            built = []
+            for row in chunk:
+                guest = Guest(row['name'], row['email'], row['phone'], row['address'])
+                if row['loyalty_points'] is not None:
+                    guest.enroll_in_loyalty_program().set_points(row['loyalty_points'])
+                built.append(guest)
+            rejected += len(hotel.import_guests(built))
+            guest_objects.extend(built)
+        by_email = {guest.get_email(): guest for guest in guest_objects}
+        accepted = 0
+        for chunk in _chunks(self.booking_rows(bookings, rooms, guests), chunk_size):
+            built = []
+            for row in chunk:
+                booking = Booking(by_email[row['guest_email']], hotel.get_room_by_number(row['room_number']),
+                                  date.fromisoformat(row['check_in']), date.fromisoformat(row['check_out']))
+                booking.set_status(row['status'])
+                built.append(booking)
+            chunk_rejected = len(hotel.import_bookings(built))
+            rejected += chunk_rejected
+            accepted += len(built) - chunk_rejected
+        hotel.finish_import()
+        return {'rooms': rooms, 'guests': guests, 'bookings': accepted, 'rejected': rejected}
+    
+    def write_dataset(self, directory, rooms, guests, bookings):
+        """Write rooms.csv, guests.csv and bookings.csv for BulkLoader; returns their paths"""
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for name, rows in (('rooms', self.room_rows(rooms)), ('guests', self.guest_rows(guests)),
+                           ('bookings', self.booking_rows(bookings, rooms, guests))):
+            path = os.path.join(directory, f"{name}.csv")
+            with open(path, 'w', newline='', encoding='utf-8') as target:
+                writer = None
+                for row in rows:
+                    if writer is None:
+                        writer = csv.DictWriter(target, fieldnames=list(row))
+                        writer.writeheader()
+                    writer.writerow(row)
+            paths.append(path)
+        return paths
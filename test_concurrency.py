@@ -0,0 +1,189 @@
+import sys
+import tempfile
+import threading
+import unittest
+from datetime import date, timedelta
+
+from concurrency import LockStripes
+from hotel_system import HotelSystem
+from room import StandardRoom
+
+class LockStripesTest(unittest.TestCase):
+
+    def test_same_key_same_lock(self):
+        stripes = LockStripes()
+        self.assertIs(stripes.lock_for(12345), stripes.lock_for(12345))
+    
+    def test_object_ids_spread_over_stripes(self):
+        # Ids are aligned, so a plain modulo used only a handful of the 256 stripes
+        stripes = LockStripes(256)
+        keys = [object() for _ in range(4096)]
+        used = {id(stripes.lock_for(id(key))) for key in keys}
+        self.assertGreater(len(used), 200)
+    
+    def test_stripe_count_must_be_power_of_two(self):
+        with self.assertRaises(ValueError):
+            LockStripes(100)
+
+class ConcurrentBookingTest(unittest.TestCase):
+
+    def setUp(self):
+        self._interval = sys.getswitchinterval()
+        # Switch threads as often as possible to expose check-then-insert races
+        sys.setswitchinterval(1e-6)
+    
+    def tearDown(self):
+        sys.setswitchinterval(self._interval)
+    
+    def test_same_stay_is_booked_once(self):
+        hotel = HotelSystem(sample_data=False)
+        guest = hotel.register_guest("Stress Test", "stress@example.com", "555-0000")
+        check_in = date.today() + timedelta(days=1)
+        check_out = check_in + timedelta(days=2)
+        for number in range(200):
+            room = StandardRoom(f"S{number}", 100.0)
+            hotel.add_room(room)
+            booked = []
+            errors = []
+            barrier = threading.Barrier(8)
+            
+            def worker():
+                barrier.wait()
+                try:
+                    booked.append(hotel.create_booking(guest, room, check_in, check_out))
+                except ValueError:
+                    pass
+                except Exception as error:
+                    errors.append(error)
+            
+            threads = [threading.Thread(target=worker) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(errors, [])
+            self.assertEqual(len(booked), 1, f"Room {room.get_room_number()} was booked {len(booked)} times")
+            self.assertEqual(room.get_schedule().get_reservations(),
+                             [(check_in.toordinal(), check_out.toordinal())])
+            self.assertNotIn(room, hotel.find_available_rooms(None, check_in, check_out))
+
+class ConcurrentChangeTest(unittest.TestCase):
+
+    def setUp(self):
+        self._interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.hotel = HotelSystem(sample_data=False)
+        self.guest = self.hotel.register_guest("Race Test", "race@example.com", "555-0000")
+        self.check_in = date.today() + timedelta(days=1)
+        self.check_out = self.check_in + timedelta(days=2)
+    
+    def tearDown(self):
+        sys.setswitchinterval(self._interval)
+    
+    def _run(self, *targets):
+        errors = []
+        barrier = threading.Barrier(len(targets))
+        
+        def run(target):
+            barrier.wait()
+            try:
+                target()
+            except ValueError:
+                pass
+            except Exception as error:
+                errors.append(error)
+        
+        threads = [threading.Thread(target=run, args=(target,)) for target in targets]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+    
+    def _assert_reservations_match(self, room):
+        stays = sorted((booking.get_check_in_date().toordinal(), booking.get_check_out_date().toordinal())
+                       for booking in self.hotel.get_bookings()
+                       if booking.get_room() is room and booking.get_status() != "Cancelled")
+        self.assertEqual(room.get_schedule().get_reservations(), stays,
+                         f"Room {room.get_room_number()} does not match its bookings")
+    
+    def test_double_cancel_keeps_other_reservation(self):
+        for number in range(200):
+            room = self.hotel.add_room(StandardRoom(f"X{number}", 100.0))
+            booking = self.hotel.create_booking(self.guest, room, self.check_in, self.check_out)
+            
+            def rebook():
+                # Retried until the first cancel frees the dates
+                for _ in range(1000):
+                    try:
+                        return self.hotel.create_booking(self.guest, room, self.check_in, self.check_out)
+                    except ValueError:
+                        pass
+            
+            self._run(*[booking.cancel_booking] * 4, rebook)
+            self.assertEqual(booking.get_status(), "Cancelled")
+            self._assert_reservations_match(room)
+    
+    def test_move_keeps_one_reservation(self):
+        for number in range(200):
+            source = self.hotel.add_room(StandardRoom(f"F{number}", 100.0))
+            target = self.hotel.add_room(StandardRoom(f"T{number}", 100.0))
+            booking = self.hotel.create_booking(self.guest, source, self.check_in, self.check_out)
+            
+            def take(room):
+                return lambda: self.hotel.create_booking(self.guest, room, self.check_in, self.check_out)
+            
+            self._run(lambda: booking.set_room(target), take(source), take(target))
+            self.assertIn(booking.get_room(), (source, target))
+            self._assert_reservations_match(source)
+            self._assert_reservations_match(target)
+
+class ConcurrentCheckpointTest(unittest.TestCase):
+
+    def setUp(self):
+        self._interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+    
+    def tearDown(self):
+        sys.setswitchinterval(self._interval)
+    
+    def test_checkpoint_during_changes_loses_nothing(self):
+        with tempfile.TemporaryDirectory() as data_dir:
+            hotel = HotelSystem(data_dir=data_dir, snapshot_interval=25, sample_data=False)
+            for number in range(200):
+                hotel.add_room(StandardRoom(f"C{number}", 100.0))
+            check_in = date.today() + timedelta(days=1)
+            errors = []
+            
+            def worker(offset):
+                try:
+                    for index in range(offset, 200, 4):
+                        guest = hotel.register_guest(f"Guest {index}", f"guest{index}@example.com", "555-0000")
+                        hotel.create_booking(guest, hotel.get_room_by_number(f"C{index}"), check_in,
+                                             check_in + timedelta(days=1))
+                except Exception as error:
+                    errors.append(error)
+            
+            def checkpointer():
+                try:
+                    for _ in range(20):
+                        hotel.checkpoint()
+                except Exception as error:
+                    errors.append(error)
+            
+            threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(4)]
+            threads.append(threading.Thread(target=checkpointer))
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            hotel.close()
+            self.assertEqual(errors, [])
+            
+            recovered = HotelSystem(data_dir=data_dir, sample_data=False)
+            self.assertEqual(len(recovered.get_guests()), 200)
+            self.assertEqual(len(recovered.get_bookings()), 200)
+            recovered.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -135,12 +135,12 @@ def main():
     booking3 = hotel.create_booking(guest3, room3, check_in, check_out)
     print("Booking before cancellation:")
     print(booking3)
-    print(f"Room available before cancellation: {room3.is_available()}")
+    print(f"Room available before cancellation: {room3.is_available_between(check_in, check_out)}")
     
     booking3.cancel_booking()
     print("\nAfter cancellation:")
     print(booking3)
-    print(f"Room available after cancellation: {room3.is_available()}")
+    print(f"Room available after cancellation: {room3.is_available_between(check_in, check_out)}")
     
     print("\nExample 2: Attempt to cancel already cancelled booking")
     try: